@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : headless benchmark of Stanford Town(ST/st) game, record the llm responses of a run once and replay them
+#           without network to measure the simulation itself, like
+#           `python bench_st_game.py "Host a open lunch party at 13:00 pm" "base_the_ville_isabella_maria_klaus" --mode record`
+#           `python bench_st_game.py "Host a open lunch party at 13:00 pm" "base_the_ville_isabella_maria_klaus"`
+
+import asyncio
+import json
+import random
+import time
+from pathlib import Path
+from typing import Optional
+
+import fire
+import numpy as np
+
+from metagpt.ext.stanford_town.roles.st_role import STRole
+from metagpt.ext.stanford_town.stanford_town import StanfordTown
+from metagpt.ext.stanford_town.utils.const import STORAGE_PATH
+from metagpt.ext.stanford_town.utils.llm_trace import LLMTrace, set_llm_trace
+from metagpt.ext.stanford_town.utils.mg_ga_transform import get_reverie_meta
+from metagpt.ext.stanford_town.utils.sim_profiler import SIM_PROFILER
+from metagpt.ext.stanford_town.utils.utils import copy_folder
+from metagpt.logs import logger
+
+
+async def bench(
+    idea: str,
+    fork_sim_code: str,
+    trace: LLMTrace,
+    sim_code: str,
+    n_personas: Optional[int] = None,
+    n_steps: int = 10,
+    investment: float = 30.0,
+) -> dict:
+    # the bench simulation is overwritten on every run, the fork stays pristine
+    copy_folder(str(STORAGE_PATH.joinpath(fork_sim_code)), str(STORAGE_PATH.joinpath(sim_code)))
+
+    reverie_meta = get_reverie_meta(fork_sim_code)
+    persona_names = reverie_meta["persona_names"][:n_personas] if n_personas else reverie_meta["persona_names"]
+    roles = [
+        STRole(
+            name=role_name,
+            profile=role_name,
+            sim_code=sim_code,
+            step=reverie_meta.get("step", 0),
+            start_time=reverie_meta.get("start_date"),
+            curr_time=reverie_meta.get("curr_time"),
+            sec_per_step=reverie_meta.get("sec_per_step"),
+            has_inner_voice=idx == 0,
+        )
+        for idx, role_name in enumerate(persona_names)
+    ]
+
+    town = StanfordTown()
+    await town.hire(roles)
+    town.invest(investment)
+    town.run_project(idea)
+
+    SIM_PROFILER.reset()
+    start = time.perf_counter()
+    await town.run(n_steps)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "mode": trace.mode,
+        "n_personas": len(roles),
+        "n_steps": n_steps,
+        "seconds": round(elapsed, 3),
+        "ticks_per_second": round(n_steps / elapsed, 3) if elapsed else None,
+        "subsystems": SIM_PROFILER.report(),
+        "trace_misses": trace.misses,
+    }
+
+
+def main(
+    idea: str,
+    fork_sim_code: str,
+    trace_file: Optional[str] = None,
+    mode: str = "replay",
+    sim_code: str = "bench_st_game",
+    n_personas: Optional[int] = None,
+    n_steps: int = 10,
+    seed: int = 0,
+    investment: float = 30.0,
+    output: Optional[str] = None,
+):
+    """
+    Args:
+        idea: idea works as an `inner voice` to the first agent.
+        fork_sim_code: old simulation name to start with, choose one inside `examples/stanford_town/storage`
+        trace_file: the jsonl trace of the llm responses, default `storage/{fork_sim_code}/llm_trace.jsonl`
+        mode: `record` to call the live llm and write the trace, `replay` to fast-forward from the trace
+        sim_code: simulation name to save the benchmark result, overwritten on every run
+        n_personas: run the first N personas of the fork, all of them by default
+        n_steps: steps to run agents
+        seed: random seed, a replay follows the recorded run only with the seed it was recorded with
+        investment: the investment of running agents
+        output: write the report into this json file besides logging it
+    """
+    assert mode in ("record", "replay"), f"unknown mode: {mode}"
+    random.seed(seed)
+    np.random.seed(seed)
+    trace_file = Path(trace_file) if trace_file else STORAGE_PATH.joinpath(fork_sim_code, "llm_trace.jsonl")
+    trace = LLMTrace(trace_file, mode=mode)
+    set_llm_trace(trace)
+    try:
+        report = asyncio.run(
+            bench(
+                idea=idea,
+                fork_sim_code=fork_sim_code,
+                trace=trace,
+                sim_code=sim_code,
+                n_personas=n_personas,
+                n_steps=n_steps,
+                investment=investment,
+            )
+        )
+    finally:
+        set_llm_trace(None)
+
+    logger.info(f"bench report: {json.dumps(report, indent=2)}")
+    if output:
+        Path(output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -21,9 +21,15 @@ from metagpt.logs import logger
 
 
 async def startup(
-    idea: str, fork_sim_code: str, sim_code: str, temp_storage_path: str, investment: float = 30.0, n_round: int = 500
+    idea: str,
+    fork_sim_code: str,
+    sim_code: str,
+    temp_storage_path: str,
+    investment: float = 30.0,
+    n_round: int = 500,
+    tick_interval: float = 0.0,
 ):
-    town = StanfordTown()
+    town = StanfordTown(tick_interval=tick_interval)
     logger.info("StanfordTown init environment")
 
     # copy `storage/{fork_sim_code}` to `storage/{sim_code}`
@@ -67,6 +73,7 @@ def main(
     temp_storage_path: Optional[str] = None,
     investment: float = 30.0,
     n_round: int = 500,
+    tick_interval: float = 0.0,
 ):
     """
     Args:
@@ -76,6 +83,7 @@ def main(
         temp_storage_path: generative_agents temp_storage path inside `environment/frontend_server` to interact.
         investment: the investment of running agents
         n_round: rounds to run agents
+        tick_interval: minimum real seconds per round, to pace the simulation with the frontend
     """
 
     asyncio.run(
@@ -86,6 +94,7 @@ def main(
             temp_storage_path=temp_storage_path,
             investment=investment,
             n_round=n_round,
+            tick_interval=tick_interval,
         )
     )
 
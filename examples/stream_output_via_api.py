@@ -10,50 +10,50 @@ import asyncio
 import json
 import socket
 import threading
-from contextvars import ContextVar
+import uuid
 
 from flask import Flask, Response, jsonify, request, send_from_directory
 
 from metagpt.const import TUTORIAL_PATH
-from metagpt.logs import logger, set_llm_stream_logfunc
+from metagpt.logs import STREAM_OUTPUT, CallbackSink, logger, stream_channel
 from metagpt.roles.tutorial_assistant import TutorialAssistant
 from metagpt.utils.stream_pipe import StreamPipe
 
 app = Flask(__name__)
 
 
-def stream_pipe_log(content):
-    print(content, end="")
-    stream_pipe = stream_pipe_var.get(None)
-    if stream_pipe:
-        stream_pipe.set_message(content)
-
-
 def write_tutorial(message):
-    async def main(idea, stream_pipe):
-        stream_pipe_var.set(stream_pipe)
-        role = TutorialAssistant()
-        await role.run(idea)
+    async def main(idea, channel):
+        # the llm streams of this request are tagged with its own channel
+        with stream_channel(channel):
+            role = TutorialAssistant()
+            await role.run(idea)
 
-    def thread_run(idea: str, stream_pipe: StreamPipe = None):
+    def thread_run(idea: str, channel: str):
         """
         Convert asynchronous function to thread function
         """
-        asyncio.run(main(idea, stream_pipe))
+        asyncio.run(main(idea, channel))
 
     stream_pipe = StreamPipe()
+    channel = f"write_tutorial-{uuid.uuid4().hex}"
+    sink = CallbackSink(stream_pipe.set_message, channels=[channel])
+    STREAM_OUTPUT.add_sink(sink)
     thread = threading.Thread(
         target=thread_run,
         args=(
             message["content"],
-            stream_pipe,
+            channel,
         ),
     )
     thread.start()
 
-    while thread.is_alive():
-        msg = stream_pipe.get_message()
-        yield stream_pipe.msg2stream(msg)
+    try:
+        while thread.is_alive():
+            msg = stream_pipe.get_message()
+            yield stream_pipe.msg2stream(msg)
+    finally:
+        STREAM_OUTPUT.remove_sink(sink)
 
 
 @app.route("/v1/chat/completions", methods=["POST"])
@@ -112,6 +112,4 @@ if __name__ == "__main__":
     server_port = 7860
     server_address = socket.gethostbyname(socket.gethostname())
 
-    set_llm_stream_logfunc(stream_pipe_log)
-    stream_pipe_var: ContextVar[StreamPipe] = ContextVar("stream_pipe")
     app.run(port=server_port, host=server_address)
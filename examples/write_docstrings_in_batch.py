@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : write_docstrings_in_batch.py
+@Desc    : Write the docstrings of every python file of a directory through a batch of llm requests.
+           Run it again after a crash to resume from the checkpoint instead of asking the llm again.
+"""
+import asyncio
+from pathlib import Path
+
+import fire
+
+from metagpt.actions.write_docstring import WriteDocstring
+from metagpt.const import DEFAULT_WORKSPACE_ROOT
+from metagpt.logs import logger
+from metagpt.provider.llm_batch import LLMBatch
+
+
+async def write_docstring(filename: Path, style: str) -> str:
+    try:
+        return await WriteDocstring().run(filename.read_text(), style=style)
+    except Exception as e:
+        logger.error(f"write the docstrings of {filename} failed: {e}")
+        return ""
+
+
+async def main(src: str, style: str = "google", checkpoint_dir: str = str(DEFAULT_WORKSPACE_ROOT / "docstring_batch")):
+    filenames = sorted(Path(src).rglob("*.py"))
+    async with LLMBatch(checkpoint_dir=Path(checkpoint_dir)):
+        codes = await asyncio.gather(*(write_docstring(filename, style) for filename in filenames))
+    for filename, code in zip(filenames, codes):
+        if code:
+            logger.info(f"{filename}:\n{code}")
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
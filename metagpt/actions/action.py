@@ -15,7 +15,9 @@ from pydantic import BaseModel, ConfigDict, Field, model_validator
 from metagpt.actions.action_node import ActionNode
 from metagpt.configs.models_config import ModelsConfig
 from metagpt.context_mixin import ContextMixin
+from metagpt.provider.base_llm import BaseLLM
 from metagpt.provider.llm_provider_registry import create_llm_instance
+from metagpt.provider.model_cascade import CascadeLLM
 from metagpt.schema import (
     CodePlanAndChangeContext,
     CodeSummarizeContext,
@@ -44,13 +46,29 @@ class Action(SerializationMixin, ContextMixin, BaseModel):
     @model_validator(mode="after")
     @classmethod
     def _update_private_llm(cls, data: Any) -> Any:
-        config = ModelsConfig.default().get(data.llm_name_or_type)
+        models_config = ModelsConfig.default()
+        config = models_config.get(data.llm_name_or_type)
         if config:
             llm = create_llm_instance(config)
             llm.cost_manager = data.llm.cost_manager
             data.llm = llm
+        data._set_cascade_llm(models_config)
         return data
 
+    def _set_cascade_llm(self, models_config: Optional[ModelsConfig] = None):
+        """Wrap the llm with the cascades of `config2.yaml` if there are rules for this action"""
+        if isinstance(self.private_llm, CascadeLLM):
+            return
+        models_config = models_config or ModelsConfig.default()
+        if CascadeLLM.match(self.name, models_config):
+            self.private_llm = CascadeLLM(self.llm, owner=self, models_config=models_config)
+
+    def set_llm(self, llm: BaseLLM, override=False):
+        """Set llm, kept behind the cascades of the action, e.g. when a role sets its llm to the action"""
+        super().set_llm(llm, override)
+        if llm:
+            self._set_cascade_llm()
+
     @property
     def repo(self) -> ProjectRepo:
         if not self.context.repo:
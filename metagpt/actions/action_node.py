@@ -8,10 +8,12 @@
 NOTE: You should use typing.List instead of list to do type annotation. Because in the markdown extraction process,
   we can use typing to extract the type of the node, but we cannot use built-in list to extract.
 """
+import asyncio
+import inspect
 import json
 import typing
 from enum import Enum
-from typing import Any, Dict, List, Optional, Tuple, Type, Union
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Type, Union
 
 from pydantic import BaseModel, Field, create_model, model_validator
 from tenacity import retry, stop_after_attempt, wait_random_exponential
@@ -20,6 +22,7 @@ from metagpt.actions.action_outcls_registry import register_action_outcls
 from metagpt.const import USE_CONFIG_TIMEOUT
 from metagpt.llm import BaseLLM
 from metagpt.logs import logger
+from metagpt.provider.model_cascade import CascadeLLM
 from metagpt.provider.postprocess.llm_output_postprocess import llm_output_postprocess
 from metagpt.utils.common import OutputParser, general_after_log
 from metagpt.utils.human_interaction import HumanInteraction
@@ -120,6 +123,14 @@ def dict_to_markdown(d, prefix="- ", kv_sep="\n", postfix="\n"):
     return markdown_str
 
 
+REJECTED_TEMPLATE = """
+## rejected outputs
+The outputs below were rejected for the given reasons, don't make the same mistakes.
+{rejected}
+"""
+REJECTED_OUTPUT_MAX_CHARS = 2000
+
+
 class ActionNode:
     """ActionNode is a tree of nodes."""
 
@@ -422,10 +433,16 @@ class ActionNode:
         system_msgs: Optional[list[str]] = None,
         schema="markdown",  # compatible to original format
         timeout=USE_CONFIG_TIMEOUT,
+        llm: Optional[BaseLLM] = None,
     ) -> (str, BaseModel):
         """Use ActionOutput to wrap the output of aask"""
-        content = await self.llm.aask(prompt, system_msgs, images=images, timeout=timeout)
+        content = await (llm or self.llm).aask(prompt, system_msgs, images=images, timeout=timeout)
         logger.debug(f"llm raw output:\n{content}")
+        return content, self._parse_output(content, output_class_name, output_data_mapping, schema=schema)
+
+    def _parse_output(
+        self, content: str, output_class_name: str, output_data_mapping: dict, schema="markdown"
+    ) -> BaseModel:
         output_class = self.create_model_class(output_class_name, output_data_mapping)
 
         if schema == "json":
@@ -436,8 +453,86 @@ class ActionNode:
             parsed_data = OutputParser.parse_data_with_mapping(content, output_data_mapping)
 
         logger.debug(f"parsed_data:\n{parsed_data}")
-        instruct_content = output_class(**parsed_data)
-        return content, instruct_content
+        return output_class(**parsed_data)
+
+    async def _aask_speculative(
+        self,
+        prompt: str,
+        output_class_name: str,
+        output_data_mapping: dict,
+        candidates: int,
+        accept: Optional[Callable[[BaseModel], Union[bool, Awaitable[bool]]]] = None,
+        images: Optional[Union[str, list[str]]] = None,
+        system_msgs: Optional[list[str]] = None,
+        schema="markdown",
+        timeout=USE_CONFIG_TIMEOUT,
+        rounds: int = 3,
+        llm: Optional[BaseLLM] = None,
+    ) -> (str, BaseModel):
+        """Sample `candidates` outputs concurrently, return the first one that parses and passes `accept`, and cancel
+        the others. The candidates rejected in a round are added to the prompt of the next round as negative examples.
+        """
+        rejected: list[tuple[str, str]] = []  # (content, reason)
+        for _ in range(rounds):
+            round_prompt = prompt + self._compile_rejected(rejected[-candidates:]) if rejected else prompt
+            tasks = [
+                asyncio.create_task(
+                    self._sample_candidate(
+                        llm or self.llm,
+                        round_prompt,
+                        output_class_name,
+                        output_data_mapping,
+                        accept,
+                        images,
+                        system_msgs,
+                        schema,
+                        timeout,
+                    )
+                )
+                for _ in range(candidates)
+            ]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    try:
+                        content, instruct_content, reason = await next_done
+                    except Exception as e:
+                        logger.warning(f"a candidate of {self.key} failed: {e}")
+                        continue
+                    if instruct_content is not None:
+                        return content, instruct_content
+                    logger.debug(f"reject a candidate of {self.key}, {reason}")
+                    rejected.append((content, reason))
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+        raise ValueError(f"no valid candidate of {self.key} in {rounds} rounds of {candidates}")
+
+    async def _sample_candidate(
+        self, llm, prompt, output_class_name, output_data_mapping, accept, images, system_msgs, schema, timeout
+    ) -> (str, Optional[BaseModel], str):
+        """A candidate output, its parsed content or None with the reason why it's rejected"""
+        # every candidate is a sample of its own, the identical requests must not be coalesced into one
+        content = await llm.aask(prompt, system_msgs, images=images, timeout=timeout, stream=False, coalesce=False)
+        try:
+            instruct_content = self._parse_output(content, output_class_name, output_data_mapping, schema=schema)
+        except Exception as e:
+            return content, None, f"invalid format: {e}"
+        if accept:
+            accepted = accept(instruct_content)
+            if inspect.isawaitable(accepted):
+                accepted = await accepted
+            if not accepted:
+                return content, None, "rejected by the review"
+        return content, instruct_content, ""
+
+    @staticmethod
+    def _compile_rejected(rejected: list[tuple[str, str]]) -> str:
+        outputs = "\n".join(
+            f"### rejected output {i}: {reason}\n{content[:REJECTED_OUTPUT_MAX_CHARS]}\n"
+            for i, (content, reason) in enumerate(rejected, 1)
+        )
+        return REJECTED_TEMPLATE.format(rejected=outputs)
 
     def get(self, key):
         return self.instruct_content.model_dump()[key]
@@ -454,15 +549,50 @@ class ActionNode:
         self.set_recursive("context", context)
 
     async def simple_fill(
-        self, schema, mode, images: Optional[Union[str, list[str]]] = None, timeout=USE_CONFIG_TIMEOUT, exclude=None
+        self,
+        schema,
+        mode,
+        images: Optional[Union[str, list[str]]] = None,
+        timeout=USE_CONFIG_TIMEOUT,
+        exclude=None,
+        candidates: int = 1,
+        accept: Optional[Callable[[BaseModel], Union[bool, Awaitable[bool]]]] = None,
     ):
         prompt = self.compile(context=self.context, schema=schema, mode=mode, exclude=exclude)
         if schema != "raw":
             mapping = self.get_mapping(mode, exclude=exclude)
             class_name = f"{self.key}_AN"
-            content, scontent = await self._aask_v1(
-                prompt, class_name, mapping, images=images, schema=schema, timeout=timeout
-            )
+            cascade = None
+            if isinstance(self.llm, CascadeLLM):
+                cascade = self.llm.cascade_for(self.key)
+                if self.children and mode != "root" and (rules := self.llm.node_rules(list(self.children))):
+                    logger.warning(f"cascades {rules} of child nodes only apply with strgy='complex', skipped")
+
+            async def ask(llm: BaseLLM, rounds: int = 3) -> (str, BaseModel):
+                if candidates > 1 or accept or rounds == 1:
+                    return await self._aask_speculative(
+                        prompt,
+                        class_name,
+                        mapping,
+                        candidates,
+                        accept,
+                        images=images,
+                        schema=schema,
+                        timeout=timeout,
+                        rounds=rounds,
+                        llm=llm,
+                    )
+                return await self._aask_v1(
+                    prompt, class_name, mapping, images=images, schema=schema, timeout=timeout, llm=llm
+                )
+
+            if cascade:
+                # a single round on the cheaper models, their invalid outputs are escalated rather than retried
+                content, scontent = await cascade.run(
+                    lambda llm: ask(llm) if llm is cascade.strongest else ask(llm, rounds=1)
+                )
+            else:
+                content, scontent = await ask(self.llm)
             self.content = content
             self.instruct_content = scontent
         else:
@@ -481,6 +611,8 @@ class ActionNode:
         images: Optional[Union[str, list[str]]] = None,
         timeout=USE_CONFIG_TIMEOUT,
         exclude=[],
+        candidates: int = 1,
+        accept: Optional[Callable[[BaseModel], Union[bool, Awaitable[bool]]]] = None,
     ):
         """Fill the node(s) with mode.
 
@@ -500,6 +632,9 @@ class ActionNode:
         :param images: the list of image url or base64 for gpt4-v
         :param timeout: Timeout for llm invocation.
         :param exclude: The keys of ActionNode to exclude.
+        :param candidates: The number of outputs sampled concurrently, the first valid one is accepted and the others
+            are cancelled. It saves the retries of the schema-heavy nodes, better with a temperature > 0.
+        :param accept: A cheap review of a valid output, sync or async, returning False to reject it.
         :return: self
         """
         self.set_llm(llm)
@@ -508,14 +643,30 @@ class ActionNode:
             schema = self.schema
 
         if strgy == "simple":
-            return await self.simple_fill(schema=schema, mode=mode, images=images, timeout=timeout, exclude=exclude)
+            return await self.simple_fill(
+                schema=schema,
+                mode=mode,
+                images=images,
+                timeout=timeout,
+                exclude=exclude,
+                candidates=candidates,
+                accept=accept,
+            )
         elif strgy == "complex":
             # 这里隐式假设了拥有children
             tmp = {}
             for _, i in self.children.items():
                 if exclude and i.key in exclude:
                     continue
-                child = await i.simple_fill(schema=schema, mode=mode, images=images, timeout=timeout, exclude=exclude)
+                child = await i.simple_fill(
+                    schema=schema,
+                    mode=mode,
+                    images=images,
+                    timeout=timeout,
+                    exclude=exclude,
+                    candidates=candidates,
+                    accept=accept,
+                )
                 tmp.update(child.instruct_content.model_dump())
             cls = self._create_children_class()
             self.instruct_content = cls(**tmp)
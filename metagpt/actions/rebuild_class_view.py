@@ -23,11 +23,11 @@ from metagpt.const import (
     GRAPH_REPO_FILE_REPO,
 )
 from metagpt.logs import logger
-from metagpt.repo_parser import DotClassInfo, RepoParser
+from metagpt.repo_parser import REPO_PARSER_CACHE_ROOT, DotClassInfo, RepoParser
 from metagpt.schema import UMLClassView
 from metagpt.utils.common import concat_namespace, split_namespace
-from metagpt.utils.di_graph_repository import DiGraphRepository
 from metagpt.utils.graph_repository import GraphKeyword, GraphRepository
+from metagpt.utils.triple_store_repository import TripleStoreRepository
 
 
 class RebuildClassView(Action):
@@ -49,8 +49,8 @@ class RebuildClassView(Action):
             format (str): The format for the prompt schema.
         """
         graph_repo_pathname = self.context.git_repo.workdir / GRAPH_REPO_FILE_REPO / self.context.git_repo.workdir.name
-        self.graph_db = await DiGraphRepository.load_from(str(graph_repo_pathname.with_suffix(".json")))
-        repo_parser = RepoParser(base_directory=Path(self.i_context))
+        self.graph_db = await TripleStoreRepository.load_from(str(graph_repo_pathname.with_suffix(".json")))
+        repo_parser = RepoParser(base_directory=Path(self.i_context), cache_root=REPO_PARSER_CACHE_ROOT)
         # use pylint
         class_views, relationship_views, package_root = await repo_parser.rebuild_class_views(path=Path(self.i_context))
         await GraphRepository.update_graph_db_with_class_views(self.graph_db, class_views)
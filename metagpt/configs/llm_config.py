@@ -7,7 +7,7 @@
 """
 
 from enum import Enum
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import field_validator
 
@@ -35,6 +35,7 @@ class LLMType(Enum):
     OPENROUTER = "openrouter"
     BEDROCK = "bedrock"
     ARK = "ark"  # https://www.volcengine.com/docs/82379/1263482#python-sdk
+    ROUTER = "router"  # dispatch to several backends, see `backends`
 
     def __missing__(self, key):
         return self.OPENAI
@@ -86,6 +87,7 @@ class LLMConfig(YamlModel):
 
     # For Amazon Bedrock
     region_name: str = None
+    max_workers: int = 8  # threads running the blocking boto3 calls, shared by the bedrock llms of the same size
 
     # For Network
     proxy: Optional[str] = None
@@ -95,6 +97,16 @@ class LLMConfig(YamlModel):
 
     # For Messages Control
     use_system_prompt: bool = True
+    prompt_cache: bool = False  # let the provider cache the stable prefix (system prompts, format_msgs) of the prompts
+
+    # For Router
+    backends: list["LLMConfig"] = []
+    backend_weights: Optional[list[float]] = None  # used by the round_robin policy, default 1 for each backend
+    routing_policy: Literal["latency", "round_robin", "cost"] = "latency"
+    hedge: bool = False  # fire a second request to the next backend once the p95 latency has elapsed
+    hedge_min_samples: int = 20  # observed requests needed before a p95 latency is trusted
+    circuit_failure_threshold: int = 3  # consecutive failures that open the circuit of a backend
+    circuit_reset_timeout: float = 30.0  # seconds an open circuit waits before letting a probe request through
 
     @field_validator("api_key")
     @classmethod
@@ -29,6 +29,8 @@ class ModelsConfig(YamlModel):
 
     Attributes:
         models (Dict[str, LLMConfig]): Dictionary mapping model names or types to LLMConfig objects.
+        cascades (Dict[str, List[str]]): Dictionary mapping action/node patterns to the models of their cascade.
+        cascade_min_confidence (float): The self-rated confidence under which a cascade escalates.
 
     Methods:
         update_llm_model(cls, value): Validates and updates LLM model configurations.
@@ -38,6 +40,10 @@ class ModelsConfig(YamlModel):
     """
 
     models: Dict[str, LLMConfig] = Field(default_factory=dict)
+    # `fnmatch` patterns of "{action name}" or "{action name}/{node key}" -> the `models` to try in order, cheapest first
+    cascades: Dict[str, List[str]] = Field(default_factory=dict)
+    # escalate when a cheaper model of a cascade rates its answer lower, 0 to not ask the models for a rating
+    cascade_min_confidence: float = 0.0
 
     @field_validator("models", mode="before")
     @classmethod
@@ -68,6 +68,8 @@ class Context(BaseModel):
     git_repo: Optional[GitRepository] = None
     src_workspace: Optional[Path] = None
     cost_manager: CostManager = CostManager()
+    # the model cascades of `config2.yaml` used by the actions of the context, see `metagpt.provider.model_cascade`
+    cascades: Dict[str, Any] = {}
 
     _llm: Optional[BaseLLM] = None
 
@@ -52,6 +52,8 @@ class AndroidExtEnv(ExtEnv):
     ocr_detection: any = Field(default=None, description="ocr detection model")
     ocr_recognition: any = Field(default=None, description="ocr recognition model")
     groundingdino_model: any = Field(default=None, description="clip groundingdino model")
+    clip_model: any = Field(default=None, description="clip model to match icons, loaded on first use")
+    clip_preprocess: any = Field(default=None, description="image preprocess of the clip model")
 
     def __init__(self, **data: Any):
         super().__init__(**data)
@@ -342,8 +344,10 @@ class AndroidExtEnv(ExtEnv):
     @mark_as_writeable
     def user_click_icon(self, icon_shape_color: str) -> str:
         screenshot_path = self.get_screenshot("screenshot", self.screenshot_dir)
-        image = screenshot_path
-        iw, ih = Image.open(image).size
+        # decode the screenshot once, detection and cropping work on the in-memory image
+        image = Image.open(screenshot_path)
+        image.load()
+        iw, ih = image.size
         x, y = self.device_shape
         if iw > ih:
             x, y = y, x
@@ -358,16 +362,15 @@ class AndroidExtEnv(ExtEnv):
             return self.system_tap(tap_coordinate[0] * x, tap_coordinate[1] * y)
 
         else:
-            temp_file = Path(f"{DEFAULT_WORKSPACE_ROOT}/temp")
-            temp_file.mkdir(parents=True, exist_ok=True)
             hash_table, clip_filter = [], []
-            for i, (td, box) in enumerate(zip(in_coordinate, out_coordinate)):
-                if crop_for_clip(image, td, i, temp_file):
+            for td in in_coordinate:
+                cropped_image = crop_for_clip(image, td)
+                if cropped_image is not None:
                     hash_table.append(td)
-                    crop_image = f"{i}.png"
-                    clip_filter.append(temp_file.joinpath(crop_image))
-            clip_model, clip_preprocess = clip.load("ViT-B/32")  # FIXME: device=device
-            clip_filter = clip_for_icon(clip_model, clip_preprocess, clip_filter, icon_shape_color)
+                    clip_filter.append(cropped_image)
+            if self.clip_model is None:
+                self.clip_model, self.clip_preprocess = clip.load("ViT-B/32")  # FIXME: device=device
+            clip_filter = clip_for_icon(self.clip_model, self.clip_preprocess, clip_filter, icon_shape_color)
             final_box = hash_table[clip_filter]
             tap_coordinate = [(final_box[0] + final_box[2]) / 2, (final_box[1] + final_box[3]) / 2]
             tap_coordinate = [round(tap_coordinate[0] / iw, 2), round(tap_coordinate[1] / ih, 2)]
@@ -3,6 +3,7 @@
 
 import math
 from pathlib import Path
+from typing import Optional, Union
 
 import clip
 import cv2
@@ -214,28 +215,24 @@ def in_box(box: list, target: list) -> bool:
         return False
 
 
-def crop_for_clip(image: any, box: any, i: int, temp_file: Path) -> bool:
-    image = Image.open(image)
+def crop_for_clip(image: Image.Image, box: list) -> Optional[Image.Image]:
+    """crop the box from the decoded screenshot in memory, return None if the box is out of the screenshot"""
     w, h = image.size
     bound = [0, 0, w, h]
     if in_box(box, bound):
-        cropped_image = image.crop(box)
-        cropped_image.save(temp_file.joinpath(f"{i}.png"))
-        return True
+        return image.crop(box)
     else:
-        return False
-
+        return None
 
-def clip_for_icon(clip_model: any, clip_preprocess: any, images: any, prompt: str) -> any:
-    image_features = []
-    for image_file in images:
-        image = clip_preprocess(Image.open(image_file)).unsqueeze(0).to(next(clip_model.parameters()).device)
-        image_feature = clip_model.encode_image(image)
-        image_features.append(image_feature)
-    image_features = torch.cat(image_features)
 
-    text = clip.tokenize([prompt]).to(next(clip_model.parameters()).device)
-    text_features = clip_model.encode_text(text)
+def clip_for_icon(clip_model: any, clip_preprocess: any, images: list[Image.Image], prompt: str) -> any:
+    device = next(clip_model.parameters()).device
+    # preprocess all the crops into one batch, so that the images are encoded with a single forward pass
+    image_batch = torch.stack([clip_preprocess(image) for image in images]).to(device)
+    text = clip.tokenize([prompt]).to(device)
+    with torch.no_grad():
+        image_features = clip_model.encode_image(image_batch)
+        text_features = clip_model.encode_text(text)
 
     image_features /= image_features.norm(dim=-1, keepdim=True)
     text_features /= text_features.norm(dim=-1, keepdim=True)
@@ -307,40 +304,45 @@ def get_grounding_output(
     return boxes_filt, torch.Tensor(scores), pred_phrases
 
 
-def remove_boxes(boxes_filt: any, size: any, iou_threshold: float = 0.5) -> any:
-    boxes_to_remove = set()
-
-    for i in range(len(boxes_filt)):
-        if calculate_size(boxes_filt[i]) > 0.05 * size[0] * size[1]:
-            boxes_to_remove.add(i)
-        for j in range(len(boxes_filt)):
-            if calculate_size(boxes_filt[j]) > 0.05 * size[0] * size[1]:
-                boxes_to_remove.add(j)
-            if i == j:
-                continue
-            if i in boxes_to_remove or j in boxes_to_remove:
-                continue
-            iou = calculate_iou(boxes_filt[i], boxes_filt[j])
-            if iou >= iou_threshold:
-                boxes_to_remove.add(j)
+def pairwise_iou(boxes: np.ndarray) -> np.ndarray:
+    """the IoU matrix of boxes in (x1, y1, x2, y2) format"""
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    x_a = np.maximum(boxes[:, None, 0], boxes[None, :, 0])
+    y_a = np.maximum(boxes[:, None, 1], boxes[None, :, 1])
+    x_b = np.minimum(boxes[:, None, 2], boxes[None, :, 2])
+    y_b = np.minimum(boxes[:, None, 3], boxes[None, :, 3])
+    inter_area = np.clip(x_b - x_a, 0, None) * np.clip(y_b - y_a, 0, None)
+    union_area = areas[:, None] + areas[None, :] - inter_area
+    return np.divide(inter_area, union_area, out=np.zeros(inter_area.shape), where=union_area > 0)
 
-    boxes_filt = [box for idx, box in enumerate(boxes_filt) if idx not in boxes_to_remove]
+
+def remove_boxes(boxes_filt: any, size: any, iou_threshold: float = 0.5) -> any:
+    """drop the boxes larger than 5% of the image, then suppress the later boxes overlapping a kept one"""
+    if len(boxes_filt) == 0:
+        return []
+    boxes = np.asarray(boxes_filt, dtype=np.float64)
+    keep = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1]) <= 0.05 * size[0] * size[1]
+    suppress = pairwise_iou(boxes) >= iou_threshold
+    for i in range(len(boxes)):
+        if keep[i]:
+            keep[i + 1 :] &= ~suppress[i, i + 1 :]
+
+    boxes_filt = [box for box, kept in zip(boxes_filt, keep) if kept]
 
     return boxes_filt
 
 
 def det(
-    input_image: any,
+    input_image: Union[Path, Image.Image],
     text_prompt: str,
     groundingdino_model: any,
     box_threshold: float = 0.05,
     text_threshold: float = 0.5,
 ) -> any:
-    image = Image.open(input_image)
+    image = input_image if isinstance(input_image, Image.Image) else Image.open(input_image)
     size = image.size
 
     image_pil = image.convert("RGB")
-    image = np.array(image_pil)
 
     transformed_image = transform_image(image_pil)
     boxes_filt, scores, pred_phrases = get_grounding_output(
@@ -348,10 +350,10 @@ def det(
     )
 
     H, W = size[1], size[0]
-    for i in range(boxes_filt.size(0)):
-        boxes_filt[i] = boxes_filt[i] * torch.Tensor([W, H, W, H])
-        boxes_filt[i][:2] -= boxes_filt[i][2:] / 2
-        boxes_filt[i][2:] += boxes_filt[i][:2]
+    # (cx, cy, w, h) in ratio -> (x1, y1, x2, y2) in pixel
+    boxes_filt = boxes_filt * torch.Tensor([W, H, W, H])
+    boxes_filt[:, :2] -= boxes_filt[:, 2:] / 2
+    boxes_filt[:, 2:] += boxes_filt[:, :2]
 
     boxes_filt = boxes_filt.cpu().int().tolist()
     filtered_boxes = remove_boxes(boxes_filt, size)  # [:9]
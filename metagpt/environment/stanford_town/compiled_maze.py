@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : the maze assets of StanfordTown compiled into arrays and lookup tables, cached on disk
+#           refs to `generative_agents maze.py`
+
+import hashlib
+import pickle
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict, Field
+
+from metagpt.const import DEFAULT_WORKSPACE_ROOT
+from metagpt.logs import logger
+from metagpt.utils.common import read_csv_to_list, read_json_file
+
+MAZE_CACHE_ROOT = DEFAULT_WORKSPACE_ROOT / ".maze_cache"
+MAZE_CACHE_VERSION = "1"  # bump it when the compiled format changes
+
+# the order of the layers in `CompiledMaze.layers`
+MAZE_LAYERS = ["sector", "arena", "game_object", "spawning_location", "collision"]
+BLOCK_FILES = ["world_blocks.csv", "sector_blocks.csv", "arena_blocks.csv", "game_object_blocks.csv"]
+BLOCK_FILES += ["spawning_location_blocks.csv"]
+MAZE_FILES = ["collision_maze.csv", "sector_maze.csv", "arena_maze.csv", "game_object_maze.csv"]
+MAZE_FILES += ["spawning_location_maze.csv"]
+
+
+class CompiledMaze(BaseModel):
+    """The maze of a Tiled map, with the tile names coded into integer layers"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    maze_width: int
+    maze_height: int
+    sq_tile_size: int
+    special_constraint: str
+    world: str
+    tile_names: list[str] = Field(description="string table of the layers, 0 is the empty string")
+    layers: np.ndarray = Field(description="int32 array of shape (len(MAZE_LAYERS), height, width)")
+    collision_maze: list[list[str]]
+    address_tiles: dict[str, set[tuple[int, int]]]
+
+    def layer(self, level: str) -> np.ndarray:
+        return self.layers[MAZE_LAYERS.index(level)]
+
+    def build_tiles(self) -> list[list[dict]]:
+        """A new tile detail dictionary for each tile, with the default event of its game object"""
+        names = self.tile_names
+        templates = {}  # tiles sharing the same codes are copied from the same template
+        tiles = []
+        for codes_row in zip(*(layer.tolist() for layer in self.layers)):
+            row = []
+            for codes in zip(*codes_row):
+                template = templates.get(codes)
+                if template is None:
+                    sector, arena, game_object, spawning_location, collision = codes
+                    template = {
+                        "world": self.world,
+                        "sector": names[sector],
+                        "arena": names[arena],
+                        "game_object": names[game_object],
+                        "spawning_location": names[spawning_location],
+                        "collision": bool(collision),
+                    }
+                    # Each game object occupies an event in the tile. We are setting up the
+                    # default event value here.
+                    events = ()
+                    if game_object:
+                        object_name = f"{self.world}:{names[sector]}:{names[arena]}:{names[game_object]}"
+                        events = ((object_name, None, None, None),)
+                    templates[codes] = template = (template, events)
+                tile_details = template[0].copy()
+                tile_details["events"] = set(template[1])
+                row += [tile_details]
+            tiles += [row]
+        return tiles
+
+
+def maze_asset_files(maze_asset_path: Path) -> list[Path]:
+    maze_matrix_path = maze_asset_path.joinpath("matrix")
+    files = [maze_matrix_path.joinpath("maze_meta_info.json")]
+    files += [maze_matrix_path.joinpath("special_blocks", name) for name in BLOCK_FILES]
+    files += [maze_matrix_path.joinpath("maze", name) for name in MAZE_FILES]
+    return files
+
+
+def compile_maze(maze_asset_path: Path) -> CompiledMaze:
+    maze_matrix_path = maze_asset_path.joinpath("matrix")
+    meta_info = read_json_file(maze_matrix_path.joinpath("maze_meta_info.json"))
+    maze_width = int(meta_info["maze_width"])
+    maze_height = int(meta_info["maze_height"])
+
+    # READING IN SPECIAL BLOCKS
+    # Special blocks are those that are colored in the Tiled map.
+    # Here is an example row for the arena block file:
+    # e.g, "25331, Double Studio, Studio, Bedroom 2, Painting"
+    blocks_folder = maze_matrix_path.joinpath("special_blocks")
+    wb = read_csv_to_list(blocks_folder.joinpath("world_blocks.csv"), header=False)[0][-1]
+    block_dicts = {}
+    for level in MAZE_LAYERS[:4]:
+        rows = read_csv_to_list(blocks_folder.joinpath(f"{level}_blocks.csv"), header=False)
+        block_dicts[level] = {i[0]: i[-1] for i in rows}
+
+    # Reading in the matrices
+    # This is your typical two dimensional matrices. It's made up of 0s and
+    # the number that represents the color block from the blocks folder.
+    # Importantly, they are "not" in a 2-d matrix format -- they are single
+    # row matrices with the length of width x height of the maze.
+    # example format: [['0', '0', ... '25309', '0',...], ['0',...]...]
+    maze_folder = maze_matrix_path.joinpath("maze")
+    collision_maze_raw = read_csv_to_list(maze_folder.joinpath("collision_maze.csv"), header=False)[0]
+    collision_maze = [collision_maze_raw[i : i + maze_width] for i in range(0, len(collision_maze_raw), maze_width)]
+
+    tile_names = [""]
+    name_codes = {"": 0}
+    layers = np.zeros((len(MAZE_LAYERS), maze_height, maze_width), dtype=np.int32)
+    for idx, level in enumerate(MAZE_LAYERS[:4]):
+        raw = read_csv_to_list(maze_folder.joinpath(f"{level}_maze.csv"), header=False)[0]
+        for block_id in set(raw):
+            name = block_dicts[level].get(block_id, "")
+            if name not in name_codes:
+                name_codes[name] = len(tile_names)
+                tile_names.append(name)
+        codes = [name_codes[block_dicts[level].get(block_id, "")] for block_id in raw]
+        layers[idx] = np.array(codes, dtype=np.int32).reshape(maze_height, maze_width)
+    layers[MAZE_LAYERS.index("collision")] = np.array(collision_maze) != "0"
+
+    # Reverse tile access.
+    # <address_tiles> -- given a string address, we return a set of all
+    # tile coordinates belonging to that address (this is opposite of
+    # tiles that give you the string address given a coordinate). This is
+    # an optimization component for finding paths for the personas' movement.
+    # address_tiles['<spawn_loc>bedroom-2-a'] == {(58, 9)}
+    # address_tiles['double studio:recreation:pool table']
+    #   == {(29, 14), (31, 11), (30, 14), (32, 11), ...},
+    address_tiles = dict()
+    sectors, arenas, game_objects, spawning_locations, _ = (layer.tolist() for layer in layers)
+    for i in range(maze_height):
+        for j in range(maze_width):
+            sector = tile_names[sectors[i][j]]
+            arena = tile_names[arenas[i][j]]
+            game_object = tile_names[game_objects[i][j]]
+            spawning_location = tile_names[spawning_locations[i][j]]
+            addresses = []
+            if sector:
+                addresses += [f"{wb}:{sector}"]
+            if arena:
+                addresses += [f"{wb}:{sector}:{arena}"]
+            if game_object:
+                addresses += [f"{wb}:{sector}:{arena}:{game_object}"]
+            if spawning_location:
+                addresses += [f"<spawn_loc>{spawning_location}"]
+            for add in addresses:
+                address_tiles.setdefault(add, set()).add((j, i))
+
+    return CompiledMaze.model_construct(
+        maze_width=maze_width,
+        maze_height=maze_height,
+        sq_tile_size=int(meta_info["sq_tile_size"]),
+        special_constraint=meta_info["special_constraint"],
+        world=wb,
+        tile_names=tile_names,
+        layers=layers,
+        collision_maze=collision_maze,
+        address_tiles=address_tiles,
+    )
+
+
+def maze_cache_key(maze_asset_path: Path) -> str:
+    sha = hashlib.sha256(MAZE_CACHE_VERSION.encode())
+    for filename in maze_asset_files(maze_asset_path):
+        sha.update(filename.read_bytes())
+    return sha.hexdigest()
+
+
+def load_compiled_maze(maze_asset_path: Path, cache_root: Optional[Path] = MAZE_CACHE_ROOT) -> CompiledMaze:
+    """Load the compiled maze from `{cache_root}/{hash of the asset files}`, compile and cache it at the first time.
+
+    The layers are memory-mapped read-only, the lookup tables are unpickled. Without `cache_root`, always compile.
+    """
+    maze_asset_path = Path(maze_asset_path)
+    if not cache_root:
+        return compile_maze(maze_asset_path)
+
+    cache_path = Path(cache_root) / maze_cache_key(maze_asset_path)
+    layers_file, tables_file = cache_path / "layers.npy", cache_path / "tables.pkl"
+    if layers_file.exists() and tables_file.exists():
+        try:
+            with open(tables_file, "rb") as reader:
+                tables = pickle.load(reader)
+            return CompiledMaze.model_construct(layers=np.load(layers_file, mmap_mode="r"), **tables)
+        except Exception as e:
+            logger.warning(f"failed to load compiled maze from {cache_path}, compile it again: {e}")
+
+    maze = compile_maze(maze_asset_path)
+    try:
+        cache_path.mkdir(parents=True, exist_ok=True)
+        np.save(layers_file, maze.layers)
+        with open(tables_file, "wb") as writer:
+            tables = {name: getattr(maze, name) for name in CompiledMaze.model_fields if name != "layers"}
+            pickle.dump(tables, writer, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError as e:
+        logger.warning(f"failed to cache compiled maze into {cache_path}: {e}")
+    return maze
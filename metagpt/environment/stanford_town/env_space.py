@@ -55,6 +55,7 @@ class EnvObsType(BaseEnvObsType):
     GET_TITLE = 1  # get the tile detail dictionary with given tile coord
     TILE_PATH = 2  # get the tile address with given tile coord
     TILE_NBR = 3  # get the neighbors of given tile coord and its vision radius
+    PERCEPTION = 4  # get the nearby tiles, their addresses and events of given tile coord and its vision radius
 
 
 class EnvObsParams(BaseEnvObsParams):
@@ -68,6 +69,7 @@ class EnvObsParams(BaseEnvObsParams):
     )
     level: str = Field(default="", description="different level of title")
     vision_radius: int = Field(default=0, description="the vision radius of current tile")
+    att_bandwidth: int = Field(default=0, description="the number of the closest events to perceive, 0 for all")
 
     @field_validator("coord", mode="before")
     @classmethod
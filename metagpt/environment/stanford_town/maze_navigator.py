@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : shortest paths on the StanfordTown maze, refs to `generative_agents path_finder.py`
+
+from collections import OrderedDict, deque
+from typing import Iterable, Optional
+
+import numpy as np
+
+Tile = tuple[int, int]
+# (start, targets in the order of the query)
+PathKey = tuple[Tile, tuple[Tile, ...]]
+
+
+class MazeNavigator:
+    """Breadth-first shortest paths between (x, y) tiles over the walkable tiles of a maze.
+
+    The occupancy grid is flattened once, a search stops as soon as the level of the goal is reached, and found paths
+    are kept in an LRU cache keyed by the start and the targets of the query. Ties between shortest paths are broken like the wavefront search
+    of generative_agents (going up, left, down then right from the goal), so the same paths are produced.
+    """
+
+    def __init__(self, blocked: np.ndarray, cache_size: int = 4096):
+        """
+        Args:
+            blocked: bool array of shape (height, width), True for the collision tiles.
+            cache_size: the number of queried paths to keep.
+        """
+        self.height, self.width = blocked.shape
+        self.walkable: list[bool] = (~blocked).ravel().tolist()
+        self.cache_size = cache_size
+        self._cache: OrderedDict[PathKey, tuple[tuple[Tile, ...], Tile]] = OrderedDict()
+
+    def _neighbors(self, idx: int) -> Iterable[int]:
+        """neighbors in the tie-breaking order: up, left, down, right"""
+        y, x = divmod(idx, self.width)
+        if y > 0:
+            yield idx - self.width
+        if x > 0:
+            yield idx - 1
+        if y < self.height - 1:
+            yield idx + self.width
+        if x < self.width - 1:
+            yield idx + 1
+
+    def _search(self, start: int, goals: set[int]) -> tuple[dict[int, int], list[int]]:
+        """BFS from `start`, return the distances of the visited tiles and the goals found at the closest level"""
+        dist = {start: 0}
+        if start in goals:
+            return dist, [start]
+        frontier = deque([start])
+        while frontier:
+            found = []
+            for _ in range(len(frontier)):  # expand one whole level
+                idx = frontier.popleft()
+                for nbr in self._neighbors(idx):
+                    if nbr not in dist and self.walkable[nbr]:
+                        dist[nbr] = dist[idx] + 1
+                        frontier.append(nbr)
+                        if nbr in goals:
+                            found.append(nbr)
+            if found:
+                return dist, found
+        return dist, []
+
+    def _backtrack(self, dist: dict[int, int], goal: int) -> tuple[Tile, ...]:
+        path = [goal]
+        idx = goal
+        while dist[idx] > 0:
+            idx = next(nbr for nbr in self._neighbors(idx) if dist.get(nbr) == dist[idx] - 1)
+            path.append(idx)
+        path.reverse()
+        return tuple(self._to_tile(i) for i in path)
+
+    def _to_index(self, tile: Iterable[int]) -> int:
+        x, y = tile
+        return int(y) * self.width + int(x)
+
+    def _to_tile(self, idx: int) -> Tile:
+        y, x = divmod(idx, self.width)
+        return x, y
+
+    def _cache_get(self, key: PathKey) -> Optional[tuple[tuple[Tile, ...], Tile]]:
+        item = self._cache.get(key)
+        if item is not None:
+            self._cache.move_to_end(key)
+        return item
+
+    def _cache_put(self, key: PathKey, item: tuple[tuple[Tile, ...], Tile]):
+        self._cache[key] = item
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def find_path(self, start: Iterable[int], end: Iterable[int]) -> list[Tile]:
+        """The shortest path from `start` to `end`, both included. `[end]` if `end` can't be reached."""
+        path, _ = self.find_closest_path(start, [end])
+        return path
+
+    def find_closest_path(self, start: Iterable[int], targets: Iterable[Iterable[int]]) -> tuple[list[Tile], Tile]:
+        """The shortest path from `start` to the closest of `targets` in a single search.
+
+        Ties are broken by the order of `targets`. If none of them can be reached, return `[targets[0]]`.
+
+        Returns:
+            tuple[list[Tile], Tile]: the path with both ends included, and the chosen target.
+        """
+        start = self._to_tile(self._to_index(start))
+        targets = [self._to_tile(self._to_index(t)) for t in targets]
+        # the order of the targets breaks the ties, so it is part of the key
+        key = (start, tuple(targets))
+        cached = self._cache_get(key)
+        if cached is not None:
+            path, target = cached
+            return list(path), target
+
+        goals = {self._to_index(t) for t in targets}
+        dist, found = self._search(self._to_index(start), goals)
+        if not found:
+            return [targets[0]], targets[0]
+        found = set(found)
+        target = next(t for t in targets if self._to_index(t) in found)
+        path = self._backtrack(dist, self._to_index(target))
+        self._cache_put(key, (path, target))
+        return list(path), target
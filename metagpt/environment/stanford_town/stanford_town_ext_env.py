@@ -5,11 +5,16 @@
 
 import math
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Iterable, Optional
 
-from pydantic import ConfigDict, Field, model_validator
+import numpy as np
+from pydantic import ConfigDict, Field, PrivateAttr, model_validator
 
 from metagpt.environment.base_env import ExtEnv, mark_as_readable, mark_as_writeable
+from metagpt.environment.stanford_town.compiled_maze import (
+    MAZE_CACHE_ROOT,
+    load_compiled_maze,
+)
 from metagpt.environment.stanford_town.env_space import (
     EnvAction,
     EnvActionType,
@@ -19,13 +24,16 @@ from metagpt.environment.stanford_town.env_space import (
     get_action_space,
     get_observation_space,
 )
-from metagpt.utils.common import read_csv_to_list, read_json_file
+from metagpt.environment.stanford_town.maze_navigator import MazeNavigator, Tile
 
 
 class StanfordTownExtEnv(ExtEnv):
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
     maze_asset_path: Optional[Path] = Field(default=None, description="the path to store maze assets")
+    maze_cache_root: Optional[Path] = Field(
+        default=MAZE_CACHE_ROOT, description="the path to cache the compiled maze assets, None to disable the cache"
+    )
     maze_width: int = Field(default=140, description="maze map width")
     maze_height: int = Field(default=100, description="maze map height")
     sq_tile_size: int = Field(default=32, description="the pixel height/width of a tile")
@@ -35,177 +43,45 @@ class StanfordTownExtEnv(ExtEnv):
     tiles: list[list[dict]] = Field(default=[])
     address_tiles: dict[str, set] = Field(default=dict())
     collision_maze: list[list] = Field(default=[])
+    collision_grid: Optional[np.ndarray] = Field(
+        default=None, exclude=True, description="bool occupancy grid of shape (height, width), True for collision"
+    )
+    tile_names: list[str] = Field(default=[], description="string table of the tile layers, 0 is the empty string")
+    sector_grid: Optional[np.ndarray] = Field(default=None, exclude=True, description="sector codes of the tiles")
+    arena_grid: Optional[np.ndarray] = Field(default=None, exclude=True, description="arena codes of the tiles")
+    game_object_grid: Optional[np.ndarray] = Field(
+        default=None, exclude=True, description="game object codes of the tiles"
+    )
+    event_grid: Optional[np.ndarray] = Field(default=None, exclude=True, description="number of events on each tile")
+
+    _navigator: Optional[MazeNavigator] = PrivateAttr(default=None)
 
     @model_validator(mode="before")
     @classmethod
     def _init_maze(cls, values):
         maze_asset_path = values["maze_asset_path"]
         assert maze_asset_path
-        maze_asset_path = Path(maze_asset_path)
-
-        maze_matrix_path = maze_asset_path.joinpath("matrix")
-        meta_info = read_json_file(maze_matrix_path.joinpath("maze_meta_info.json"))
+        maze = load_compiled_maze(Path(maze_asset_path), cache_root=values.get("maze_cache_root", MAZE_CACHE_ROOT))
 
-        maze_width = int(meta_info["maze_width"])
-        maze_height = int(meta_info["maze_height"])
+        maze_width = maze.maze_width
+        maze_height = maze.maze_height
         values["maze_width"] = maze_width
         values["maze_height"] = maze_height
-        values["sq_tile_size"] = int(meta_info["sq_tile_size"])
-        values["special_constraint"] = meta_info["special_constraint"]
-
-        # READING IN SPECIAL BLOCKS
-        # Special blocks are those that are colored in the Tiled map.
-        # Here is an example row for the arena block file:
-        # e.g, "25331, Double Studio, Studio, Bedroom 2, Painting"
-
-        blocks_folder = maze_matrix_path.joinpath("special_blocks")
-
-        _wb = blocks_folder.joinpath("world_blocks.csv")
-        wb_rows = read_csv_to_list(_wb, header=False)
-        wb = wb_rows[0][-1]
-
-        _sb = blocks_folder.joinpath("sector_blocks.csv")
-        sb_rows = read_csv_to_list(_sb, header=False)
-        sb_dict = dict()
-        for i in sb_rows:
-            sb_dict[i[0]] = i[-1]
-
-        _ab = blocks_folder.joinpath("arena_blocks.csv")
-        ab_rows = read_csv_to_list(_ab, header=False)
-        ab_dict = dict()
-        for i in ab_rows:
-            ab_dict[i[0]] = i[-1]
-
-        _gob = blocks_folder.joinpath("game_object_blocks.csv")
-        gob_rows = read_csv_to_list(_gob, header=False)
-        gob_dict = dict()
-        for i in gob_rows:
-            gob_dict[i[0]] = i[-1]
-
-        _slb = blocks_folder.joinpath("spawning_location_blocks.csv")
-        slb_rows = read_csv_to_list(_slb, header=False)
-        slb_dict = dict()
-        for i in slb_rows:
-            slb_dict[i[0]] = i[-1]
-
-        # [SECTION 3] Reading in the matrices
-        # This is your typical two dimensional matrices. It's made up of 0s and
-        # the number that represents the color block from the blocks folder.
-        maze_folder = maze_matrix_path.joinpath("maze")
-
-        _cm = maze_folder.joinpath("collision_maze.csv")
-        collision_maze_raw = read_csv_to_list(_cm, header=False)[0]
-        _sm = maze_folder.joinpath("sector_maze.csv")
-        sector_maze_raw = read_csv_to_list(_sm, header=False)[0]
-        _am = maze_folder.joinpath("arena_maze.csv")
-        arena_maze_raw = read_csv_to_list(_am, header=False)[0]
-        _gom = maze_folder.joinpath("game_object_maze.csv")
-        game_object_maze_raw = read_csv_to_list(_gom, header=False)[0]
-        _slm = maze_folder.joinpath("spawning_location_maze.csv")
-        spawning_location_maze_raw = read_csv_to_list(_slm, header=False)[0]
-
-        # Loading the maze. The mazes are taken directly from the json exports of
-        # Tiled maps. They should be in csv format.
-        # Importantly, they are "not" in a 2-d matrix format -- they are single
-        # row matrices with the length of width x height of the maze. So we need
-        # to convert here.
-        # example format: [['0', '0', ... '25309', '0',...], ['0',...]...]
-        # 25309 is the collision bar number right now.
-        collision_maze = []
-        sector_maze = []
-        arena_maze = []
-        game_object_maze = []
-        spawning_location_maze = []
-        for i in range(0, len(collision_maze_raw), maze_width):
-            tw = maze_width
-            collision_maze += [collision_maze_raw[i : i + tw]]
-            sector_maze += [sector_maze_raw[i : i + tw]]
-            arena_maze += [arena_maze_raw[i : i + tw]]
-            game_object_maze += [game_object_maze_raw[i : i + tw]]
-            spawning_location_maze += [spawning_location_maze_raw[i : i + tw]]
-        values["collision_maze"] = collision_maze
-
-        tiles = []
-        for i in range(maze_height):
-            row = []
-            for j in range(maze_width):
-                tile_details = dict()
-                tile_details["world"] = wb
-
-                tile_details["sector"] = ""
-                if sector_maze[i][j] in sb_dict:
-                    tile_details["sector"] = sb_dict[sector_maze[i][j]]
-
-                tile_details["arena"] = ""
-                if arena_maze[i][j] in ab_dict:
-                    tile_details["arena"] = ab_dict[arena_maze[i][j]]
-
-                tile_details["game_object"] = ""
-                if game_object_maze[i][j] in gob_dict:
-                    tile_details["game_object"] = gob_dict[game_object_maze[i][j]]
-
-                tile_details["spawning_location"] = ""
-                if spawning_location_maze[i][j] in slb_dict:
-                    tile_details["spawning_location"] = slb_dict[spawning_location_maze[i][j]]
-
-                tile_details["collision"] = False
-                if collision_maze[i][j] != "0":
-                    tile_details["collision"] = True
-
-                tile_details["events"] = set()
-
-                row += [tile_details]
-            tiles += [row]
+        values["sq_tile_size"] = maze.sq_tile_size
+        values["special_constraint"] = maze.special_constraint
+
+        values["collision_maze"] = maze.collision_maze
+        values["collision_grid"] = maze.layer("collision").astype(bool)
+        # integer-coded layers of the tile names, for the vectorized perception
+        values["tile_names"] = maze.tile_names
+        values["sector_grid"] = maze.layer("sector")
+        values["arena_grid"] = maze.layer("arena")
+        values["game_object_grid"] = maze.layer("game_object")
+
+        tiles = maze.build_tiles()
         values["tiles"] = tiles
-
-        # Each game object occupies an event in the tile. We are setting up the
-        # default event value here.
-        for i in range(maze_height):
-            for j in range(maze_width):
-                if tiles[i][j]["game_object"]:
-                    object_name = ":".join(
-                        [tiles[i][j]["world"], tiles[i][j]["sector"], tiles[i][j]["arena"], tiles[i][j]["game_object"]]
-                    )
-                    go_event = (object_name, None, None, None)
-                    tiles[i][j]["events"].add(go_event)
-
-        # Reverse tile access.
-        # <address_tiles> -- given a string address, we return a set of all
-        # tile coordinates belonging to that address (this is opposite of
-        # tiles that give you the string address given a coordinate). This is
-        # an optimization component for finding paths for the personas' movement.
-        # address_tiles['<spawn_loc>bedroom-2-a'] == {(58, 9)}
-        # address_tiles['double studio:recreation:pool table']
-        #   == {(29, 14), (31, 11), (30, 14), (32, 11), ...},
-        address_tiles = dict()
-        for i in range(maze_height):
-            for j in range(maze_width):
-                addresses = []
-                if tiles[i][j]["sector"]:
-                    add = f'{tiles[i][j]["world"]}:'
-                    add += f'{tiles[i][j]["sector"]}'
-                    addresses += [add]
-                if tiles[i][j]["arena"]:
-                    add = f'{tiles[i][j]["world"]}:'
-                    add += f'{tiles[i][j]["sector"]}:'
-                    add += f'{tiles[i][j]["arena"]}'
-                    addresses += [add]
-                if tiles[i][j]["game_object"]:
-                    add = f'{tiles[i][j]["world"]}:'
-                    add += f'{tiles[i][j]["sector"]}:'
-                    add += f'{tiles[i][j]["arena"]}:'
-                    add += f'{tiles[i][j]["game_object"]}'
-                    addresses += [add]
-                if tiles[i][j]["spawning_location"]:
-                    add = f'<spawn_loc>{tiles[i][j]["spawning_location"]}'
-                    addresses += [add]
-
-                for add in addresses:
-                    if add in address_tiles:
-                        address_tiles[add].add((j, i))
-                    else:
-                        address_tiles[add] = set([(j, i)])
-        values["address_tiles"] = address_tiles
+        values["event_grid"] = (maze.layer("game_object") > 0).astype(np.int32)  # the default events of game objects
+        values["address_tiles"] = maze.address_tiles
 
         values["action_space"] = get_action_space((maze_width, maze_height))
         values["observation_space"] = get_observation_space()
@@ -245,6 +121,10 @@ class StanfordTownExtEnv(ExtEnv):
             obs = self.get_tile_path(tile=obs_params.coord, level=obs_params.level)
         elif obs_type == EnvObsType.TILE_NBR:
             obs = self.get_nearby_tiles(tile=obs_params.coord, vision_r=obs_params.vision_radius)
+        elif obs_type == EnvObsType.PERCEPTION:
+            obs = self.perceive(
+                tile=obs_params.coord, vision_r=obs_params.vision_radius, att_bandwidth=obs_params.att_bandwidth
+            )
         return obs
 
     def step(self, action: EnvAction) -> tuple[dict[str, EnvObsValType], float, bool, bool, dict[str, Any]]:
@@ -287,6 +167,27 @@ class StanfordTownExtEnv(ExtEnv):
     def get_collision_maze(self) -> list:
         return self.collision_maze
 
+    @property
+    def navigator(self) -> MazeNavigator:
+        if self._navigator is None:
+            self._navigator = MazeNavigator(self.collision_grid)
+        return self._navigator
+
+    @mark_as_readable
+    def find_path(self, start: Iterable[int], end: Iterable[int]) -> list[Tile]:
+        """
+        Returns the shortest path of tiles from `start` to `end`, both included.
+        If `end` can't be reached, returns `[end]`.
+        """
+        return self.navigator.find_path(start, end)
+
+    @mark_as_readable
+    def find_closest_path(self, start: Iterable[int], targets: Iterable[Iterable[int]]) -> tuple[list[Tile], Tile]:
+        """
+        Returns the shortest path from `start` to the closest tile of `targets`, and that tile.
+        """
+        return self.navigator.find_closest_path(start, targets)
+
     @mark_as_readable
     def get_address_tiles(self) -> dict:
         return self.address_tiles
@@ -392,6 +293,86 @@ class StanfordTownExtEnv(ExtEnv):
                 nearby_tiles += [(i, j)]
         return nearby_tiles
 
+    def _vision_window(self, tile: tuple[int, int], vision_r: int) -> tuple[slice, slice]:
+        """the (y, x) slices of the tiles returned by `get_nearby_tiles`"""
+        x, y = int(tile[0]), int(tile[1])
+        left_end = max(0, x - vision_r)
+        right_end = min(x + vision_r + 1, self.maze_width - 1)
+        top_end = max(0, y - vision_r)
+        bottom_end = min(y + vision_r + 1, self.maze_height - 1)
+        return slice(top_end, bottom_end), slice(left_end, right_end)
+
+    @mark_as_readable
+    def perceive(self, tile: tuple[int, int], vision_r: int, att_bandwidth: int = 0) -> dict[str, Any]:
+        """
+        Everything a persona perceives at the tile within its vision radius, with one slice of the tile layers
+        instead of an `access_tile` and a `get_tile_path` call per nearby tile.
+
+        INPUT:
+          tile: The tile coordinate of our interest in (x, y) form.
+          vision_r: The radius of the persona's vision.
+          att_bandwidth: if positive, only the closest `att_bandwidth` events, sorted by distance. The tiles with
+            events are visited from the closest one until enough events are met, so the cost doesn't grow with the
+            number of events in view, and an event extended across several tiles is at the distance of the
+            closest one.
+        OUTPUT:
+          A dictionary of
+            nearby_tiles: the same tiles as `get_nearby_tiles`.
+            addresses: the distinct (world, sector, arena, game_object) of the nearby tiles, in the order they are met.
+            curr_arena_path: the arena address of the tile.
+            events: [distance, event] of the nearby tiles in the same arena as the tile, each event once.
+        """
+        x, y = int(tile[0]), int(tile[1])
+        ys, xs = self._vision_window(tile, vision_r)
+        world = self.tiles[y][x]["world"]
+        # transpose the (y, x) window, so the flattened tiles are in the x-major order of `get_nearby_tiles`
+        sectors = self.sector_grid[ys, xs].T
+        arenas = self.arena_grid[ys, xs].T
+        game_objects = self.game_object_grid[ys, xs].T
+        window_x, window_y = np.meshgrid(np.arange(xs.start, xs.stop), np.arange(ys.start, ys.stop), indexing="ij")
+
+        n_names = len(self.tile_names)
+        keys = (sectors.ravel().astype(np.int64) * n_names + arenas.ravel()) * n_names + game_objects.ravel()
+        _, first = np.unique(keys, return_index=True)
+        first.sort()
+        addresses = [
+            (world, self.tile_names[sector], self.tile_names[arena], self.tile_names[game_object])
+            for sector, arena, game_object in zip(
+                sectors.ravel()[first].tolist(), arenas.ravel()[first].tolist(), game_objects.ravel()[first].tolist()
+            )
+        ]
+
+        in_arena = (sectors == self.sector_grid[y, x]) & (arenas == self.arena_grid[y, x])
+        with_events = in_arena & (self.event_grid[ys, xs].T > 0)
+        event_xs, event_ys = window_x[with_events], window_y[with_events]
+        events = []
+        seen = set()
+        if att_bandwidth > 0:
+            dists = np.hypot(event_xs - x, event_ys - y)
+            for idx in np.argsort(dists, kind="stable").tolist():  # ties in the x-major order
+                ex, ey = int(event_xs[idx]), int(event_ys[idx])
+                for event in self.tiles[ey][ex]["events"]:
+                    if event not in seen:
+                        events.append([float(dists[idx]), event])
+                        seen.add(event)
+                if len(events) >= att_bandwidth:
+                    break
+            events = events[:att_bandwidth]
+        else:
+            for ex, ey in zip(event_xs.tolist(), event_ys.tolist()):
+                dist = math.dist([ex, ey], [x, y])
+                for event in self.tiles[ey][ex]["events"]:
+                    if event not in seen:
+                        events.append([dist, event])
+                        seen.add(event)
+
+        return {
+            "nearby_tiles": list(zip(window_x.ravel().tolist(), window_y.ravel().tolist())),
+            "addresses": addresses,
+            "curr_arena_path": self.get_tile_path(tile, level="arena"),
+            "events": events,
+        }
+
     @mark_as_writeable
     def add_event_from_tile(self, curr_event: tuple[str], tile: tuple[int, int]) -> None:
         """
@@ -406,6 +387,7 @@ class StanfordTownExtEnv(ExtEnv):
           None
         """
         self.tiles[tile[1]][tile[0]]["events"].add(curr_event)
+        self._update_event_count(tile)
 
     @mark_as_writeable
     def remove_event_from_tile(self, curr_event: tuple[str], tile: tuple[int, int]) -> None:
@@ -424,6 +406,7 @@ class StanfordTownExtEnv(ExtEnv):
         for event in curr_tile_ev_cp:
             if event == curr_event:
                 self.tiles[tile[1]][tile[0]]["events"].remove(event)
+        self._update_event_count(tile)
 
     @mark_as_writeable
     def turn_event_from_tile_idle(self, curr_event: tuple[str], tile: tuple[int, int]) -> None:
@@ -433,6 +416,7 @@ class StanfordTownExtEnv(ExtEnv):
                 self.tiles[tile[1]][tile[0]]["events"].remove(event)
                 new_event = (event[0], None, None, None)
                 self.tiles[tile[1]][tile[0]]["events"].add(new_event)
+        self._update_event_count(tile)
 
     @mark_as_writeable
     def remove_subject_events_from_tile(self, subject: str, tile: tuple[int, int]) -> None:
@@ -449,3 +433,7 @@ class StanfordTownExtEnv(ExtEnv):
         for event in curr_tile_ev_cp:
             if event[0] == subject:
                 self.tiles[tile[1]][tile[0]]["events"].remove(event)
+        self._update_event_count(tile)
+
+    def _update_event_count(self, tile: tuple[int, int]):
+        self.event_grid[tile[1], tile[0]] = len(self.tiles[tile[1]][tile[0]]["events"])
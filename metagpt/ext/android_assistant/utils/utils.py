@@ -2,9 +2,13 @@
 # -*- coding: utf-8 -*-
 # @Desc   :
 
+import hashlib
+import math
 import re
+from collections import OrderedDict, defaultdict
+from io import BytesIO
 from pathlib import Path
-from typing import Union
+from typing import IO, Union
 from xml.etree.ElementTree import Element, iterparse
 
 import cv2
@@ -46,13 +50,54 @@ def get_id_from_element(elem: Element) -> str:
     return elem_id
 
 
-def traverse_xml_tree(xml_path: Path, elem_list: list[AndroidElement], attrib: str, add_index=False):
+def bbox_center(bbox: tuple[tuple[int, int], tuple[int, int]]) -> tuple[int, int]:
+    return (bbox[0][0] + bbox[1][0]) // 2, (bbox[0][1] + bbox[1][1]) // 2
+
+
+class ElementGridIndex:
+    """A uniform grid over element centers with cells of `dist` size, so that a lookup of the elements within `dist`
+    only checks the neighbour cells instead of every element on the screen."""
+
+    def __init__(self, dist: float):
+        self.dist = dist
+        self.cell_size = max(int(dist), 1)
+        self.reach = math.ceil(dist / self.cell_size)
+        self.cells: dict[tuple[int, int], list[tuple[int, int]]] = defaultdict(list)
+
+    def _cell(self, center: tuple[int, int]) -> tuple[int, int]:
+        return center[0] // self.cell_size, center[1] // self.cell_size
+
+    def add(self, center: tuple[int, int]):
+        self.cells[self._cell(center)].append(center)
+
+    def has_close(self, center: tuple[int, int]) -> bool:
+        cx, cy = self._cell(center)
+        max_sq_dist = self.dist**2
+        for gx in range(cx - self.reach, cx + self.reach + 1):
+            for gy in range(cy - self.reach, cy + self.reach + 1):
+                for x, y in self.cells.get((gx, gy), ()):
+                    if (center[0] - x) ** 2 + (center[1] - y) ** 2 <= max_sq_dist:
+                        return True
+        return False
+
+
+def _traverse_xml_tree(
+    source: Union[Path, IO[bytes]], elem_lists: dict[str, list[AndroidElement]], add_index: bool = False
+):
+    """collect the elements of every attrib in `elem_lists` in a single pass over the xml"""
     path = []
     extra_config = config.extra
-    for event, elem in iterparse(str(xml_path), ["start", "end"]):
+    indexes = {}
+    for attrib, elem_list in elem_lists.items():
+        indexes[attrib] = ElementGridIndex(extra_config.get("min_dist", 30))
+        for e in elem_list:
+            indexes[attrib].add(bbox_center(e.bbox))
+
+    for event, elem in iterparse(source if not isinstance(source, Path) else str(source), ["start", "end"]):
         if event == "start":
             path.append(elem)
-            if attrib in elem.attrib and elem.attrib[attrib] == "true":
+            matched_attribs = [attrib for attrib in elem_lists if elem.attrib.get(attrib) == "true"]
+            if matched_attribs:
                 parent_prefix = ""
                 if len(path) > 1:
                     parent_prefix = get_id_from_element(path[-2])
@@ -65,47 +110,57 @@ def traverse_xml_tree(xml_path: Path, elem_list: list[AndroidElement], attrib: s
                     elem_id = parent_prefix + "_" + elem_id
                 if add_index:
                     elem_id += f"_{elem.attrib['index']}"
-                close = False
-                for e in elem_list:
-                    bbox = e.bbox
-                    center_ = (bbox[0][0] + bbox[1][0]) // 2, (bbox[0][1] + bbox[1][1]) // 2
-                    dist = (abs(center[0] - center_[0]) ** 2 + abs(center[1] - center_[1]) ** 2) ** 0.5
-                    if dist <= extra_config.get("min_dist", 30):
-                        close = True
-                        break
-                if not close:
-                    elem_list.append(AndroidElement(uid=elem_id, bbox=((x1, y1), (x2, y2)), attrib=attrib))
+                for attrib in matched_attribs:
+                    if indexes[attrib].has_close(center):
+                        continue
+                    indexes[attrib].add(center)
+                    elem_lists[attrib].append(AndroidElement(uid=elem_id, bbox=((x1, y1), (x2, y2)), attrib=attrib))
 
         if event == "end":
             path.pop()
 
 
+def traverse_xml_tree(xml_path: Path, elem_list: list[AndroidElement], attrib: str, add_index=False):
+    _traverse_xml_tree(Path(xml_path), {attrib: elem_list}, add_index)
+
+
+# parsed element lists keyed by the screen xml hash, repeated observations of the same screen skip re-parsing
+_ELEM_LIST_CACHE: OrderedDict[tuple, list[AndroidElement]] = OrderedDict()
+ELEM_LIST_CACHE_SIZE = 64
+
+
 def elem_list_from_xml_tree(xml_path: Path, useless_list: list[str], min_dist: int) -> list[AndroidElement]:
+    xml_content = Path(xml_path).read_bytes()
+    useless_set = set(useless_list)
+    cache_key = (
+        hashlib.sha256(xml_content).hexdigest(),
+        frozenset(useless_set),
+        min_dist,
+        config.extra.get("min_dist", 30),
+    )
+    if cache_key in _ELEM_LIST_CACHE:
+        _ELEM_LIST_CACHE.move_to_end(cache_key)
+        # copies, the callers may modify the list or its elements
+        return [elem.model_copy() for elem in _ELEM_LIST_CACHE[cache_key]]
+
     clickable_list = []
     focusable_list = []
-    traverse_xml_tree(xml_path, clickable_list, "clickable", True)
-    traverse_xml_tree(xml_path, focusable_list, "focusable", True)
-    elem_list = []
+    _traverse_xml_tree(BytesIO(xml_content), {"clickable": clickable_list, "focusable": focusable_list}, True)
+    clickable_index = ElementGridIndex(min_dist)
     for elem in clickable_list:
-        if elem.uid in useless_list:
-            continue
-        elem_list.append(elem)
+        clickable_index.add(bbox_center(elem.bbox))
+
+    elem_list = [elem for elem in clickable_list if elem.uid not in useless_set]
     for elem in focusable_list:
-        if elem.uid in useless_list:
+        if elem.uid in useless_set:
             continue
-        bbox = elem.bbox
-        center = (bbox[0][0] + bbox[1][0]) // 2, (bbox[0][1] + bbox[1][1]) // 2
-        close = False
-        for e in clickable_list:
-            bbox = e.bbox
-            center_ = (bbox[0][0] + bbox[1][0]) // 2, (bbox[0][1] + bbox[1][1]) // 2
-            dist = (abs(center[0] - center_[0]) ** 2 + abs(center[1] - center_[1]) ** 2) ** 0.5
-            if dist <= min_dist:
-                close = True
-                break
-        if not close:
+        if not clickable_index.has_close(bbox_center(elem.bbox)):
             elem_list.append(elem)
-    return elem_list
+
+    _ELEM_LIST_CACHE[cache_key] = elem_list
+    if len(_ELEM_LIST_CACHE) > ELEM_LIST_CACHE_SIZE:
+        _ELEM_LIST_CACHE.popitem(last=False)
+    return [elem.model_copy() for elem in elem_list]
 
 
 def draw_bbox_multi(
@@ -2,7 +2,9 @@
 # -*- coding: utf-8 -*-
 # @Desc   : Integration Reflect Action
 
+import json
 import re
+from typing import Union
 
 from metagpt.ext.stanford_town.actions.st_action import STAction
 from metagpt.logs import logger
@@ -135,6 +137,60 @@ class AgentEventTriple(STAction):
         return output
 
 
+# Run GPT Prompt Event Triple of several actions at once
+class AgentEventTripleBatch(STAction):
+    name: str = "AgentEventTripleBatch"
+
+    def _func_validate(self, llm_resp: Union[str, list], prompt: str) -> bool:
+        try:
+            self._func_cleanup(llm_resp, prompt)
+            return True
+        except Exception:
+            return False
+
+    def _func_cleanup(self, llm_resp: Union[str, list], prompt: str = "") -> list[list[str]]:
+        if isinstance(llm_resp, str):
+            llm_resp = json.loads(llm_resp)
+        pairs = []
+        for pair in llm_resp:
+            if isinstance(pair, str):
+                pair = pair.strip("() ").split(",")
+            pair = [str(i).strip() for i in pair][-2:]
+            if len(pair) != 2:
+                raise ValueError(f"not a (predicate, object) pair: {pair}")
+            pairs.append(pair)
+        return pairs
+
+    def _func_fail_default_resp(self) -> str:
+        pass
+
+    async def run(self, statements: list[str], role: "STRole", verbose=False) -> Union[list[tuple], bool]:
+        """The triples of `statements` with one llm call, False if the response doesn't match them"""
+
+        def create_prompt_input(statements, role):
+            actions = []
+            for count, statement in enumerate(statements):
+                if "(" in statement:
+                    statement = statement.split("(")[-1].split(")")[0]
+                actions.append(f"{count + 1}. {role.scratch.name} is {statement}.")
+            prompt_input = [role.scratch.name, "\n".join(actions)]
+            return prompt_input
+
+        prompt_input = create_prompt_input(statements, role)
+        prompt = self.generate_prompt_with_tmpl_filename(prompt_input, "generate_event_triple_batch_v1.txt")
+
+        example_output = '[["eat", "breakfast"], ["brew", "coffee"]]'
+        special_instruction = (
+            f"The output should ONLY contain a list of {len(statements)} [predicate, object] pairs, one per input."
+        )
+        output = await self._run_gpt35(prompt, example_output, special_instruction, retry=1)
+        if not output or len(output) != len(statements):
+            return False
+        output = [(role.scratch.name, predicate, obj) for predicate, obj in output]
+        logger.info(f"Role: {role.name} Action: {self.cls_name} output: {output}")
+        return output
+
+
 # Run GPT Prompt Event Poignancy
 class AgentEventPoignancy(STAction):
     name: str = "AgentEventPoignancy"
@@ -171,6 +227,48 @@ class AgentEventPoignancy(STAction):
         return output
 
 
+# Run GPT Prompt Event Poignancy of several events at once
+class AgentEventPoignancyBatch(STAction):
+    name: str = "AgentEventPoignancyBatch"
+
+    def _func_validate(self, llm_resp: Union[str, list], prompt: str) -> bool:
+        try:
+            self._func_cleanup(llm_resp, prompt)
+            return True
+        except Exception:
+            return False
+
+    def _func_cleanup(self, llm_resp: Union[str, list], prompt: str = "") -> list[int]:
+        if isinstance(llm_resp, str):
+            llm_resp = json.loads(llm_resp)
+        return [int(score) for score in llm_resp]
+
+    def _func_fail_default_resp(self) -> str:
+        pass
+
+    async def run(self, role: "STRole", statements: list[str], verbose=False) -> Union[list[int], bool]:
+        """The poignancy of each of `statements` with one llm call, False if the response doesn't match them"""
+
+        def create_prompt_input(role: "STRole", statements: list[str]):
+            events = "\n".join(f"{count + 1}. {statement}" for count, statement in enumerate(statements))
+            prompt_input = [role.scratch.name, role.scratch.get_str_iss(), role.scratch.name, events]
+            return prompt_input
+
+        prompt_input = create_prompt_input(role, statements)
+        prompt = self.generate_prompt_with_tmpl_filename(prompt_input, "poignancy_event_batch_v1.txt")
+
+        example_output = "[5, 3]"
+        special_instruction = (
+            f"The output should ONLY contain a list of {len(statements)} integer values on the scale of 1 to 10, "
+            "one per event."
+        )
+        output = await self._run_gpt35(prompt, example_output, special_instruction, retry=1)
+        if not output or len(output) != len(statements):
+            return False
+        logger.info(f"Role: {role.name} Action: {self.cls_name} output: {output}")
+        return output
+
+
 # Run GPT Prompt Chat Poignancy
 class AgentChatPoignancy(STAction):
     name: str = "AgentChatPoignancy"
@@ -2,7 +2,6 @@
 # -*- coding: utf-8 -*-
 # @Desc   : StanfordTown Action
 import json
-import time
 from abc import abstractmethod
 from pathlib import Path
 from typing import Any, Optional, Union
@@ -10,6 +9,7 @@ from typing import Any, Optional, Union
 from metagpt.actions.action import Action
 from metagpt.config2 import config
 from metagpt.ext.stanford_town.utils.const import PROMPTS_DIR
+from metagpt.ext.stanford_town.utils.llm_trace import backoff, get_llm_trace
 from metagpt.logs import logger
 
 
@@ -57,6 +57,9 @@ class STAction(Action):
         return prompt.strip()
 
     async def _aask(self, prompt: str) -> str:
+        trace = get_llm_trace()
+        if trace:
+            return await trace.aask(prompt, self.llm.aask)
         return await self.llm.aask(prompt)
 
     async def _run_gpt35_max_tokens(self, prompt: str, max_tokens: int = 50, retry: int = 3):
@@ -74,7 +77,7 @@ class STAction(Action):
                     return self._func_cleanup(llm_resp, prompt)
             except Exception as exp:
                 logger.warning(f"Action: {self.cls_name} _run_gpt35_max_tokens exp: {exp}")
-                time.sleep(5)
+                await backoff(5)
         return self.fail_default_resp
 
     async def _run_gpt35(
@@ -98,7 +101,7 @@ class STAction(Action):
                     return self._func_cleanup(llm_resp, prompt)
             except Exception as exp:
                 logger.warning(f"Action: {self.cls_name} _run_gpt35 exp: {exp}")
-                time.sleep(5)  # usually avoid `Rate limit`
+                await backoff(5)  # usually avoid `Rate limit`
         return False
 
     async def _run_gpt35_wo_extra_prompt(self, prompt: str, retry: int = 3) -> str:
@@ -111,7 +114,7 @@ class STAction(Action):
                     return self._func_cleanup(llm_resp, prompt)
             except Exception as exp:
                 logger.warning(f"Action: {self.cls_name} _run_gpt35_wo_extra_prompt exp: {exp}")
-                time.sleep(5)  # usually avoid `Rate limit`
+                await backoff(5)  # usually avoid `Rate limit`
         return self.fail_default_resp
 
     async def run(self, *args, **kwargs):
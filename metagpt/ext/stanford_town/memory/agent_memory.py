@@ -2,17 +2,49 @@
 # -*- coding: utf-8 -*-
 # @Desc   : BasicMemory,AgentMemory实现
 
+import json
+import os
+from collections import Counter, deque
 from datetime import datetime
+from itertools import chain, islice
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Optional
 
+import numpy as np
 from pydantic import Field, field_serializer, model_validator
 
+from metagpt.const import MESSAGE_ROUTE_TO_ALL
 from metagpt.logs import logger
 from metagpt.memory.memory import Memory
 from metagpt.schema import Message
 from metagpt.utils.common import read_json_file, write_json_file
 
+# the compact format written by `AgentMemory.save`, `nodes.json`/`embeddings.json` of GA are still loaded
+MEMORY_META_FILENAME = "memory_meta.json"
+NODES_FILENAME = "nodes.jsonl"
+EMBEDDINGS_FILENAME = "embeddings.npy"
+EMBEDDING_KEYS_FILENAME = "embedding_keys.jsonl"
+MEMORY_FORMAT_VERSION = 1
+
+NODE_RECORD_FIELDS = {
+    "memory_id",
+    "memory_count",
+    "type_count",
+    "memory_type",
+    "depth",
+    "created",
+    "expiration",
+    "subject",
+    "predicate",
+    "object",
+    "description",
+    "embedding_key",
+    "poignancy",
+    "keywords",
+    "filling",
+    "cause_by",
+}
+
 
 class BasicMemory(Message):
     """
@@ -70,9 +102,7 @@ class BasicMemory(Message):
         node_id = self.memory_id
         basic_mem_obj = self.model_dump(
             include=[
-                "node_count",
                 "type_count",
-                "type",
                 "depth",
                 "created",
                 "expiration",
@@ -87,42 +117,169 @@ class BasicMemory(Message):
                 "cause_by",
             ]
         )
+        basic_mem_obj["node_count"] = self.memory_count
+        basic_mem_obj["type"] = self.memory_type
 
         memory_dict[node_id] = basic_mem_obj
         return memory_dict
 
+    def to_record(self) -> dict:
+        """a line of `nodes.jsonl`"""
+        return self.model_dump(include=NODE_RECORD_FIELDS)
+
+    @classmethod
+    def from_record(cls, record: dict) -> "BasicMemory":
+        """the inverse of `to_record`, without validation"""
+        for field in ("created", "expiration"):
+            if record[field]:
+                record[field] = datetime.fromisoformat(record[field])
+        return cls.model_construct(
+            content="", send_to={MESSAGE_ROUTE_TO_ALL}, last_accessed=record["created"], **record
+        )
+
+
+def normalize_keyword(keyword: str) -> str:
+    """keywords are indexed and looked up case-insensitively"""
+    return keyword.lower()
+
 
 class AgentMemory(Memory):
     """
-    GA中主要存储三种JSON
+    GA中主要存储三种JSON，由`load_json`/`save_json`读写
     1. embedding.json (Dict embedding_key:embedding)
     2. Node.json (Dict Node_id:Node)
     3. kw_strength.json
+    `save`/`load` use a compact format instead, see `save`.
+
+    `storage` keeps the nodes in insertion order, `nodes` maps memory_id to node, while the typed lists and the
+    keyword indexes are deques with the newest node first, so an insertion is O(1) and the latest n nodes are read
+    without walking the whole history.
     """
 
     storage: list[BasicMemory] = []  # 重写Storage，存储BasicMemory所有节点
-    event_list: list[BasicMemory] = []  # 存储event记忆
-    thought_list: list[BasicMemory] = []  # 存储thought记忆
-    chat_list: list[BasicMemory] = []  # chat-related memory
+    nodes: dict[str, BasicMemory] = Field(default_factory=dict, exclude=True)  # memory_id -> node
+    event_list: deque[BasicMemory] = Field(default_factory=deque)  # 存储event记忆，最新的在前
+    thought_list: deque[BasicMemory] = Field(default_factory=deque)  # 存储thought记忆，最新的在前
+    chat_list: deque[BasicMemory] = Field(default_factory=deque)  # chat-related memory, newest first
+
+    # normalized keyword -> nodes, newest first
+    event_keywords: dict[str, deque[BasicMemory]] = dict()  # 存储keywords
+    thought_keywords: dict[str, deque[BasicMemory]] = dict()
+    chat_keywords: dict[str, deque[BasicMemory]] = dict()
 
-    event_keywords: dict[str, list[BasicMemory]] = dict()  # 存储keywords
-    thought_keywords: dict[str, list[BasicMemory]] = dict()
-    chat_keywords: dict[str, list[BasicMemory]] = dict()
+    # the (s, p, o) summaries of the latest `event_retention` events, rolled on each new event
+    event_retention: int = 0
+    latest_event_summaries: Counter = Field(default_factory=Counter, exclude=True)
 
     kw_strength_event: dict[str, int] = dict()
     kw_strength_thought: dict[str, int] = dict()
 
     memory_saved: Optional[Path] = Field(default=None)
-    embeddings: dict[str, list[float]] = dict()
+    embeddings: dict[str, list[float]] = dict()  # rows of a memory-mapped matrix once loaded from `save`
+
+    @model_validator(mode="after")
+    def rebuild_nodes(self) -> "AgentMemory":
+        if not self.nodes:
+            self.nodes = {node.memory_id: node for node in self.storage if node.memory_id}
+        return self
 
     def set_mem_path(self, memory_saved: Path):
         self.memory_saved = memory_saved
         self.load(memory_saved)
 
     def save(self, memory_saved: Path):
+        """Save the memory in the compact format, appending to the files of a previous save of this memory.
+
+        - nodes.jsonl: one `BasicMemory.to_record` per line, in insertion order
+        - embeddings.npy: the float32 embedding matrix, with its row keys in embedding_keys.jsonl
+        - kw_strength.json: the same as GA
+        - memory_meta.json: the counts and byte sizes of the committed lines, written last, so the lines of an
+          interrupted save are dropped by the next one
+        """
+        memory_saved = Path(memory_saved)
+        memory_saved.mkdir(parents=True, exist_ok=True)
+        meta = self._read_meta(memory_saved)
+        saved_nodes = meta.get("nodes", 0)
+        if not (0 < saved_nodes <= len(self.storage) and self.storage[saved_nodes - 1].memory_id == meta["last_id"]):
+            meta, saved_nodes = {}, 0  # not a previous save of this memory, rewrite it
+        saved_embeddings = min(meta.get("embeddings", 0), len(self.embeddings))
+
+        nodes_bytes = self._append_lines(
+            memory_saved / NODES_FILENAME,
+            meta.get("nodes_bytes", 0),
+            (node.to_record() for node in self.storage[saved_nodes:]),
+        )
+        new_keys = list(self.embeddings)[saved_embeddings:]
+        keys_bytes = self._append_lines(memory_saved / EMBEDDING_KEYS_FILENAME, meta.get("keys_bytes", 0), new_keys)
+        if new_keys:
+            self._save_embeddings(memory_saved / EMBEDDINGS_FILENAME, saved_embeddings, new_keys)
+        self._save_kw_strength(memory_saved)
+
+        meta = {
+            "version": MEMORY_FORMAT_VERSION,
+            "nodes": len(self.storage),
+            "nodes_bytes": nodes_bytes,
+            "last_id": self.storage[-1].memory_id if self.storage else None,
+            "embeddings": len(self.embeddings),
+            "keys_bytes": keys_bytes,
+        }
+        write_json_file(memory_saved / MEMORY_META_FILENAME, meta)
+
+    @staticmethod
+    def _read_meta(memory_saved: Path) -> dict:
+        meta_file = memory_saved / MEMORY_META_FILENAME
+        if not meta_file.exists():
+            return {}
+        meta = read_json_file(meta_file)
+        return meta if meta.get("version") == MEMORY_FORMAT_VERSION else {}
+
+    @staticmethod
+    def _append_lines(filename: Path, committed_bytes: int, records: Iterable) -> int:
+        """Append json lines after the first `committed_bytes` bytes of the file, return the new size"""
+        with open(filename, "ab") as writer:
+            writer.truncate(committed_bytes)
+            writer.writelines(json.dumps(record).encode("utf-8") + b"\n" for record in records)
+            return writer.tell()
+
+    def _save_embeddings(self, filename: Path, saved: int, new_keys: list[str]):
+        """Write the saved rows followed by the new ones into a new npy file, which replaces the old one, so the
+        memory-mapped rows of the old file stay valid"""
+        new_rows = np.asarray([self.embeddings[key] for key in new_keys], dtype=np.float32)
+        tmp_file = filename.with_suffix(".tmp.npy")
+        matrix = np.lib.format.open_memmap(
+            tmp_file, mode="w+", dtype=np.float32, shape=(saved + len(new_rows), new_rows.shape[1])
+        )
+        if saved:
+            matrix[:saved] = np.load(filename, mmap_mode="r")[:saved]
+        matrix[saved:] = new_rows
+        matrix.flush()
+        del matrix
+        os.replace(tmp_file, filename)
+
+    def load(self, memory_saved: Path):
+        """Load the compact format written by `save`, or import the JSON files of GA"""
+        memory_saved = Path(memory_saved)
+        meta = self._read_meta(memory_saved)
+        if not meta:
+            self.load_json(memory_saved)
+            return
+
+        self.embeddings = {}
+        if meta["embeddings"]:
+            with open(memory_saved / EMBEDDING_KEYS_FILENAME, "r", encoding="utf-8") as reader:
+                keys = [json.loads(line) for line in islice(reader, meta["embeddings"])]
+            matrix = np.load(memory_saved / EMBEDDINGS_FILENAME, mmap_mode="r").view(np.ndarray)
+            self.embeddings = dict(zip(keys, matrix))
+
+        with open(memory_saved / NODES_FILENAME, "r", encoding="utf-8") as reader:
+            for line in islice(reader, meta["nodes"]):
+                self.add(BasicMemory.from_record(json.loads(line)))
+        self._load_kw_strength(memory_saved)
+
+    def save_json(self, memory_saved: Path):
         """
         将MemoryBasic类存储为Nodes.json形式。复现GA中的Kw Strength.json形式
-        这里添加一个路径即可
+        这里添加一个路径即可，用于导出GA兼容的checkpoint
         TODO 这里在存储时候进行倒序存储，之后需要验证（test_memory通过）
         """
         memory_json = dict()
@@ -131,14 +288,11 @@ class AgentMemory(Memory):
             memory_node = memory_node.save_to_dict()
             memory_json.update(memory_node)
         write_json_file(memory_saved.joinpath("nodes.json"), memory_json)
-        write_json_file(memory_saved.joinpath("embeddings.json"), self.embeddings)
+        embeddings = {key: np.asarray(value).tolist() for key, value in self.embeddings.items()}
+        write_json_file(memory_saved.joinpath("embeddings.json"), embeddings)
+        self._save_kw_strength(memory_saved)
 
-        strength_json = dict()
-        strength_json["kw_strength_event"] = self.kw_strength_event
-        strength_json["kw_strength_thought"] = self.kw_strength_thought
-        write_json_file(memory_saved.joinpath("kw_strength.json"), strength_json)
-
-    def load(self, memory_saved: Path):
+    def load_json(self, memory_saved: Path):
         """
         将GA的JSON解析，填充到AgentMemory类之中
         """
@@ -171,6 +325,15 @@ class AgentMemory(Memory):
             if node_type == "chat":
                 self.add_chat(created, expiration, s, p, o, description, keywords, poignancy, embedding_pair, filling)
 
+        self._load_kw_strength(memory_saved)
+
+    def _save_kw_strength(self, memory_saved: Path):
+        strength_json = dict()
+        strength_json["kw_strength_event"] = self.kw_strength_event
+        strength_json["kw_strength_thought"] = self.kw_strength_thought
+        write_json_file(memory_saved.joinpath("kw_strength.json"), strength_json)
+
+    def _load_kw_strength(self, memory_saved: Path):
         strength_keywords_load = read_json_file(memory_saved.joinpath("kw_strength.json"))
         if strength_keywords_load["kw_strength_event"]:
             self.kw_strength_event = strength_keywords_load["kw_strength_event"]
@@ -182,18 +345,29 @@ class AgentMemory(Memory):
         Add a new message to storage, while updating the index
         重写add方法，修改原有的Message类为BasicMemory类，并添加不同的记忆类型添加方式
         """
-        if memory_basic.memory_id in self.storage:
-            return
+        if memory_basic.memory_id:
+            if memory_basic.memory_id in self.nodes:
+                return
+            self.nodes[memory_basic.memory_id] = memory_basic
         self.storage.append(memory_basic)
         if memory_basic.memory_type == "chat":
-            self.chat_list[0:0] = [memory_basic]
-            return
-        if memory_basic.memory_type == "thought":
-            self.thought_list[0:0] = [memory_basic]
-            return
-        if memory_basic.memory_type == "event":
-            self.event_list[0:0] = [memory_basic]
-            return
+            self.chat_list.appendleft(memory_basic)
+            self._index_keywords(self.chat_keywords, memory_basic)
+        elif memory_basic.memory_type == "thought":
+            self.thought_list.appendleft(memory_basic)
+            self._index_keywords(self.thought_keywords, memory_basic)
+        elif memory_basic.memory_type == "event":
+            self.event_list.appendleft(memory_basic)
+            self._index_keywords(self.event_keywords, memory_basic)
+            self._roll_latest_events(memory_basic)
+
+    @staticmethod
+    def _index_keywords(keyword_index: dict[str, deque[BasicMemory]], memory_node: BasicMemory):
+        for kw in {normalize_keyword(kw) for kw in memory_node.keywords}:
+            keyword_index.setdefault(kw, deque()).appendleft(memory_node)
+
+    def get_node(self, memory_id: str) -> Optional[BasicMemory]:
+        return self.nodes.get(memory_id)
 
     def add_chat(
         self, created, expiration, s, p, o, content, keywords, poignancy, embedding_pair, filling, cause_by=""
@@ -202,7 +376,7 @@ class AgentMemory(Memory):
         调用add方法，初始化chat，在创建的时候就需要调用embedding函数
         """
         memory_count = len(self.storage) + 1
-        type_count = len(self.thought_list) + 1
+        type_count = len(self.chat_list) + 1
         memory_type = "chat"
         memory_id = f"node_{str(memory_count)}"
         depth = 1
@@ -226,13 +400,6 @@ class AgentMemory(Memory):
             cause_by=cause_by,
         )
 
-        keywords = [i.lower() for i in keywords]
-        for kw in keywords:
-            if kw in self.chat_keywords:
-                self.chat_keywords[kw][0:0] = [memory_node]
-            else:
-                self.chat_keywords[kw] = [memory_node]
-
         self.add(memory_node)
 
         self.embeddings[embedding_pair[0]] = embedding_pair[1]
@@ -250,7 +417,7 @@ class AgentMemory(Memory):
 
         try:
             if filling:
-                depth_list = [memory_node.depth for memory_node in self.storage if memory_node.memory_id in filling]
+                depth_list = [self.nodes[memory_id].depth for memory_id in filling if memory_id in self.nodes]
                 depth += max(depth_list)
         except Exception as exp:
             logger.warning(f"filling init occur {exp}")
@@ -274,14 +441,8 @@ class AgentMemory(Memory):
             filling=filling,
         )
 
-        keywords = [i.lower() for i in keywords]
-        for kw in keywords:
-            if kw in self.thought_keywords:
-                self.thought_keywords[kw][0:0] = [memory_node]
-            else:
-                self.thought_keywords[kw] = [memory_node]
-
         self.add(memory_node)
+        keywords = [normalize_keyword(i) for i in keywords]
 
         if f"{p} {o}" != "is idle":
             for kw in keywords:
@@ -324,14 +485,8 @@ class AgentMemory(Memory):
             filling=filling,
         )
 
-        keywords = [i.lower() for i in keywords]
-        for kw in keywords:
-            if kw in self.event_keywords:
-                self.event_keywords[kw][0:0] = [memory_node]
-            else:
-                self.event_keywords[kw] = [memory_node]
-
         self.add(memory_node)
+        keywords = [normalize_keyword(i) for i in keywords]
 
         if f"{p} {o}" != "is idle":
             for kw in keywords:
@@ -343,36 +498,57 @@ class AgentMemory(Memory):
         self.embeddings[embedding_pair[0]] = embedding_pair[1]
         return memory_node
 
+    def get_latest_events(self, retention: int) -> list[BasicMemory]:
+        """the latest `retention` events, newest first"""
+        return list(islice(self.event_list, retention))
+
+    def set_event_retention(self, retention: int):
+        """keep the summaries of the latest `retention` events for `has_latest_event`"""
+        self.event_retention = retention
+        self.latest_event_summaries = Counter(e_node.summary() for e_node in self.get_latest_events(retention))
+
+    def _roll_latest_events(self, e_node: BasicMemory):
+        if not self.event_retention:
+            return
+        self.latest_event_summaries[e_node.summary()] += 1
+        if len(self.event_list) > self.event_retention:
+            dropped = self.event_list[self.event_retention].summary()
+            self.latest_event_summaries[dropped] -= 1
+            if not self.latest_event_summaries[dropped]:
+                del self.latest_event_summaries[dropped]
+
     def get_summarized_latest_events(self, retention):
-        ret_set = set()
-        for e_node in self.event_list[:retention]:
-            ret_set.add(e_node.summary())
-        return ret_set
+        if retention == self.event_retention:
+            return set(self.latest_event_summaries)
+        return {e_node.summary() for e_node in self.get_latest_events(retention)}
+
+    def has_latest_event(self, summary: tuple, retention: int) -> bool:
+        """whether the (s, p, o) summary is one of the latest `retention` events, O(1) with `set_event_retention`"""
+        if retention == self.event_retention:
+            return summary in self.latest_event_summaries
+        return summary in self.get_summarized_latest_events(retention)
 
     def get_last_chat(self, target_role_name: str):
-        if target_role_name.lower() in self.chat_keywords:
-            return self.chat_keywords[target_role_name.lower()][0]
+        chats = self.chat_keywords.get(normalize_keyword(target_role_name))
+        if chats:
+            return chats[0]
         else:
             return False
 
-    def retrieve_relevant_thoughts(self, s_content: str, p_content: str, o_content: str) -> set:
-        contents = [s_content, p_content, o_content]
+    def get_nodes_by_last_accessed(self) -> list[BasicMemory]:
+        """non-idle events and thoughts, from the least to the most recently accessed"""
+        nodes = (i for i in chain(self.event_list, self.thought_list) if "idle" not in i.embedding_key)
+        return sorted(nodes, key=lambda node: node.last_accessed)
 
-        ret = []
+    @staticmethod
+    def _retrieve_by_keywords(keyword_index: dict[str, deque[BasicMemory]], contents: Iterable[str]) -> set:
+        ret = set()
         for i in contents:
-            if i in self.thought_keywords:
-                ret += self.thought_keywords[i.lower()]
-
-        ret = set(ret)
+            ret.update(keyword_index.get(normalize_keyword(i), ()))
         return ret
 
-    def retrieve_relevant_events(self, s_content: str, p_content: str, o_content: str) -> set:
-        contents = [s_content, p_content, o_content]
-
-        ret = []
-        for i in contents:
-            if i in self.event_keywords:
-                ret += self.event_keywords[i]
+    def retrieve_relevant_thoughts(self, s_content: str, p_content: str, o_content: str) -> set:
+        return self._retrieve_by_keywords(self.thought_keywords, [s_content, p_content, o_content])
 
-        ret = set(ret)
-        return ret
+    def retrieve_relevant_events(self, s_content: str, p_content: str, o_content: str) -> set:
+        return self._retrieve_by_keywords(self.event_keywords, [s_content, p_content, o_content])
@@ -8,7 +8,7 @@ from numpy import dot
 from numpy.linalg import norm
 
 from metagpt.ext.stanford_town.memory.agent_memory import BasicMemory
-from metagpt.ext.stanford_town.utils.utils import get_embedding
+from metagpt.ext.stanford_town.utils.utils import aget_embeddings, get_embedding
 
 
 def agent_retrieve(
@@ -18,6 +18,7 @@ def agent_retrieve(
     query: str,
     nodes: list[BasicMemory],
     topk: int = 4,
+    query_embedding: list[float] = None,
 ) -> list[BasicMemory]:
     """
     Retrieve需要集合Role使用,原因在于Role才具有AgentMemory,scratch
@@ -31,6 +32,7 @@ def agent_retrieve(
         "recency": 衰减因子计算结果
         "relevance": 搜索结果
     }
+    query_embedding为query的embedding,为None时请求获取
     """
     memories = nodes
     agent_memory_embedding = agent_memory.embeddings
@@ -39,7 +41,7 @@ def agent_retrieve(
     score_list = []
     score_list = extract_importance(memories, score_list)
     score_list = extract_recency(curr_time, memory_forget, score_list)
-    score_list = extract_relevance(agent_memory_embedding, query, score_list)
+    score_list = extract_relevance(agent_memory_embedding, query, score_list, query_embedding)
     score_list = normalize_score_floats(score_list, 0, 1)
 
     total_dict = {}
@@ -55,29 +57,25 @@ def agent_retrieve(
     return result  # 返回的是一个BasicMemory列表
 
 
-def new_agent_retrieve(role, focus_points: list, n_count=30) -> dict:
+async def new_agent_retrieve(role, focus_points: list, n_count=30) -> dict:
     """
     输入为role，关注点列表,返回记忆数量
     输出为字典，键为focus_point，值为对应的记忆列表
+    关注点的embedding一次请求获取，且在线程中执行，不阻塞其他role
     """
     retrieved = dict()
-    for focal_pt in focus_points:
-        nodes = [
-            [i.last_accessed, i]
-            for i in role.memory.event_list + role.memory.thought_list
-            if "idle" not in i.embedding_key
-        ]
-        nodes = sorted(nodes, key=lambda x: x[0])
-        nodes = [i for created, i in nodes]
+    focal_embeddings = await aget_embeddings(focus_points)
+    for focal_pt, focal_embedding in zip(focus_points, focal_embeddings):
+        nodes = role.memory.get_nodes_by_last_accessed()
         results = agent_retrieve(
-            role.memory, role.scratch.curr_time, role.scratch.recency_decay, focal_pt, nodes, n_count
+            role.memory, role.scratch.curr_time, role.scratch.recency_decay, focal_pt, nodes, n_count, focal_embedding
         )
         final_result = []
         for n in results:
-            for i in role.memory.storage:
-                if i.memory_id == n:
-                    i.last_accessed = role.scratch.curr_time
-                    final_result.append(i)
+            node = role.memory.get_node(n)
+            if node:
+                node.last_accessed = role.scratch.curr_time
+                final_result.append(node)
 
         retrieved[focal_pt] = final_result
 
@@ -103,11 +101,12 @@ def extract_importance(memories, score_list):
     return score_list
 
 
-def extract_relevance(agent_memory_embedding, query, score_list):
+def extract_relevance(agent_memory_embedding, query, score_list, query_embedding=None):
     """
     抽取相关性
     """
-    query_embedding = get_embedding(query)
+    if query_embedding is None:
+        query_embedding = get_embedding(query)
     # 进行
     for i in range(len(score_list)):
         node_embedding = agent_memory_embedding[score_list[i]["memory"].embedding_key]
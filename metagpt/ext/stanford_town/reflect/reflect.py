@@ -3,28 +3,25 @@
 # @Desc   : Reflect function
 
 import datetime
-import time
 
 from metagpt.ext.stanford_town.actions.run_reflect_action import (
     AgentChatPoignancy,
     AgentEventPoignancy,
+    AgentEventPoignancyBatch,
     AgentEventTriple,
+    AgentEventTripleBatch,
     AgentFocusPt,
     AgentInsightAndGuidance,
     AgentMemoryOnConvo,
     AgentPlanThoughtOnConvo,
 )
 from metagpt.ext.stanford_town.memory.retrieve import new_agent_retrieve
-from metagpt.ext.stanford_town.utils.utils import get_embedding
+from metagpt.ext.stanford_town.utils.utils import aget_embeddings, gather_with_limit
 from metagpt.logs import logger
 
 
 async def generate_focal_points(role: "STRole", n: int = 3):
-    nodes = [
-        [i.last_accessed, i] for i in role.memory.event_list + role.memory.thought_list if "idle" not in i.embedding_key
-    ]
-    nodes = sorted(nodes, key=lambda x: x[0])
-    nodes = [i for _, i in nodes]
+    nodes = role.memory.get_nodes_by_last_accessed()
 
     statements = ""
     for node in nodes[-1 * role.scratch.importance_ele_n :]:
@@ -68,6 +65,18 @@ async def generate_action_event_triple(act_desp: str, role: "STRole"):
     return result
 
 
+async def generate_action_event_triples(act_desps: list[str], role: "STRole") -> list[tuple]:
+    """The triples of several action descriptions with one llm call, or one call per description if the batched
+    response can't be parsed."""
+    if len(act_desps) > 1:
+        results = await AgentEventTripleBatch().run(act_desps, role)
+        if results:
+            return results
+        logger.warning(f"Role: {role.name} batched event triples failed, fall back to one call per action")
+    # `_run_gpt35_max_tokens` swaps the max_token of the shared llm config, so these calls are not run concurrently
+    return [await generate_action_event_triple(act_desp, role) for act_desp in act_desps]
+
+
 async def generate_poig_score(role: "STRole", event_type: str, description: str):
     if "is idle" in description:
         return 1
@@ -80,6 +89,23 @@ async def generate_poig_score(role: "STRole", event_type: str, description: str)
         return await run_chat_poignancy.run(role, role.scratch.act_description)
 
 
+async def generate_poig_scores(role: "STRole", event_type: str, descriptions: list[str]) -> list[int]:
+    """The poignancy of several events or thoughts with one llm call, or with concurrent calls per description if the
+    batched response can't be parsed."""
+    scores = [1 if "is idle" in description else None for description in descriptions]
+    pending = [idx for idx, score in enumerate(scores) if score is None]
+    results = None
+    if len(pending) > 1 and event_type in ["event", "thought"]:
+        results = await AgentEventPoignancyBatch().run(role, [descriptions[idx] for idx in pending])
+        if not results:
+            logger.warning(f"Role: {role.name} batched poignancy failed, fall back to one call per {event_type}")
+    if not results:
+        results = await gather_with_limit(generate_poig_score(role, event_type, descriptions[idx]) for idx in pending)
+    for idx, score in zip(pending, results):
+        scores[idx] = score
+    return scores
+
+
 async def generate_planning_thought_on_convo(role: "STRole", all_utt: str):
     run_planning_on_convo = AgentPlanThoughtOnConvo()
     return await run_planning_on_convo.run(role, all_utt)
@@ -105,7 +131,7 @@ async def run_reflect(role: "STRole"):
     focal_points = await generate_focal_points(role, 3)
     # Retrieve the relevant Nodesobject for each of the focal points.
     # <retrieved> has keys of focal points, and values of the associated Nodes.
-    retrieved = new_agent_retrieve(role, focal_points)
+    retrieved = await new_agent_retrieve(role, focal_points)
 
     # For each of the focal points, generate thoughts and save it in the
     # agent's memory.
@@ -115,20 +141,30 @@ async def run_reflect(role: "STRole"):
             logger.info(f"Nodes retrieved for `{focal_pt}` are `{xxx}`.")
 
         thoughts = await generate_insights_and_evidence(role, nodes, 5)
-        # 生成的是字典类型
-        for thought, evidence in thoughts.items():
-            created = role.scratch.curr_time
-            expiration = created + datetime.timedelta(days=30)
-            s, p, o = await generate_action_event_triple("(" + thought + ")", role)
-            keywords = set([s, p, o])
-            thought_poignancy = await generate_poig_score(role, "thought", thought)
-            thought_embedding_pair = (thought, get_embedding(thought))
-
-            role.memory.add_thought(
-                created, expiration, s, p, o, thought, keywords, thought_poignancy, thought_embedding_pair, evidence
-            )
-            logger.info(f"add thought memory: {thought}, evidence: {evidence}")
-            time.sleep(2)  # avoid Rate limit
+        # 生成的是字典类型，其中的thought一起生成三元组、重要性和embedding
+        await add_thoughts(role, list(thoughts.keys()), list(thoughts.values()), ["(" + i + ")" for i in thoughts])
+
+
+async def add_thoughts(role: "STRole", thoughts: list[str], evidences: list, act_desps: list[str] = None):
+    """Add the thoughts into the memory of the role, with their triples, poignancy and embeddings generated in
+    batches instead of one round trip per thought."""
+    if not thoughts:
+        return
+    triples = await generate_action_event_triples(act_desps or thoughts, role)
+    poignancies = await generate_poig_scores(role, "thought", thoughts)
+    embeddings = await aget_embeddings(thoughts)
+
+    created = role.scratch.curr_time
+    expiration = created + datetime.timedelta(days=30)
+    for thought, evidence, (s, p, o), thought_poignancy, embedding in zip(
+        thoughts, evidences, triples, poignancies, embeddings
+    ):
+        keywords = set([s, p, o])
+        thought_embedding_pair = (thought, embedding)
+        role.memory.add_thought(
+            created, expiration, s, p, o, thought, keywords, thought_poignancy, thought_embedding_pair, evidence
+        )
+        logger.info(f"add thought memory: {thought}, evidence: {evidence}")
 
 
 def reflection_trigger(role: "STRole"):
@@ -147,7 +183,7 @@ def reflection_trigger(role: "STRole"):
     """
     logger.info(f"{role.scratch.name} role.scratch.importance_trigger_curr:: {role.scratch.importance_trigger_curr}"),
 
-    if role.scratch.importance_trigger_curr <= 0 and [] != role.memory.event_list + role.memory.thought_list:
+    if role.scratch.importance_trigger_curr <= 0 and (role.memory.event_list or role.memory.thought_list):
         return True
     return False
 
@@ -201,45 +237,7 @@ async def role_reflect(role: "STRole"):
             planning_thought = f"For {role.scratch.name}'s planning: {planning_thought}"
             logger.info(f"Role: {role.name} planning_thought: {planning_thought}")
 
-            created = role.scratch.curr_time
-            expiration = created + datetime.timedelta(days=30)
-            s, p, o = await generate_action_event_triple(planning_thought, role)
-            keywords = set([s, p, o])
-            thought_poignancy = await generate_poig_score(role, "thought", planning_thought)
-            thought_embedding_pair = (planning_thought, get_embedding(planning_thought))
-
-            role.memory.add_thought(
-                created,
-                expiration,
-                s,
-                p,
-                o,
-                planning_thought,
-                keywords,
-                thought_poignancy,
-                thought_embedding_pair,
-                evidence,
-            )
-
             memo_thought = await generate_memo_on_convo(role, all_utt)
             memo_thought = f"{role.scratch.name} {memo_thought}"
 
-            created = role.scratch.curr_time
-            expiration = created + datetime.timedelta(days=30)
-            s, p, o = await generate_action_event_triple(memo_thought, role)
-            keywords = set([s, p, o])
-            thought_poignancy = await generate_poig_score(role, "thought", memo_thought)
-            thought_embedding_pair = (memo_thought, get_embedding(memo_thought))
-
-            role.memory.add_thought(
-                created,
-                expiration,
-                s,
-                p,
-                o,
-                memo_thought,
-                keywords,
-                thought_poignancy,
-                thought_embedding_pair,
-                evidence,
-            )
+            await add_thoughts(role, [planning_thought, memo_thought], [evidence, evidence])
@@ -10,9 +10,8 @@ Do the steps following:
 - reflect, do the High-level thinking based on memories and re-add into the memory
 - execute, move or else in the Maze
 """
-import math
+import heapq
 import random
-import time
 from datetime import datetime, timedelta
 from operator import itemgetter
 from pathlib import Path
@@ -36,14 +35,20 @@ from metagpt.ext.stanford_town.memory.agent_memory import AgentMemory, BasicMemo
 from metagpt.ext.stanford_town.memory.scratch import Scratch
 from metagpt.ext.stanford_town.memory.spatial_memory import MemoryTree
 from metagpt.ext.stanford_town.plan.st_plan import plan
-from metagpt.ext.stanford_town.reflect.reflect import generate_poig_score, role_reflect
-from metagpt.ext.stanford_town.utils.const import STORAGE_PATH, collision_block_id
+from metagpt.ext.stanford_town.reflect.reflect import (
+    generate_poig_score,
+    generate_poig_scores,
+    role_reflect,
+)
+from metagpt.ext.stanford_town.utils.const import STORAGE_PATH
 from metagpt.ext.stanford_town.utils.mg_ga_transform import (
     get_role_environment,
     save_environment,
     save_movement,
+    wait_role_environment,
 )
-from metagpt.ext.stanford_town.utils.utils import get_embedding, path_finder
+from metagpt.ext.stanford_town.utils.sim_profiler import SIM_PROFILER
+from metagpt.ext.stanford_town.utils.utils import aget_embedding, aget_embeddings
 from metagpt.logs import logger
 from metagpt.roles.role import Role, RoleContext
 from metagpt.schema import Message
@@ -89,6 +94,7 @@ class STRole(Role):
     game_obj_cleanup: dict = Field(default_factory=dict)
     inner_voice: bool = Field(default=False)
     has_inner_voice: bool = Field(default=False)
+    env_ready_timeout: float = Field(default=5.0, description="seconds to wait for the environment of current step")
 
     role_storage_path: Optional[Path] = Field(default=None)
 
@@ -163,6 +169,7 @@ class STRole(Role):
 
         scratch_f_saved = self.role_storage_path.joinpath("bootstrap_memory/scratch.json")
         self.rc.scratch = Scratch.init_scratch_from_path(f_saved=scratch_f_saved)
+        self.rc.memory.set_event_retention(self.rc.scratch.retention)
 
         logger.info(f"Role: {self.name} loaded role's memory from {str(self.role_storage_path)}")
 
@@ -217,7 +224,7 @@ class STRole(Role):
         s, p, o = await run_event_triple.run(thought, self)
         keywords = set([s, p, o])
         thought_poignancy = await generate_poig_score(self, "event", whisper)
-        thought_embedding_pair = (thought, get_embedding(thought))
+        thought_embedding_pair = (thought, await aget_embedding(thought))
         self.rc.memory.add_thought(
             created, expiration, s, p, o, thought, keywords, thought_poignancy, thought_embedding_pair, None
         )
@@ -239,64 +246,43 @@ class STRole(Role):
         """
         # PERCEIVE SPACE
         # We get the nearby tiles given our current tile and the persona's vision
-        # radius.
-        nearby_tiles = self.rc.env.observe(
+        # radius, with their addresses and events in a single observation.
+        perception = self.rc.env.observe(
             EnvObsParams(
-                obs_type=EnvObsType.TILE_NBR, coord=self.rc.scratch.curr_tile, vision_radius=self.rc.scratch.vision_r
+                obs_type=EnvObsType.PERCEPTION,
+                coord=self.rc.scratch.curr_tile,
+                vision_radius=self.rc.scratch.vision_r,
+                att_bandwidth=self.rc.scratch.att_bandwidth,
             )
         )
 
         # We then store the perceived space. Note that the s_mem of the persona is
         # in the form of a tree constructed using dictionaries.
-        for tile in nearby_tiles:
-            tile_info = self.rc.env.observe(EnvObsParams(obs_type=EnvObsType.GET_TITLE, coord=tile))
-            self.rc.spatial_memory.add_tile_info(tile_info)
+        for world, sector, arena, game_object in perception["addresses"]:
+            self.rc.spatial_memory.add_tile_info(
+                {"world": world, "sector": sector, "arena": arena, "game_object": game_object}
+            )
 
         # PERCEIVE EVENTS.
-        # We will perceive events that take place in the same arena as the
-        # persona's current arena.
-
-        curr_arena_path = self.rc.env.observe(
-            EnvObsParams(obs_type=EnvObsType.TILE_PATH, coord=self.rc.scratch.curr_tile, level="arena")
-        )
-
-        # We do not perceive the same event twice (this can happen if an object is
-        # extended across multiple tiles).
-        percept_events_set = set()
-        # We will order our percept based on the distance, with the closest ones
-        # getting priorities.
-        percept_events_list = []
-        # First, we put all events that are occurring in the nearby tiles into the
-        # percept_events_list
-        for tile in nearby_tiles:
-            tile_details = self.rc.env.observe(EnvObsParams(obs_type=EnvObsType.GET_TITLE, coord=tile))
-            if tile_details["events"]:
-                tmp_arena_path = self.rc.env.observe(
-                    EnvObsParams(obs_type=EnvObsType.TILE_PATH, coord=tile, level="arena")
-                )
-
-                if tmp_arena_path == curr_arena_path:
-                    # This calculates the distance between the persona's current tile,
-                    # and the target tile.
-                    dist = math.dist([tile[0], tile[1]], [self.rc.scratch.curr_tile[0], self.rc.scratch.curr_tile[1]])
-                    # Add any relevant events to our temp set/list with the distant info.
-                    for event in tile_details["events"]:
-                        if event not in percept_events_set:
-                            percept_events_list += [[dist, event]]
-                            percept_events_set.add(event)
-
-        # We sort, and perceive only self.rc.scratch.att_bandwidth of the closest
-        # events. If the bandwidth is larger, then it means the persona can perceive
-        # more elements within a small area.
-        percept_events_list = sorted(percept_events_list, key=itemgetter(0))
-        perceived_events = []
-        for dist, event in percept_events_list[: self.rc.scratch.att_bandwidth]:
-            perceived_events += [event]
+        # We perceive the events that take place in the same arena as the
+        # persona's current arena, each event once (this can happen if an object
+        # is extended across multiple tiles), with its distance to the persona.
+        # We perceive only self.rc.scratch.att_bandwidth of the closest events,
+        # the environment already visits the closest tiles first. If the bandwidth
+        # is larger, then it means the persona can perceive more elements within
+        # a small area.
+        perceived_events = [
+            event
+            for _, event in heapq.nsmallest(self.rc.scratch.att_bandwidth, perception["events"], key=itemgetter(0))
+        ]
 
         # Storing events.
-        # <ret_events> is a list of <BasicMemory> instances from the persona's
-        # associative memory.
-        ret_events = []
+        # We check the latest self.rc.scratch.retention events, kept as a rolling
+        # set by the memory. If there is something new that is happening (that is,
+        # p_event not in the latest events), then we add that event to the a_mem
+        # and return it.
+        new_events = []
+        new_p_events = set()
         for p_event in perceived_events:
             s, p, o, desc = p_event
             if not p:
@@ -306,78 +292,86 @@ class STRole(Role):
                 desc = "idle"
             desc = f"{s.split(':')[-1]} is {desc}"
             p_event = (s, p, o)
+            if p_event in new_p_events or self.rc.memory.has_latest_event(p_event, self.rc.scratch.retention):
+                continue
+            new_p_events.add(p_event)
+
+            # We start by managing keywords.
+            keywords = set()
+            sub = p_event[0]
+            obj = p_event[2]
+            if ":" in p_event[0]:
+                sub = p_event[0].split(":")[-1]
+            if ":" in p_event[2]:
+                obj = p_event[2].split(":")[-1]
+            keywords.update([sub, obj])
+
+            desc_embedding_in = desc
+            if "(" in desc:
+                desc_embedding_in = desc_embedding_in.split("(")[1].split(")")[0].strip()
+            new_events.append((s, p, o, desc, keywords, desc_embedding_in))
+        if not new_events:
+            return []
+
+        # Get the embeddings and the poignancy of all the new events at once,
+        # instead of a few llm round trips per event.
+        embedding_keys = [event[-1] for event in new_events]
+        missing_keys = list(dict.fromkeys(key for key in embedding_keys if key not in self.rc.memory.embeddings))
+        embeddings = dict(zip(missing_keys, await aget_embeddings(missing_keys)))
+        event_poignancies = await generate_poig_scores(self, "event", embedding_keys)
 
-            # We retrieve the latest self.rc.scratch.retention events. If there is
-            # something new that is happening (that is, p_event not in latest_events),
-            # then we add that event to the a_mem and return it.
-            latest_events = self.rc.memory.get_summarized_latest_events(self.rc.scratch.retention)
-            if p_event not in latest_events:
-                # We start by managing keywords.
-                keywords = set()
-                sub = p_event[0]
-                obj = p_event[2]
-                if ":" in p_event[0]:
-                    sub = p_event[0].split(":")[-1]
-                if ":" in p_event[2]:
-                    obj = p_event[2].split(":")[-1]
-                keywords.update([sub, obj])
-
-                # Get event embedding
-                desc_embedding_in = desc
-                if "(" in desc:
-                    desc_embedding_in = desc_embedding_in.split("(")[1].split(")")[0].strip()
-                if desc_embedding_in in self.rc.memory.embeddings:
-                    event_embedding = self.rc.memory.embeddings[desc_embedding_in]
+        # <ret_events> is a list of <BasicMemory> instances from the persona's
+        # associative memory.
+        ret_events = []
+        for (s, p, o, desc, keywords, desc_embedding_in), event_poignancy in zip(new_events, event_poignancies):
+            event_embedding = self.rc.memory.embeddings.get(desc_embedding_in)
+            if event_embedding is None:
+                event_embedding = embeddings[desc_embedding_in]
+            event_embedding_pair = (desc_embedding_in, event_embedding)
+            logger.debug(f"Role {self.name} event_poignancy: {event_poignancy}")
+
+            # If we observe the persona's self chat, we include that in the memory
+            # of the persona here.
+            chat_node_ids = []
+            if s == f"{self.name}" and p == "chat with":
+                curr_event = self.rc.scratch.act_event
+                if self.rc.scratch.act_description in self.rc.memory.embeddings:
+                    chat_embedding = self.rc.memory.embeddings[self.rc.scratch.act_description]
                 else:
-                    event_embedding = get_embedding(desc_embedding_in)
-                event_embedding_pair = (desc_embedding_in, event_embedding)
-
-                # Get event poignancy.
-                event_poignancy = await generate_poig_score(self, "event", desc_embedding_in)
-                logger.debug(f"Role {self.name} event_poignancy: {event_poignancy}")
-
-                # If we observe the persona's self chat, we include that in the memory
-                # of the persona here.
-                chat_node_ids = []
-                if p_event[0] == f"{self.name}" and p_event[1] == "chat with":
-                    curr_event = self.rc.scratch.act_event
-                    if self.rc.scratch.act_description in self.rc.memory.embeddings:
-                        chat_embedding = self.rc.memory.embeddings[self.rc.scratch.act_description]
-                    else:
-                        chat_embedding = get_embedding(self.rc.scratch.act_description)
-                    chat_embedding_pair = (self.rc.scratch.act_description, chat_embedding)
-                    chat_poignancy = await generate_poig_score(self, "chat", self.rc.scratch.act_description)
-                    chat_node = self.rc.memory.add_chat(
-                        self.rc.scratch.curr_time,
-                        None,
-                        curr_event[0],
-                        curr_event[1],
-                        curr_event[2],
-                        self.rc.scratch.act_description,
-                        keywords,
-                        chat_poignancy,
-                        chat_embedding_pair,
-                        self.rc.scratch.chat,
-                    )
-                    chat_node_ids = [chat_node.memory_id]
-
-                # Finally, we add the current event to the agent's memory.
-                ret_events += [
-                    self.rc.memory.add_event(
-                        self.rc.scratch.curr_time,
-                        None,
-                        s,
-                        p,
-                        o,
-                        desc,
-                        keywords,
-                        event_poignancy,
-                        event_embedding_pair,
-                        chat_node_ids,
-                    )
-                ]
-                self.rc.scratch.importance_trigger_curr -= event_poignancy
-                self.rc.scratch.importance_ele_n += 1
+                    chat_embedding = await aget_embedding(self.rc.scratch.act_description)
+                chat_embedding_pair = (self.rc.scratch.act_description, chat_embedding)
+                chat_poignancy = await generate_poig_score(self, "chat", self.rc.scratch.act_description)
+                chat_node = self.rc.memory.add_chat(
+                    self.rc.scratch.curr_time,
+                    None,
+                    curr_event[0],
+                    curr_event[1],
+                    curr_event[2],
+                    self.rc.scratch.act_description,
+                    keywords,
+                    chat_poignancy,
+                    chat_embedding_pair,
+                    self.rc.scratch.chat,
+                )
+                chat_node_ids = [chat_node.memory_id]
+
+            # Finally, we add the current event to the agent's memory.
+            ret_events += [
+                self.rc.memory.add_event(
+                    self.rc.scratch.curr_time,
+                    None,
+                    s,
+                    p,
+                    o,
+                    desc,
+                    keywords,
+                    event_poignancy,
+                    event_embedding_pair,
+                    chat_node_ids,
+                )
+            ]
+            self.rc.scratch.importance_trigger_curr -= event_poignancy
+            self.rc.scratch.importance_ele_n += 1
 
         return ret_events
 
@@ -427,31 +421,16 @@ class STRole(Role):
             if "<persona>" in plan:
                 # Executing persona-persona interaction.
                 target_p_tile = roles[plan.split("<persona>")[-1].strip()].scratch.curr_tile
-                collision_maze = self.rc.env.observe()["collision_maze"]
-                potential_path = path_finder(
-                    collision_maze, self.rc.scratch.curr_tile, target_p_tile, collision_block_id
-                )
+                potential_path = self.rc.env.find_path(self.rc.scratch.curr_tile, target_p_tile)
                 if len(potential_path) <= 2:
                     target_tiles = [potential_path[0]]
                 else:
-                    collision_maze = self.rc.env.observe()["collision_maze"]
-                    potential_1 = path_finder(
-                        collision_maze,
-                        self.rc.scratch.curr_tile,
-                        potential_path[int(len(potential_path) / 2)],
-                        collision_block_id,
+                    # go to the middle of the way, the closer one of the two middle tiles
+                    mid = int(len(potential_path) / 2)
+                    _, target_tile = self.rc.env.find_closest_path(
+                        self.rc.scratch.curr_tile, potential_path[mid : mid + 2]
                     )
-
-                    potential_2 = path_finder(
-                        collision_maze,
-                        self.rc.scratch.curr_tile,
-                        potential_path[int(len(potential_path) / 2) + 1],
-                        collision_block_id,
-                    )
-                    if len(potential_1) <= len(potential_2):
-                        target_tiles = [potential_path[int(len(potential_path) / 2)]]
-                    else:
-                        target_tiles = [potential_path[int(len(potential_path) / 2 + 1)]]
+                    target_tiles = [target_tile]
 
             elif "<waiting>" in plan:
                 # Executing interaction where the persona has decided to wait before
@@ -507,23 +486,9 @@ class STRole(Role):
             target_tiles = new_target_tiles
 
             # Now that we've identified the target tile, we find the shortest path to
-            # one of the target tiles.
-            curr_tile = self.rc.scratch.curr_tile
-            closest_target_tile = None
-            path = None
-            for i in target_tiles:
-                # path_finder takes a collision_mze and the curr_tile coordinate as
-                # an input, and returns a list of coordinate tuples that becomes the
-                # path.
-                # e.g., [(0, 1), (1, 1), (1, 2), (1, 3), (1, 4)...]
-                collision_maze = self.rc.env.observe()["collision_maze"]
-                curr_path = path_finder(collision_maze, curr_tile, i, collision_block_id)
-                if not closest_target_tile:
-                    closest_target_tile = i
-                    path = curr_path
-                elif len(curr_path) < len(path):
-                    closest_target_tile = i
-                    path = curr_path
+            # the closest one of the target tiles in a single search.
+            # e.g., [(0, 1), (1, 1), (1, 2), (1, 3), (1, 4)...]
+            path, _ = self.rc.env.find_closest_path(self.rc.scratch.curr_tile, target_tiles)
 
             # Actually setting the <planned_path> and <act_path_set>. We cut the
             # first element in the planned_path because it includes the curr_tile.
@@ -544,7 +509,7 @@ class STRole(Role):
         return execution
 
     async def update_role_env(self) -> bool:
-        role_env = get_role_environment(self.sim_code, self.name, self.step)
+        role_env = await wait_role_environment(self.sim_code, self.name, self.step, timeout=self.env_ready_timeout)
         ret = True
         if role_env:
             for key, val in self.game_obj_cleanup.items():
@@ -584,15 +549,16 @@ class STRole(Role):
             self.rc.scratch.curr_tile = new_tile
         else:
             ret = False
-            time.sleep(1)
             logger.warning(
-                f"{self.sim_code}/environment/{self.step}.json not exist or parses failed, " f"sleep 1s and re-check"
+                f"{self.sim_code}/environment/{self.step}.json not ready after {self.env_ready_timeout}s, "
+                f"skip this step and re-check"
             )
         return ret
 
     async def _react(self) -> Message:
         # update role env
-        ret = await self.update_role_env()
+        with SIM_PROFILER.timed("update_env"):
+            ret = await self.update_role_env()
         if not ret:
             # TODO add message
             logger.info(f"Role: {self.name} update_role_env return False")
@@ -607,33 +573,39 @@ class STRole(Role):
         self.rc.scratch.curr_time = self.curr_time
 
         # get maze_env from self.rc.env, and observe env info
-        observed = await self.observe()
+        with SIM_PROFILER.timed("observe"):
+            observed = await self.observe()
 
         # use self.rc.memory 's retrieve functions
-        retrieved = self.retrieve(observed)
+        with SIM_PROFILER.timed("retrieve"):
+            retrieved = self.retrieve(observed)
 
-        plans = await plan(self, self.rc.env.get_roles(), new_day, retrieved)
+        with SIM_PROFILER.timed("plan"):
+            plans = await plan(self, self.rc.env.get_roles(), new_day, retrieved)
 
-        await self.reflect()
+        with SIM_PROFILER.timed("reflect"):
+            await self.reflect()
 
         # feed-back into maze_env
-        next_tile, pronunciatio, description = await self.execute(plans)
+        with SIM_PROFILER.timed("execute"):
+            next_tile, pronunciatio, description = await self.execute(plans)
         role_move = {
             "movement": next_tile,
             "pronunciatio": pronunciatio,
             "description": description,
             "chat": self.scratch.chat,
         }
-        save_movement(self.name, role_move, step=self.step, sim_code=self.sim_code, curr_time=self.curr_time)
+        with SIM_PROFILER.timed("persistence"):
+            save_movement(self.name, role_move, step=self.step, sim_code=self.sim_code, curr_time=self.curr_time)
 
         # step update
         logger.info(f"Role: {self.name} run at {self.step} step on {self.curr_time} at tile: {self.scratch.curr_tile}")
         self.step += 1
-        save_environment(self.name, self.step, self.sim_code, next_tile)
+        with SIM_PROFILER.timed("persistence"):
+            save_environment(self.name, self.step, self.sim_code, next_tile)
         self.curr_time += timedelta(seconds=self.sec_per_step)
         self.inner_voice = False
 
-        time.sleep(0.5)
         return DummyMessage()
 
 
@@ -2,18 +2,29 @@
 # -*- coding: utf-8 -*-
 # @Desc   : StanfordTown to works like SoftwareCompany
 
+import asyncio
+import time
 from typing import Any, Optional
 
+from pydantic import Field
+
 from metagpt.context import Context
 from metagpt.environment import StanfordTownEnv
 from metagpt.ext.stanford_town.roles.st_role import STRole
 from metagpt.ext.stanford_town.utils.const import MAZE_ASSET_PATH
+from metagpt.ext.stanford_town.utils.mg_ga_transform import checkpoint_sim_store
+from metagpt.ext.stanford_town.utils.sim_profiler import SIM_PROFILER
 from metagpt.logs import logger
 from metagpt.team import Team
+from metagpt.utils.ahttp_client import session_scope
 
 
 class StanfordTown(Team):
     env: Optional[StanfordTownEnv] = None
+    tick_interval: float = Field(
+        default=0.0, description="minimum real seconds per simulation tick, to pace with the frontend, 0 means no pace"
+    )
+    checkpoint_every: int = Field(default=1, description="flush the simulation frames into storage every k ticks")
 
     def __init__(self, context: Context = None, **data: Any):
         super(Team, self).__init__(**data)
@@ -31,15 +42,35 @@ class StanfordTown(Team):
 
     async def run(self, n_round: int = 3):
         """Run company until target round or no money"""
-        while n_round > 0:
-            n_round -= 1
-            logger.debug(f"{n_round=}")
-            self._check_balance()
-            await self.env.run()
+        sim_codes = {role.sim_code for role in self.env.get_roles().values()}
+        tick = 0
+        async with session_scope():
+            try:
+                while n_round > 0:
+                    n_round -= 1
+                    tick += 1
+                    logger.debug(f"{n_round=}")
+                    self._check_balance()
+                    start = time.perf_counter()
+                    # roles step concurrently, it returns once the slowest one has finished the tick
+                    await self.env.run()
+                    elapsed = time.perf_counter() - start
+                    logger.debug(f"tick took {elapsed:.2f}s")
+                    if tick % self.checkpoint_every == 0:
+                        with SIM_PROFILER.timed("persistence"):
+                            for sim_code in sim_codes:
+                                checkpoint_sim_store(sim_code)
+                    if elapsed < self.tick_interval:
+                        await asyncio.sleep(self.tick_interval - elapsed)
+            finally:
+                with SIM_PROFILER.timed("persistence"):
+                    for sim_code in sim_codes:
+                        checkpoint_sim_store(sim_code, final=True)
 
         # save simulation result including environment and roles after all rounds
         roles = self.env.get_roles()
-        for profile, role in roles.items():
-            role.save_into()
+        with SIM_PROFILER.timed("persistence"):
+            for profile, role in roles.items():
+                role.save_into()
 
         return self.env.history
@@ -13,3 +13,5 @@ MAZE_ASSET_PATH = ST_ROOT_PATH.joinpath("static_dirs/assets/the_ville")
 PROMPTS_DIR = ST_ROOT_PATH.joinpath("prompts")
 
 collision_block_id = "32125"
+
+MAX_CONCURRENT_LLM_CALLS = 4  # of a role, when a batched llm call falls back to one call per item
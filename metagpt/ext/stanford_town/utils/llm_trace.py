@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : record the llm/embedding requests of a Stanford Town simulation, and replay them without network
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Awaitable, Callable, Literal, Optional
+
+import numpy as np
+
+from metagpt.ext.stanford_town.utils.sim_profiler import SIM_PROFILER
+from metagpt.logs import logger
+
+TraceMode = Literal["record", "replay"]
+
+_LLM_TRACE: Optional["LLMTrace"] = None
+
+
+class LLMTrace:
+    """The llm responses and embeddings of a simulation, in a jsonl trace file.
+
+    In `record` mode, the requests go to the live llm/embedding api, and every response is appended to the trace
+    file as `{"type": "llm", "key", "prompt", "response"}` or `{"type": "embedding", "model", "text", "embedding"}`.
+    In `replay` mode, the responses are read from the trace instead, and the retry backoff is skipped, so the
+    simulation runs in fast-forward without network. The same prompt asked several times gets its recorded
+    responses in order, the last one repeats. A missed prompt raises `KeyError`, a missed text gets a pseudo
+    embedding derived from its hash, both are counted in `misses`.
+    """
+
+    def __init__(self, trace_file: Path, mode: TraceMode = "replay"):
+        self.trace_file = Path(trace_file)
+        self.mode = mode
+        self.llm_responses: dict[str, list[str]] = defaultdict(list)
+        self.embeddings: dict[tuple[str, str], list[float]] = {}
+        self.misses = 0
+        self._replayed: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()  # embeddings are recorded from worker threads
+        if mode == "replay":
+            self.load()
+        else:
+            self.trace_file.parent.mkdir(parents=True, exist_ok=True)
+            self.trace_file.write_text("")
+
+    @property
+    def fast_forward(self) -> bool:
+        return self.mode == "replay"
+
+    @staticmethod
+    def prompt_key(prompt: str) -> str:
+        return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+    def load(self):
+        with open(self.trace_file, "r", encoding="utf-8") as reader:
+            for line in reader:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record["type"] == "llm":
+                    self.llm_responses[record["key"]].append(record["response"])
+                elif record["type"] == "embedding":
+                    self.embeddings[(record["model"], record["text"])] = record["embedding"]
+        logger.info(
+            f"load {sum(map(len, self.llm_responses.values()))} llm responses and {len(self.embeddings)} embeddings "
+            f"from {self.trace_file}"
+        )
+
+    def _append(self, records: list[dict]):
+        with self._lock, open(self.trace_file, "a", encoding="utf-8") as writer:
+            writer.writelines(json.dumps(record) + "\n" for record in records)
+
+    async def aask(self, prompt: str, ask: Callable[[str], Awaitable[str]]) -> str:
+        """The response of `prompt`, asked with `ask` when recording"""
+        key = self.prompt_key(prompt)
+        with SIM_PROFILER.timed("llm"):
+            if self.mode == "record":
+                response = await ask(prompt)
+                self._append([{"type": "llm", "key": key, "prompt": prompt, "response": response}])
+                return response
+
+            responses = self.llm_responses.get(key)
+            if not responses:
+                self.misses += 1
+                raise KeyError(f"no recorded llm response for prompt {key}: {prompt[:100]}")
+            idx = self._replayed[key]
+            self._replayed[key] += 1
+            return responses[min(idx, len(responses) - 1)]
+
+    def embed(self, texts: list[str], model: str, fetch: Callable[[list[str]], list[list[float]]]) -> list[list[float]]:
+        """The embeddings of `texts`, the ones not in the trace are got with `fetch` when recording"""
+        with SIM_PROFILER.timed("embedding"):
+            missing = list(dict.fromkeys(text for text in texts if (model, text) not in self.embeddings))
+            if missing and self.mode == "record":
+                fetched = fetch(missing)
+                self._append(
+                    [
+                        {"type": "embedding", "model": model, "text": text, "embedding": embedding}
+                        for text, embedding in zip(missing, fetched)
+                    ]
+                )
+                with self._lock:
+                    self.embeddings.update({(model, text): embedding for text, embedding in zip(missing, fetched)})
+            elif missing:
+                self.misses += len(missing)
+                logger.warning(f"no recorded embeddings for {len(missing)} texts, use pseudo embeddings")
+                for text in missing:
+                    self.embeddings[(model, text)] = self.pseudo_embedding(text)
+            return [self.embeddings[(model, text)] for text in texts]
+
+    def pseudo_embedding(self, text: str, dim: int = 1536) -> list[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        return np.random.default_rng(seed).standard_normal(dim).tolist()
+
+
+def get_llm_trace() -> Optional[LLMTrace]:
+    return _LLM_TRACE
+
+
+def set_llm_trace(trace: Optional[LLMTrace]):
+    """Route the llm/embedding requests of the Stanford Town actions through `trace`, None to call the apis directly"""
+    global _LLM_TRACE
+    _LLM_TRACE = trace
+
+
+async def backoff(seconds: float):
+    """sleep before a retry, skipped when replaying a trace"""
+    if _LLM_TRACE and _LLM_TRACE.fast_forward:
+        return
+    await asyncio.sleep(seconds)
+
+
+def backoff_sync(seconds: float):
+    if _LLM_TRACE and _LLM_TRACE.fast_forward:
+        return
+    time.sleep(seconds)
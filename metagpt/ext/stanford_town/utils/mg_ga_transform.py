@@ -2,13 +2,21 @@
 # -*- coding: utf-8 -*-
 # @Desc   : data transform of mg <-> ga under storage
 
+import asyncio
+from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
 from metagpt.ext.stanford_town.utils.const import STORAGE_PATH, TEMP_STORAGE_PATH
+from metagpt.ext.stanford_town.utils.sim_state_store import SimStateStore
 from metagpt.logs import logger
 from metagpt.utils.common import read_json_file, write_json_file
 
+# sim_code -> in-memory frames of the running simulation
+_SIM_STORES: dict[str, SimStateStore] = {}
+# (sim_code, step) -> event set once a role environment of the step is saved by `save_environment`
+_ENV_READY_EVENTS: dict[tuple[str, int], asyncio.Event] = {}
+
 
 def get_reverie_meta(sim_code: str) -> dict:
     meta_file_path = STORAGE_PATH.joinpath(sim_code).joinpath("reverie/meta.json")
@@ -16,43 +24,62 @@ def get_reverie_meta(sim_code: str) -> dict:
     return reverie_meta
 
 
-def save_movement(role_name: str, role_move: dict, step: int, sim_code: str, curr_time: str):
-    movement_path = STORAGE_PATH.joinpath(f"{sim_code}/movement/{step}.json")
-    if not movement_path.parent.exists():
-        movement_path.parent.mkdir(exist_ok=True)
-    if movement_path.exists():
-        movement = read_json_file(movement_path)
-    else:
-        movement = {"persona": dict(), "meta": dict()}
-    movement["persona"][role_name] = role_move
-    movement["meta"]["curr_time"] = curr_time.strftime("%B %d, %Y, %H:%M:%S")
+def get_sim_store(sim_code: str) -> SimStateStore:
+    """The in-memory frames of the simulation, shared by its roles"""
+    if sim_code not in _SIM_STORES:
+        _SIM_STORES[sim_code] = SimStateStore(sim_path=STORAGE_PATH.joinpath(sim_code))
+    return _SIM_STORES[sim_code]
 
-    write_json_file(movement_path, movement)
-    logger.info(f"save_movement at step: {step}, curr_time: {movement['meta']['curr_time']}")
 
+def checkpoint_sim_store(sim_code: str, final: bool = False):
+    """Write the frames of the simulation, the final checkpoint also releases its in-memory state"""
+    get_sim_store(sim_code).checkpoint(final=final)
+    if final:
+        _SIM_STORES.pop(sim_code, None)
+        for key in [key for key in _ENV_READY_EVENTS if key[0] == sim_code]:
+            # wake up the waiters left, they fall back to the files
+            _ENV_READY_EVENTS.pop(key).set()
 
-def save_environment(role_name: str, step: int, sim_code: str, movement: list[int]):
-    environment_path = STORAGE_PATH.joinpath(f"{sim_code}/environment/{step}.json")
-    if not environment_path.parent.exists():
-        environment_path.parent.mkdir(exist_ok=True)
-    if environment_path.exists():
-        environment = read_json_file(environment_path)
-    else:
-        environment = {}
 
-    environment[role_name] = {"maze": "the_ville", "x": movement[0], "y": movement[1]}
-    write_json_file(environment_path, environment)
+def save_movement(role_name: str, role_move: dict, step: int, sim_code: str, curr_time: datetime):
+    curr_time = curr_time.strftime("%B %d, %Y, %H:%M:%S")
+    get_sim_store(sim_code).save_movement(role_name, role_move, step, curr_time)
+    logger.info(f"save_movement at step: {step}, curr_time: {curr_time}")
+
+
+def save_environment(role_name: str, step: int, sim_code: str, movement: list[int]):
+    role_env = {"maze": "the_ville", "x": movement[0], "y": movement[1]}
+    get_sim_store(sim_code).save_environment(role_name, step, role_env)
+    ready = _ENV_READY_EVENTS.pop((sim_code, step), None)
+    if ready:
+        ready.set()
     logger.info(f"save_environment at step: {step}")
 
 
 def get_role_environment(sim_code: str, role_name: str, step: int = 0) -> dict:
-    env_path = STORAGE_PATH.joinpath(f"{sim_code}/environment/{step}.json")
-    role_env = None
-    if env_path.exists():
-        env_info = read_json_file(env_path)
-        role_env = env_info.get(role_name, None)
-
-    return role_env
+    return get_sim_store(sim_code).get_role_environment(role_name, step)
+
+
+async def wait_role_environment(
+    sim_code: str, role_name: str, step: int = 0, timeout: float = 5.0, poll_interval: float = 1.0
+) -> Optional[dict]:
+    """Wait until the role's environment of `step` is ready without blocking the event loop.
+
+    Writes from `save_environment` wake the waiters at once, files written by an external frontend are picked up
+    every `poll_interval` seconds. Return None if it is still not ready after `timeout` seconds.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        role_env = get_role_environment(sim_code, role_name, step)
+        remaining = deadline - loop.time()
+        if role_env or remaining <= 0:
+            return role_env
+        ready = _ENV_READY_EVENTS.setdefault((sim_code, step), asyncio.Event())
+        try:
+            await asyncio.wait_for(ready.wait(), timeout=min(poll_interval, remaining))
+        except asyncio.TimeoutError:
+            pass
 
 
 def write_curr_sim_code(curr_sim_code: dict, temp_storage_path: Optional[Path] = None):
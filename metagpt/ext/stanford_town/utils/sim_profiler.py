@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : wall time spent in the subsystems of a Stanford Town simulation
+
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class SimProfiler:
+    """Accumulated wall time and calls per subsystem.
+
+    The roles step concurrently, so the time of a subsystem is summed over roles and may include the time other roles
+    ran while it was awaiting, `llm` and `embedding` are also included in the subsystems that requested them.
+    """
+
+    def __init__(self):
+        self.totals: dict[str, float] = defaultdict(float)
+        self.calls: dict[str, int] = defaultdict(int)
+
+    @contextmanager
+    def timed(self, subsystem: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.totals[subsystem] += time.perf_counter() - start
+            self.calls[subsystem] += 1
+
+    def reset(self):
+        self.totals.clear()
+        self.calls.clear()
+
+    def report(self) -> dict[str, dict]:
+        return {
+            subsystem: {"seconds": round(seconds, 6), "calls": self.calls[subsystem]}
+            for subsystem, seconds in sorted(self.totals.items(), key=lambda item: -item[1])
+        }
+
+
+SIM_PROFILER = SimProfiler()
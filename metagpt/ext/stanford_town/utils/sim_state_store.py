@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : in-memory movement/environment frames of a simulation, checkpointed into an append-only jsonl file
+
+import json
+from pathlib import Path
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from metagpt.logs import logger
+from metagpt.utils.common import read_json_file, write_json_file
+
+FRAMES_FILENAME = "frames.jsonl"
+
+
+class SimStateStore(BaseModel):
+    """Movement and environment frames of a simulation, keyed by step.
+
+    Roles write and read the frames in memory, `checkpoint` appends one consolidated line per finished step to
+    `{sim_path}/frames.jsonl` (`{"step", "movement", "environment"}`) and, with `export_json`, also writes the
+    `movement/{step}.json` and `environment/{step}.json` files read by the replay frontend.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    sim_path: Path
+    export_json: bool = Field(default=True, description="also export the per-step json files of generative_agents")
+    movements: dict[int, dict] = Field(default_factory=dict)
+    environments: dict[int, dict] = Field(default_factory=dict)
+
+    @property
+    def frames_path(self) -> Path:
+        return self.sim_path.joinpath(FRAMES_FILENAME)
+
+    def save_movement(self, role_name: str, role_move: dict, step: int, curr_time: str):
+        movement = self.movements.setdefault(step, {"persona": dict(), "meta": dict()})
+        movement["persona"][role_name] = role_move
+        movement["meta"]["curr_time"] = curr_time
+
+    def save_environment(self, role_name: str, step: int, role_env: dict):
+        self.environments.setdefault(step, {})[role_name] = role_env
+
+    def get_role_environment(self, role_name: str, step: int) -> Optional[dict]:
+        if step in self.environments:
+            role_env = self.environments[step].get(role_name)
+            if role_env:
+                return role_env
+        # frames not produced by this process, like the initial step forked from another simulation
+        env_path = self.sim_path.joinpath(f"environment/{step}.json")
+        if env_path.exists():
+            return read_json_file(env_path).get(role_name)
+        return None
+
+    def checkpoint(self, final: bool = False):
+        """Flush the steps whose movement is done, the environment of the next step is kept for the next tick.
+
+        Args:
+            final: flush every pending frame, used at the end of the simulation.
+        """
+        steps = sorted(self.movements) if not final else sorted(set(self.movements) | set(self.environments))
+        if not steps:
+            return
+        lines = []
+        for step in steps:
+            movement = self.movements.pop(step, None)
+            environment = self.environments.pop(step, None)
+            lines.append(json.dumps({"step": step, "movement": movement, "environment": environment}))
+            if self.export_json:
+                if movement:
+                    write_json_file(self.sim_path.joinpath(f"movement/{step}.json"), movement)
+                if environment:
+                    write_json_file(self.sim_path.joinpath(f"environment/{step}.json"), environment)
+        if self.export_json and not final:
+            # the next step is read by an external frontend before it is checkpointed
+            for step, environment in self.environments.items():
+                write_json_file(self.sim_path.joinpath(f"environment/{step}.json"), environment)
+
+        self.sim_path.mkdir(parents=True, exist_ok=True)
+        with open(self.frames_path, "a", encoding="utf-8") as fout:
+            fout.write("\n".join(lines) + "\n")
+        logger.info(f"checkpoint steps {steps[0]}-{steps[-1]} into {self.frames_path}")
+
+    def load_frames(self) -> list[dict]:
+        """Read the checkpointed frames back, in step order"""
+        if not self.frames_path.exists():
+            return []
+        with open(self.frames_path, "r", encoding="utf-8") as fin:
+            frames = [json.loads(line) for line in fin if line.strip()]
+        return sorted(frames, key=lambda frame: frame["step"])
@@ -2,18 +2,22 @@
 # -*- coding: utf-8 -*-
 # @Desc   : utils
 
+import asyncio
 import csv
 import errno
 import json
 import os
 import shutil
-import time
 from pathlib import Path
-from typing import Union
+from typing import Awaitable, Iterable, Union
 
+import numpy as np
 from openai import OpenAI
 
 from metagpt.config2 import config
+from metagpt.environment.stanford_town.maze_navigator import MazeNavigator
+from metagpt.ext.stanford_town.utils.const import MAX_CONCURRENT_LLM_CALLS
+from metagpt.ext.stanford_town.utils.llm_trace import backoff_sync, get_llm_trace
 from metagpt.logs import logger
 
 
@@ -48,21 +52,55 @@ def read_csv_to_list(curr_file: str, header=False, strip_trail=True):
 
 
 def get_embedding(text, model: str = "text-embedding-ada-002"):
-    text = text.replace("\n", " ")
-    embedding = None
-    if not text:
-        text = "this is blank"
+    return get_embeddings([text], model)[0]
+
+
+async def aget_embedding(text, model: str = "text-embedding-ada-002"):
+    """`get_embedding` in a worker thread, so that concurrent roles are not blocked by the sync client"""
+    return await asyncio.to_thread(get_embedding, text, model)
+
+
+def _request_embeddings(texts: list[str], model: str) -> list[list[float]]:
+    embeddings = None
     for idx in range(3):
         try:
-            embedding = (
-                OpenAI(api_key=config.llm.api_key).embeddings.create(input=[text], model=model).data[0].embedding
-            )
+            data = OpenAI(api_key=config.llm.api_key).embeddings.create(input=texts, model=model).data
+            embeddings = [item.embedding for item in sorted(data, key=lambda item: item.index)]
+            break
         except Exception as exp:
-            logger.info(f"get_embedding failed, exp: {exp}, will retry.")
-            time.sleep(5)
-    if not embedding:
-        raise ValueError("get_embedding failed")
-    return embedding
+            logger.info(f"get_embeddings failed, exp: {exp}, will retry.")
+            backoff_sync(5)
+    if not embeddings:
+        raise ValueError("get_embeddings failed")
+    return embeddings
+
+
+def get_embeddings(texts: list[str], model: str = "text-embedding-ada-002") -> list[list[float]]:
+    """the embeddings of `texts` with a single request, in the same order"""
+    texts = [text.replace("\n", " ") or "this is blank" for text in texts]
+    if not texts:
+        return []
+    trace = get_llm_trace()
+    if trace:
+        return trace.embed(texts, model, lambda missing: _request_embeddings(missing, model))
+    return _request_embeddings(texts, model)
+
+
+async def aget_embeddings(texts: list[str], model: str = "text-embedding-ada-002") -> list[list[float]]:
+    if not texts:
+        return []
+    return await asyncio.to_thread(get_embeddings, texts, model)
+
+
+async def gather_with_limit(aws: Iterable[Awaitable], limit: int = MAX_CONCURRENT_LLM_CALLS) -> list:
+    """`asyncio.gather` running at most `limit` of the awaitables at the same time"""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(aw: Awaitable):
+        async with semaphore:
+            return await aw
+
+    return await asyncio.gather(*(run(aw) for aw in aws))
 
 
 def extract_first_json_dict(data_str: str) -> Union[None, dict]:
@@ -86,88 +124,11 @@ def extract_first_json_dict(data_str: str) -> Union[None, dict]:
         return None
 
 
-def path_finder_v2(a, start, end, collision_block_char) -> list[int]:
-    def make_step(m, k):
-        for i in range(len(m)):
-            for j in range(len(m[i])):
-                if m[i][j] == k:
-                    if i > 0 and m[i - 1][j] == 0 and a[i - 1][j] == 0:
-                        m[i - 1][j] = k + 1
-                    if j > 0 and m[i][j - 1] == 0 and a[i][j - 1] == 0:
-                        m[i][j - 1] = k + 1
-                    if i < len(m) - 1 and m[i + 1][j] == 0 and a[i + 1][j] == 0:
-                        m[i + 1][j] = k + 1
-                    if j < len(m[i]) - 1 and m[i][j + 1] == 0 and a[i][j + 1] == 0:
-                        m[i][j + 1] = k + 1
-
-    new_maze = []
-    for row in a:
-        new_row = []
-        for j in row:
-            if j == collision_block_char:
-                new_row += [1]
-            else:
-                new_row += [0]
-        new_maze += [new_row]
-    a = new_maze
-
-    m = []
-    for i in range(len(a)):
-        m.append([])
-        for j in range(len(a[i])):
-            m[-1].append(0)
-    i, j = start
-    m[i][j] = 1
-
-    k = 0
-    except_handle = 150
-    while m[end[0]][end[1]] == 0:
-        k += 1
-        make_step(m, k)
-
-        if except_handle == 0:
-            break
-        except_handle -= 1
-
-    i, j = end
-    k = m[i][j]
-    the_path = [(i, j)]
-    while k > 1:
-        if i > 0 and m[i - 1][j] == k - 1:
-            i, j = i - 1, j
-            the_path.append((i, j))
-            k -= 1
-        elif j > 0 and m[i][j - 1] == k - 1:
-            i, j = i, j - 1
-            the_path.append((i, j))
-            k -= 1
-        elif i < len(m) - 1 and m[i + 1][j] == k - 1:
-            i, j = i + 1, j
-            the_path.append((i, j))
-            k -= 1
-        elif j < len(m[i]) - 1 and m[i][j + 1] == k - 1:
-            i, j = i, j + 1
-            the_path.append((i, j))
-            k -= 1
-
-    the_path.reverse()
-    return the_path
-
-
 def path_finder(collision_maze: list, start: list[int], end: list[int], collision_block_char: str) -> list[int]:
-    # EMERGENCY PATCH
-    start = (start[1], start[0])
-    end = (end[1], end[0])
-    # END EMERGENCY PATCH
-
-    path = path_finder_v2(collision_maze, start, end, collision_block_char)
-
-    new_path = []
-    for i in path:
-        new_path += [(i[1], i[0])]
-    path = new_path
-
-    return path
+    """Shortest path of (x, y) tiles from `start` to `end`, prefer `StanfordTownExtEnv.find_path` which reuses the
+    occupancy grid and the path cache of the maze"""
+    blocked = np.array(collision_maze) == collision_block_char
+    return MazeNavigator(blocked, cache_size=0).find_path(start, end)
 
 
 def create_folder_if_not_there(curr_path):
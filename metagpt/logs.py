@@ -6,8 +6,16 @@
 @File    : logs.py
 """
 
+import asyncio
+import atexit
 import sys
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable, Optional, TextIO, Union
 
 from loguru import logger as _logger
 
@@ -28,21 +36,193 @@ def define_log_level(print_level="INFO", logfile_level="DEBUG", name: str = None
     _logger.remove()
     _logger.add(sys.stderr, level=print_level)
     _logger.add(METAGPT_ROOT / f"logs/{log_name}.txt", level=logfile_level)
-    return _logger
+    # the buffered llm streams go out before the log record, to keep the order of the output
+    return _logger.patch(lambda record: STREAM_OUTPUT.flush())
 
 
 logger = define_log_level()
 
+_stream_channel: ContextVar[str] = ContextVar("llm_stream_channel", default="")
+
+
+@contextmanager
+def stream_channel(name: str):
+    """Tag the llm streams of the current task with the channel `name`, an enclosing channel is kept"""
+    token = None if _stream_channel.get() else _stream_channel.set(name)
+    try:
+        yield
+    finally:
+        if token:
+            _stream_channel.reset(token)
+
+
+def get_stream_channel() -> str:
+    return _stream_channel.get()
+
+
+class StreamSink(ABC):
+    """Where the coalesced chunks of the llm streams are written to"""
+
+    @abstractmethod
+    def write(self, channel: str, text: str):
+        """Write the coalesced `text` of `channel`"""
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class TextSink(StreamSink):
+    """Write the chunks into a text stream, with a `[channel]` header whenever another channel takes over"""
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self._last_channel: Optional[str] = None
+
+    def write(self, channel: str, text: str):
+        if self._last_channel is not None and channel != self._last_channel:
+            self.stream.write(f"\n[{channel}] " if channel else "\n")
+        self._last_channel = channel
+        self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+class TerminalSink(TextSink):
+    def __init__(self):
+        super().__init__(sys.stdout)
+
+    def write(self, channel: str, text: str):
+        self.stream = sys.stdout  # follow the redirections of stdout, like pytest's capture
+        super().write(channel, text)
+
+
+class FileSink(TextSink):
+    def __init__(self, path: Union[str, Path]):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        super().__init__(open(path, "a", encoding="utf-8"))
+
+    def close(self):
+        self.stream.close()
+
+
+class CallbackSink(StreamSink):
+    """Pass the chunks to `func`, like `StreamPipe.set_message` serving them as server-sent events
+
+    Args:
+        func: called with the coalesced text of a channel.
+        channels: only the chunks of these channels, all of them by default.
+    """
+
+    def __init__(self, func: Callable[[str], None], channels: Optional[Iterable[str]] = None):
+        self.func = func
+        self.channels = set(channels) if channels is not None else None
+
+    def write(self, channel: str, text: str):
+        if self.channels is None or channel in self.channels:
+            self.func(text)
+
+
+class StreamOutput:
+    """Per-channel buffers of the llm stream chunks, drained into the sinks by a single writer task.
+
+    `put` only appends to the buffer of the channel of the caller, the writer wakes up every `interval` seconds and
+    writes the text buffered by each channel in one piece, so that concurrent streams don't wait on the sinks and
+    don't interleave chunk by chunk. Without a running event loop, `put` writes through. The buffers are flushed
+    at the end of a stream and before a log record, so the stream text is not printed after the later log lines.
+    """
+
+    def __init__(self, sinks: Optional[list[StreamSink]] = None, interval: float = 0.05):
+        self.sinks: list[StreamSink] = sinks if sinks is not None else [TerminalSink()]
+        self.interval = interval
+        self._buffers: dict[str, list[str]] = {}
+        self._lock = threading.Lock()  # chunks may come from worker threads, or threads running their own loop
+        self._flush_lock = threading.RLock()  # a sink may log, which flushes again
+        self._writers: dict[asyncio.AbstractEventLoop, asyncio.Task] = {}
+
+    def add_sink(self, sink: StreamSink):
+        self.sinks.append(sink)
+
+    def remove_sink(self, sink: StreamSink):
+        self.flush()
+        self.sinks.remove(sink)
+        sink.close()
+
+    def put(self, text: str):
+        with self._lock:
+            self._buffers.setdefault(get_stream_channel(), []).append(text)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        with self._lock:
+            writer = self._writers.get(loop)
+            if writer is None or writer.done():
+                for done_loop in [lp for lp, task in self._writers.items() if task.done() or lp.is_closed()]:
+                    self._writers.pop(done_loop)
+                self._writers[loop] = loop.create_task(self._write_loop())
+
+    def flush(self):
+        """Write the buffered chunks into the sinks now"""
+        with self._flush_lock:
+            with self._lock:
+                buffers, self._buffers = self._buffers, {}
+            if not buffers:
+                return
+            for channel, chunks in buffers.items():
+                text = "".join(chunks)
+                for sink in self.sinks:
+                    sink.write(channel, text)
+            for sink in self.sinks:
+                sink.flush()
+
+    async def _write_loop(self):
+        try:
+            while self._buffers:
+                await asyncio.sleep(self.interval)
+                self.flush()
+        finally:
+            # also when the loop is shutting down
+            self.flush()
+
+
+STREAM_OUTPUT = StreamOutput()
+atexit.register(STREAM_OUTPUT.flush)
+
+
+_stream_listeners: ContextVar[tuple[Callable[[str], None], ...]] = ContextVar("llm_stream_listeners", default=())
+
+
+@contextmanager
+def stream_listener(func: Callable[[str], None]):
+    """Also pass the llm stream chunks of the current task to `func`"""
+    token = _stream_listeners.set(_stream_listeners.get() + (func,))
+    try:
+        yield
+    finally:
+        _stream_listeners.reset(token)
+
 
 def log_llm_stream(msg):
     _llm_stream_log(msg)
+    for listener in _stream_listeners.get():
+        listener(msg)
 
 
 def set_llm_stream_logfunc(func):
+    """Replace the buffered stream output with `func`, called with every chunk. Prefer `STREAM_OUTPUT.add_sink`."""
     global _llm_stream_log
     _llm_stream_log = func
 
 
 def _llm_stream_log(msg):
     if _print_level in ["INFO"]:
-        print(msg, end="")
+        # only buffered here, the sinks of `STREAM_OUTPUT` are written by a background task
+        STREAM_OUTPUT.put(msg)
+        if msg == "\n":
+            # the end of a stream
+            STREAM_OUTPUT.flush()
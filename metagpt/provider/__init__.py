@@ -19,6 +19,7 @@ from metagpt.provider.dashscope_api import DashScopeLLM
 from metagpt.provider.anthropic_api import AnthropicLLM
 from metagpt.provider.bedrock_api import BedrockLLM
 from metagpt.provider.ark_api import ArkLLM
+from metagpt.provider.router_api import RouterLLM
 
 __all__ = [
     "GeminiLLM",
@@ -34,4 +35,5 @@ __all__ = [
     "AnthropicLLM",
     "BedrockLLM",
     "ArkLLM",
+    "RouterLLM",
 ]
@@ -1,15 +1,19 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+from typing import Union
+
 from anthropic import AsyncAnthropic
 from anthropic.types import Message, Usage
 
 from metagpt.configs.llm_config import LLMConfig, LLMType
 from metagpt.const import USE_CONFIG_TIMEOUT
 from metagpt.logs import log_llm_stream
-from metagpt.provider.base_llm import BaseLLM
+from metagpt.provider.base_llm import PROMPT_CACHE_MARK, BaseLLM
 from metagpt.provider.llm_provider_registry import register_provider
 
+PROMPT_CACHING_BETA = "prompt-caching-2024-07-31"
+
 
 @register_provider([LLMType.ANTHROPIC, LLMType.CLAUDE])
 class AnthropicLLM(BaseLLM):
@@ -33,10 +37,39 @@ class AnthropicLLM(BaseLLM):
             if messages[0]["role"] == "system":
                 kwargs["messages"] = messages[1:]
                 kwargs["system"] = messages[0]["content"]  # set system prompt here
+        if any(self._has_cache_control(msg["content"]) for msg in messages):
+            kwargs["extra_headers"] = {"anthropic-beta": PROMPT_CACHING_BETA}
         return kwargs
 
+    def _format_prompt_cache(self, messages: list[dict]) -> list[dict]:
+        """Put a `cache_control` breakpoint at the end of the marked system prompt and of the last marked message"""
+        marked = [idx for idx, msg in enumerate(messages) if msg.get(PROMPT_CACHE_MARK)]
+        messages = super()._format_prompt_cache(messages)
+        breakpoints = set(marked[-1:]) | set([idx for idx in marked if messages[idx]["role"] == "system"][-1:])
+        for idx in breakpoints:
+            messages[idx] = {**messages[idx], "content": self._cache_control_blocks(messages[idx]["content"])}
+        return messages
+
+    @staticmethod
+    def _cache_control_blocks(content: Union[str, list[dict]]) -> list[dict]:
+        blocks = [{"type": "text", "text": content}] if isinstance(content, str) else [dict(b) for b in content]
+        blocks[-1]["cache_control"] = {"type": "ephemeral"}
+        return blocks
+
+    @staticmethod
+    def _has_cache_control(content: Union[str, list[dict]]) -> bool:
+        return isinstance(content, list) and any("cache_control" in block for block in content)
+
     def _update_costs(self, usage: Usage, model: str = None, local_calc_usage: bool = True):
-        usage = {"prompt_tokens": usage.input_tokens, "completion_tokens": usage.output_tokens}
+        # the input tokens written into or read from the prompt cache are not counted in `input_tokens`
+        cache_creation_tokens = getattr(usage, "cache_creation_input_tokens", None) or 0
+        cache_read_tokens = getattr(usage, "cache_read_input_tokens", None) or 0
+        usage = {
+            "prompt_tokens": usage.input_tokens + cache_creation_tokens + cache_read_tokens,
+            "completion_tokens": usage.output_tokens,
+            "cached_tokens": cache_read_tokens,
+            "cache_write_tokens": cache_creation_tokens,
+        }
         super()._update_costs(usage, model)
 
     def get_choice_text(self, resp: Message) -> str:
@@ -57,8 +90,7 @@ class AnthropicLLM(BaseLLM):
         async for event in stream:
             event_type = event.type
             if event_type == "message_start":
-                usage.input_tokens = event.message.usage.input_tokens
-                usage.output_tokens = event.message.usage.output_tokens
+                usage = event.message.usage.model_copy()  # with the prompt cache tokens
             elif event_type == "content_block_delta":
                 content = event.delta.text
                 log_llm_stream(content)
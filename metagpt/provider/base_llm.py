@@ -8,9 +8,10 @@
 """
 from __future__ import annotations
 
+import hashlib
 import json
 from abc import ABC, abstractmethod
-from typing import Optional, Union
+from typing import Callable, Optional, Union
 
 from openai import AsyncOpenAI
 from pydantic import BaseModel
@@ -24,10 +25,18 @@ from tenacity import (
 
 from metagpt.configs.llm_config import LLMConfig
 from metagpt.const import LLM_API_TIMEOUT, USE_CONFIG_TIMEOUT
-from metagpt.logs import logger
+from metagpt.logs import log_llm_stream, logger, stream_listener
+from metagpt.provider.llm_batch import get_llm_batch
 from metagpt.schema import Message
 from metagpt.utils.common import log_and_reraise
 from metagpt.utils.cost_manager import CostManager, Costs
+from metagpt.utils.singleflight import SingleFlight
+
+# a message with `{PROMPT_CACHE_MARK: True}` ends a stable prefix of the prompt, which the provider may cache
+PROMPT_CACHE_MARK = "cache"
+
+# the identical requests in flight at the same time, shared by all the llm instances
+LLM_SINGLEFLIGHT = SingleFlight()
 
 
 class BaseLLM(ABC):
@@ -86,7 +95,7 @@ class BaseLLM(ABC):
             if isinstance(msg, str):
                 processed_messages.append({"role": "user", "content": msg})
             elif isinstance(msg, dict):
-                assert set(msg.keys()) == set(["role", "content"])
+                assert set(msg.keys()) - {PROMPT_CACHE_MARK} == set(["role", "content"])
                 processed_messages.append(msg)
             elif isinstance(msg, Message):
                 processed_messages.append(msg.to_dict())
@@ -102,6 +111,14 @@ class BaseLLM(ABC):
     def _default_system_msg(self):
         return self._system_msg(self.system_prompt)
 
+    def _format_prompt_cache(self, messages: list[dict]) -> list[dict]:
+        """Turn the prompt cache marks of `messages` into what the provider understands.
+
+        By default the marks are dropped: providers like OpenAI reuse the longest prefix they have already seen by
+        themselves, it is enough that `aask` sends the stable messages first.
+        """
+        return [{k: v for k, v in msg.items() if k != PROMPT_CACHE_MARK} for msg in messages]
+
     def _update_costs(self, usage: Union[dict, BaseModel], model: str = None, local_calc_usage: bool = True):
         """update each request's token cost
         Args:
@@ -116,7 +133,22 @@ class BaseLLM(ABC):
             try:
                 prompt_tokens = int(usage.get("prompt_tokens", 0))
                 completion_tokens = int(usage.get("completion_tokens", 0))
-                self.cost_manager.update_cost(prompt_tokens, completion_tokens, model)
+                # `prompt_tokens_details` as OpenAI reports the prompt tokens read from its cache
+                cached_tokens = int(
+                    usage.get("cached_tokens") or (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+                )
+                # the prompt tokens written into the cache, reported by providers like Anthropic
+                cache_write_tokens = int(usage.get("cache_write_tokens") or 0)
+                if cached_tokens or cache_write_tokens:
+                    self.cost_manager.update_cost(
+                        prompt_tokens,
+                        completion_tokens,
+                        model,
+                        cached_tokens=cached_tokens,
+                        cache_write_tokens=cache_write_tokens,
+                    )
+                else:
+                    self.cost_manager.update_cost(prompt_tokens, completion_tokens, model)
             except Exception as e:
                 logger.error(f"{self.__class__.__name__} updates costs failed! exp: {e}")
 
@@ -133,23 +165,40 @@ class BaseLLM(ABC):
         images: Optional[Union[str, list[str]]] = None,
         timeout=USE_CONFIG_TIMEOUT,
         stream=None,
+        cache_prefix: Optional[bool] = None,
+        coalesce: Optional[bool] = None,
     ) -> str:
+        """
+        Args:
+            cache_prefix: mark the system messages and `format_msgs`, which are sent before `msg`, as a stable prefix
+                the provider may cache, `llm.prompt_cache` by default. The messages of `msg` can also carry their own
+                `{PROMPT_CACHE_MARK: True}`.
+            coalesce: see `acompletion_text`.
+        """
         if system_msgs:
             message = self._system_msgs(system_msgs)
         else:
             message = [self._default_system_msg()]
         if not self.use_system_prompt:
             message = []
+        system_end = len(message)
         if format_msgs:
             message.extend(format_msgs)
+        if cache_prefix is None:
+            cache_prefix = self.config.prompt_cache
+        if cache_prefix and message:
+            # the system prompt is shared by more prompts than the whole prefix, so it ends a prefix of its own
+            for idx in {system_end - 1, len(message) - 1} - {-1}:
+                message[idx] = {**message[idx], PROMPT_CACHE_MARK: True}
         if isinstance(msg, str):
             message.append(self._user_msg(msg, images=images))
         else:
             message.extend(msg)
+        message = self._format_prompt_cache(message)
         if stream is None:
             stream = self.config.stream
         logger.debug(message)
-        rsp = await self.acompletion_text(message, stream=stream, timeout=self.get_timeout(timeout))
+        rsp = await self.acompletion_text(message, stream=stream, timeout=self.get_timeout(timeout), coalesce=coalesce)
         return rsp
 
     def _extract_assistant_rsp(self, context):
@@ -187,6 +236,52 @@ class BaseLLM(ABC):
     async def _achat_completion_stream(self, messages: list[dict], timeout: int = USE_CONFIG_TIMEOUT) -> str:
         """_achat_completion_stream implemented by inherited class"""
 
+    async def acompletion_text(
+        self,
+        messages: list[dict],
+        stream: bool = False,
+        timeout: int = USE_CONFIG_TIMEOUT,
+        coalesce: Optional[bool] = None,
+    ) -> str:
+        """Asynchronous version of completion. Return str. Support stream-print
+
+        Args:
+            coalesce: share one request among the identical concurrent calls, by default when the temperature is 0.
+                The callers who join a streaming request get its chunks replayed into their own stream log. Pass
+                False to get a sample of its own, like when sampling several answers with temperature > 0.
+                Inside `async with LLMBatch(...)`, the request waits for its answer from the batch instead.
+        """
+        if batch := get_llm_batch():
+            rsp = await batch.submit(self, messages)
+            if stream:
+                log_llm_stream(rsp)
+                log_llm_stream("\n")
+            return rsp
+        if coalesce is None:
+            coalesce = self.config.temperature == 0
+        if not coalesce:
+            return await self._acompletion_text(messages, stream=stream, timeout=timeout)
+
+        async def request(publish: Callable[[str], None]) -> str:
+            with stream_listener(publish):
+                return await self._acompletion_text(messages, stream=stream, timeout=timeout)
+
+        key = self._request_key(messages, stream=stream)
+        return await LLM_SINGLEFLIGHT.do(key, request, on_chunk=log_llm_stream if stream else None)
+
+    def _request_key(self, messages: list[dict], stream: bool = False) -> str:
+        """The canonical hash of a request, the same for the byte-identical requests to the same model"""
+        request = {
+            "llm": type(self).__name__,
+            "base_url": self.config.base_url,
+            "model": self.config.model,
+            "temperature": self.config.temperature,
+            "max_token": self.config.max_token,
+            "stream": stream,
+            "messages": messages,
+        }
+        return hashlib.sha256(json.dumps(request, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_random_exponential(min=1, max=60),
@@ -194,15 +289,43 @@ class BaseLLM(ABC):
         retry=retry_if_exception_type(ConnectionError),
         retry_error_callback=log_and_reraise,
     )
-    async def acompletion_text(
+    async def _acompletion_text(
         self, messages: list[dict], stream: bool = False, timeout: int = USE_CONFIG_TIMEOUT
     ) -> str:
-        """Asynchronous version of completion. Return str. Support stream-print"""
+        """The request of `acompletion_text`, made once for the coalesced calls"""
         if stream:
             return await self._achat_completion_stream(messages, timeout=self.get_timeout(timeout))
         resp = await self._achat_completion(messages, timeout=self.get_timeout(timeout))
         return self.get_choice_text(resp)
 
+    def _batch_body(self, messages: list[dict]) -> dict:
+        """The body of the request in the JSONL input of a batch, as in the OpenAI chat completions api"""
+        return {
+            "model": self.config.model,
+            "messages": messages,
+            "temperature": self.config.temperature,
+            "max_tokens": self.config.max_token,
+        }
+
+    @property
+    def supports_batch(self) -> bool:
+        """Whether the provider implements `_acreate_batch` and `_aretrieve_batch`, `LLMBatch` runs the requests
+        locally otherwise"""
+        return False
+
+    async def _acreate_batch(self, data: bytes) -> str:
+        """Upload the JSONL input of a batch and submit it, return the batch id.
+
+        Only called when `supports_batch`. Raise `BatchUnavailableError` when the service has no batch endpoint after
+        all, `LLMBatch` runs the requests locally then.
+        """
+        raise NotImplementedError
+
+    async def _aretrieve_batch(self, batch_id: str) -> Optional[list[dict]]:
+        """None while the batch is running, then the `{"custom_id", "content"}` or `{"custom_id", "error"}` of its
+        requests"""
+        raise NotImplementedError
+
     def get_choice_text(self, rsp: dict) -> str:
         """Required to provide the first text of choice"""
         return rsp.get("choices")[0]["message"]["content"]
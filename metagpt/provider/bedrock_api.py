@@ -1,8 +1,10 @@
 import asyncio
 import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
-from typing import List, Literal
+from typing import AsyncIterator, Iterable, List, Literal
 
 import boto3
 from botocore.eventstream import EventStream
@@ -17,6 +19,19 @@ from metagpt.provider.llm_provider_registry import register_provider
 from metagpt.utils.cost_manager import CostManager
 from metagpt.utils.token_counter import BEDROCK_TOKEN_COSTS
 
+INVOCATION_METRICS_KEY = "amazon-bedrock-invocationMetrics"
+
+_EXECUTORS: dict[int, ThreadPoolExecutor] = {}
+_EXECUTORS_LOCK = threading.Lock()
+
+
+def get_executor(max_workers: int) -> ThreadPoolExecutor:
+    """The executor of the boto3 calls, bounded so that they don't starve the other users of the default executor"""
+    with _EXECUTORS_LOCK:
+        if max_workers not in _EXECUTORS:
+            _EXECUTORS[max_workers] = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bedrock")
+        return _EXECUTORS[max_workers]
+
 
 @register_provider([LLMType.BEDROCK])
 class BedrockLLM(BaseLLM):
@@ -24,6 +39,7 @@ class BedrockLLM(BaseLLM):
         self.config = config
         self.__client = self.__init_client("bedrock-runtime")
         self.__provider = get_provider(self.config.model)
+        self.__executor = get_executor(self.config.max_workers)
         self.cost_manager = CostManager(token_costs=BEDROCK_TOKEN_COSTS)
         if self.config.model in NOT_SUPPORT_STREAM_MODELS:
             logger.warning(f"model {self.config.model} doesn't support streaming output!")
@@ -70,7 +86,7 @@ class BedrockLLM(BaseLLM):
     async def invoke_model(self, request_body: str) -> dict:
         loop = asyncio.get_running_loop()
         response = await loop.run_in_executor(
-            None, partial(self.client.invoke_model, modelId=self.config.model, body=request_body)
+            self.__executor, partial(self.client.invoke_model, modelId=self.config.model, body=request_body)
         )
         usage = self._get_usage(response)
         self._update_costs(usage, self.config.model)
@@ -78,12 +94,12 @@ class BedrockLLM(BaseLLM):
         return response_body
 
     async def invoke_model_with_response_stream(self, request_body: str) -> EventStream:
+        """Open the stream, its usage comes with the last event, see `_get_stream_response_body`"""
         loop = asyncio.get_running_loop()
         response = await loop.run_in_executor(
-            None, partial(self.client.invoke_model_with_response_stream, modelId=self.config.model, body=request_body)
+            self.__executor,
+            partial(self.client.invoke_model_with_response_stream, modelId=self.config.model, body=request_body),
         )
-        usage = self._get_usage(response)
-        self._update_costs(usage, self.config.model)
         return response
 
     @property
@@ -131,16 +147,61 @@ class BedrockLLM(BaseLLM):
         return response_body
 
     async def _get_stream_response_body(self, stream_response) -> List[str]:
-        def collect_content() -> str:
-            collected_content = []
-            for event in stream_response["body"]:
-                chunk_text = self.__provider.get_choice_text_from_stream(event)
-                collected_content.append(chunk_text)
-                log_llm_stream(chunk_text)
-            return collected_content
-
+        collected_content = []
+        async for event in self._aiter_stream_events(stream_response["body"]):
+            usage = self._get_usage_from_stream_event(event)
+            if usage:
+                self._update_costs(usage, self.config.model)
+            chunk_text = self.__provider.get_choice_text_from_stream(event)
+            collected_content.append(chunk_text)
+            log_llm_stream(chunk_text)
+        return collected_content
+
+    async def _aiter_stream_events(self, event_stream: Iterable[dict]) -> AsyncIterator[dict]:
+        """Relay the events of the blocking boto3 event stream to the event loop as they arrive"""
         loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, collect_content)
+        queue = asyncio.Queue()
+        stopped = threading.Event()
+        end = object()
+
+        def put(item):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:  # the event loop is closed
+                stopped.set()
+
+        def relay():
+            try:
+                for event in event_stream:
+                    if stopped.is_set():  # the consumer is gone
+                        return
+                    put((event, None))
+                put((end, None))
+            except Exception as exc:
+                put((end, exc))
+
+        loop.run_in_executor(self.__executor, relay)
+        try:
+            while True:
+                event, exc = await queue.get()
+                if event is end:
+                    if exc:
+                        raise exc
+                    return
+                yield event
+        finally:
+            stopped.set()
+
+    def _get_usage_from_stream_event(self, event: dict) -> dict[str, int]:
+        """The usage reported by the last event of a stream, empty for the other events"""
+        chunk_bytes = event.get("chunk", {}).get("bytes", b"")
+        if INVOCATION_METRICS_KEY.encode("utf-8") not in chunk_bytes:
+            return {}
+        metrics = json.loads(chunk_bytes).get(INVOCATION_METRICS_KEY, {})
+        return {
+            "prompt_tokens": int(metrics.get("inputTokenCount", 0)),
+            "completion_tokens": int(metrics.get("outputTokenCount", 0)),
+        }
 
     def _get_usage(self, response) -> dict[str, int]:
         headers = response.get("ResponseMetadata", {}).get("HTTPHeaders", {})
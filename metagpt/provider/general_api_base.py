@@ -37,6 +37,8 @@ import logging
 import openai
 from openai import version
 
+from metagpt.utils.ahttp_client import hold_session
+
 logger = logging.getLogger("openai")
 
 TIMEOUT_SECS = 600
@@ -388,9 +390,7 @@ class APIRequestor:
         request_id: Optional[str] = None,
         request_timeout: Optional[Union[float, Tuple[float, float]]] = None,
     ) -> Tuple[Union[OpenAIResponse, AsyncGenerator[OpenAIResponse, None]], bool, str]:
-        ctx = aiohttp_session()
-        session = await ctx.__aenter__()
-        try:
+        async with aiohttp_session() as session:
             result = await self.arequest_raw(
                 method.lower(),
                 url,
@@ -401,23 +401,26 @@ class APIRequestor:
                 request_id=request_id,
                 request_timeout=request_timeout,
             )
-            resp, got_stream = await self._interpret_async_response(result, stream)
-        except Exception:
-            await ctx.__aexit__(None, None, None)
-            raise
+            try:
+                resp, got_stream = await self._interpret_async_response(result, stream)
+            except Exception:
+                result.release()
+                raise
         if got_stream:
 
             async def wrap_resp():
                 assert isinstance(resp, AsyncGenerator)
                 try:
-                    async for r in resp:
-                        yield r
+                    async with hold_session():
+                        async for r in resp:
+                            yield r
                 finally:
-                    await ctx.__aexit__(None, None, None)
+                    # hand the connection back to the shared pool
+                    result.release()
 
             return wrap_resp(), got_stream, self.api_key
         else:
-            await ctx.__aexit__(None, None, None)
+            result.release()
             return resp, got_stream, self.api_key
 
     def request_headers(self, method: str, extra, request_id: Optional[str]) -> Dict[str, str]:
@@ -618,5 +621,6 @@ class APIRequestor:
 
 @asynccontextmanager
 async def aiohttp_session() -> AsyncIterator[aiohttp.ClientSession]:
-    async with aiohttp.ClientSession() as session:
+    """The keep-alive session shared in the running event loop, it stays open on exit to reuse its connections"""
+    async with hold_session() as session:
         yield session
@@ -47,7 +47,7 @@ class HumanProvider(BaseLLM):
     async def _achat_completion_stream(self, messages: list[dict], timeout: int = USE_CONFIG_TIMEOUT) -> str:
         pass
 
-    async def acompletion_text(self, messages: list[dict], stream=False, timeout=USE_CONFIG_TIMEOUT) -> str:
+    async def acompletion_text(self, messages: list[dict], stream=False, timeout=USE_CONFIG_TIMEOUT, **kwargs) -> str:
         """dummy implementation of abstract method in base"""
         return ""
 
@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : batch execution of the bulk, latency-insensitive llm requests
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import json
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+from metagpt.logs import logger
+
+if TYPE_CHECKING:
+    from metagpt.provider.base_llm import BaseLLM
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+
+class BatchUnavailableError(Exception):
+    """The llm supports batches, but its service turns out to have no batch endpoint"""
+
+
+_llm_batch: contextvars.ContextVar[Optional["LLMBatch"]] = contextvars.ContextVar("llm_batch", default=None)
+
+
+def get_llm_batch() -> Optional["LLMBatch"]:
+    return _llm_batch.get()
+
+
+class LLMBatch:
+    """Collect the `acompletion_text` calls made inside `async with LLMBatch(...)` into batches.
+
+    The requests to the same llm are written as the JSONL input of the OpenAI Batch API
+    (`{"custom_id", "method", "url", "body"}`), submitted with `llm._acreate_batch` and polled with
+    `llm._aretrieve_batch`. The llms without `supports_batch`, or raising `BatchUnavailableError`, run them in a
+    local pool of `concurrency` workers instead. Every call awaits until the answer of its own request is back,
+    identical requests share one.
+
+    With `checkpoint_dir`, the input files, the submitted batches (`batches.jsonl`) and the answers
+    (`results.jsonl`) are kept there, so the calls of a crashed run get their answers back from the results or from
+    the batch already submitted when it runs again, instead of being sent twice.
+    """
+
+    def __init__(
+        self,
+        checkpoint_dir: Optional[Path] = None,
+        max_requests: int = 1000,
+        flush_interval: float = 1.0,
+        poll_interval: float = 30.0,
+        concurrency: int = 8,
+    ):
+        """
+        Args:
+            checkpoint_dir: where to keep the requests and answers to resume from, None to keep them in memory only.
+            max_requests: submit a batch as soon as it has that many requests.
+            flush_interval: seconds to wait for more requests after the first one of a batch.
+            poll_interval: seconds between two polls of a submitted batch.
+            concurrency: the size of the local worker pool.
+        """
+        self.checkpoint_dir = Path(checkpoint_dir) if checkpoint_dir else None
+        self.max_requests = max_requests
+        self.flush_interval = flush_interval
+        self.poll_interval = poll_interval
+        self.concurrency = concurrency
+        self.results: dict[str, str] = {}
+        self._submitted: dict[str, str] = {}  # custom_id -> id of the batch submitted by a previous run
+        self._waiters: dict[str, asyncio.Future] = {}
+        self._queued: dict[str, tuple[BaseLLM, list[dict]]] = {}
+        self._jobs: set[asyncio.Task] = set()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._token: Optional[contextvars.Token] = None
+        self._workers: Optional[asyncio.Semaphore] = None
+        self._num_files = 0
+        if self.checkpoint_dir:
+            self._load()
+
+    async def __aenter__(self) -> "LLMBatch":
+        if self.checkpoint_dir:
+            self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        self._token = _llm_batch.set(self)
+        self._workers = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        try:
+            while self._queued or self._jobs:
+                self.flush()
+                await asyncio.gather(*self._jobs, return_exceptions=True)
+        finally:
+            _llm_batch.reset(self._token)
+
+    def _path(self, filename: str) -> Path:
+        return self.checkpoint_dir / filename
+
+    def _load(self):
+        if self._path("results.jsonl").exists():
+            for record in self._read_jsonl(self._path("results.jsonl")):
+                self.results[record["custom_id"]] = record["content"]
+        if self._path("batches.jsonl").exists():
+            for record in self._read_jsonl(self._path("batches.jsonl")):
+                for custom_id in record["custom_ids"]:
+                    if custom_id not in self.results:
+                        self._submitted[custom_id] = record["batch_id"]
+        self._num_files = len(list(self.checkpoint_dir.glob("input-*.jsonl")))
+        if self.results or self._submitted:
+            logger.info(
+                f"resume llm batch from {self.checkpoint_dir}: {len(self.results)} answered, "
+                f"{len(self._submitted)} submitted"
+            )
+
+    @staticmethod
+    def _read_jsonl(path: Path) -> list[dict]:
+        with open(path, "r", encoding="utf-8") as reader:
+            return [json.loads(line) for line in reader if line.strip()]
+
+    def _append(self, filename: str, records: list[dict]):
+        if self.checkpoint_dir and records:
+            with open(self._path(filename), "a", encoding="utf-8") as writer:
+                writer.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+
+    async def submit(self, llm: BaseLLM, messages: list[dict]) -> str:
+        """Add the request to the next batch of `llm`, and return its answer once the batch is done"""
+        custom_id = llm._request_key(messages)
+        if custom_id in self.results:
+            return self.results[custom_id]
+        waiter = self._waiters.get(custom_id)
+        if waiter is None:
+            waiter = self._waiters[custom_id] = asyncio.get_running_loop().create_future()
+            if custom_id in self._submitted:
+                self._resume(llm, self._submitted[custom_id])
+            else:
+                self._queued[custom_id] = (llm, messages)
+                if len(self._queued) >= self.max_requests:
+                    self.flush()
+                elif self._timer is None:
+                    self._timer = asyncio.get_running_loop().call_later(self.flush_interval, self.flush)
+        return await asyncio.shield(waiter)
+
+    def flush(self):
+        """Submit the queued requests now, one batch per llm"""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        groups: dict[tuple, tuple[BaseLLM, dict[str, list[dict]]]] = {}
+        for custom_id, (llm, messages) in self._queued.items():
+            group = (type(llm), llm.config.base_url, llm.config.model, llm.config.api_key)
+            groups.setdefault(group, (llm, {}))[1][custom_id] = messages
+        self._queued = {}
+        for llm, requests in groups.values():
+            self._start(self._run(llm, requests), list(requests))
+
+    def _start(self, coro, custom_ids: list[str]):
+        job = asyncio.create_task(coro)
+        self._jobs.add(job)
+
+        def done(task: asyncio.Task):
+            self._jobs.discard(task)
+            error = task.exception() if not task.cancelled() else asyncio.CancelledError()
+            for custom_id in custom_ids:
+                # the requests the job didn't answer fail with its error
+                self._resolve(custom_id, error=error or RuntimeError(f"no answer in the batch for {custom_id}"))
+
+        job.add_done_callback(done)
+
+    def _resume(self, llm: BaseLLM, batch_id: str):
+        custom_ids = [custom_id for custom_id, submitted in self._submitted.items() if submitted == batch_id]
+        for custom_id in custom_ids:
+            self._submitted.pop(custom_id)
+            self._waiters.setdefault(custom_id, asyncio.get_running_loop().create_future())
+        logger.info(f"resume polling batch {batch_id} of {len(custom_ids)} requests")
+        self._start(self._poll(llm, batch_id), custom_ids)
+
+    def _resolve(self, custom_id: str, content: Optional[str] = None, error: Optional[BaseException] = None):
+        waiter = self._waiters.pop(custom_id, None)
+        if error is None:
+            self.results[custom_id] = content
+            self._append("results.jsonl", [{"custom_id": custom_id, "content": content}])
+        if waiter is None or waiter.done():
+            return
+        if error is None:
+            waiter.set_result(content)
+        elif isinstance(error, asyncio.CancelledError):
+            waiter.cancel()
+        else:
+            waiter.set_exception(error)
+
+    async def _run(self, llm: BaseLLM, requests: dict[str, list[dict]]):
+        if not llm.supports_batch:
+            await self._run_local(llm, requests)
+            return
+
+        lines = [
+            {"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": llm._batch_body(messages)}
+            for custom_id, messages in requests.items()
+        ]
+        self._num_files += 1
+        if self.checkpoint_dir:
+            input_file = self._path(f"input-{self._num_files}.jsonl")
+            self._append(input_file.name, lines)
+            data = input_file.read_bytes()
+        else:
+            data = "".join(json.dumps(line, ensure_ascii=False) + "\n" for line in lines).encode("utf-8")
+
+        try:
+            batch_id = await llm._acreate_batch(data)
+        except BatchUnavailableError as e:
+            logger.warning(f"run the batch of {len(requests)} requests locally: {e}")
+            await self._run_local(llm, requests)
+            return
+        self._append("batches.jsonl", [{"batch_id": batch_id, "custom_ids": list(requests)}])
+        logger.info(f"submit batch {batch_id} of {len(requests)} requests")
+        await self._poll(llm, batch_id)
+
+    async def _poll(self, llm: BaseLLM, batch_id: str):
+        while (output := await llm._aretrieve_batch(batch_id)) is None:
+            await asyncio.sleep(self.poll_interval)
+        for record in output:
+            if "content" in record:
+                self._resolve(record["custom_id"], content=record["content"])
+            else:
+                self._resolve(record["custom_id"], error=RuntimeError(f"batch request failed: {record['error']}"))
+
+    async def _run_local(self, llm: BaseLLM, requests: dict[str, list[dict]]):
+        async def run(custom_id: str, messages: list[dict]):
+            async with self._workers:
+                try:
+                    content = await llm._acompletion_text(messages)
+                except Exception as e:
+                    self._resolve(custom_id, error=e)
+                else:
+                    self._resolve(custom_id, content=content)
+
+        await asyncio.gather(*(run(custom_id, messages) for custom_id, messages in requests.items()))
@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : try a cheap/fast model first and escalate to a stronger one when its answer isn't good enough
+
+from __future__ import annotations
+
+import re
+import time
+from fnmatch import fnmatchcase
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Optional, TypeVar, Union
+
+from metagpt.configs.models_config import ModelsConfig
+from metagpt.const import USE_CONFIG_TIMEOUT
+from metagpt.logs import logger
+from metagpt.provider.base_llm import BaseLLM
+from metagpt.utils.cost_manager import CostManager
+from metagpt.utils.token_counter import TOKEN_COSTS
+
+if TYPE_CHECKING:
+    from metagpt.context import Context
+    from metagpt.context_mixin import ContextMixin
+
+T = TypeVar("T")
+
+CONFIDENCE_CONSTRAINT = (
+    "Confidence: after the output, add a last line `[CONFIDENCE] <a number from 0 to 1>` rating how sure you are "
+    "that the output is right."
+)
+CONFIDENCE_PATTERN = re.compile(r"\n?\[CONFIDENCE\]\s*([0-9]*\.?[0-9]+)\s*$")
+
+
+class LowConfidenceError(ValueError):
+    """The model rated its answer below the confidence required to accept it"""
+
+
+class ConfidenceLLM:
+    """Ask `llm` to rate its confidence in its answers, and reject the answers rated under `min_confidence`"""
+
+    def __init__(self, llm: BaseLLM, min_confidence: float):
+        self.llm = llm
+        self.min_confidence = min_confidence
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.llm, name)
+
+    async def aask(self, msg: Union[str, list[dict[str, str]]], *args, **kwargs) -> str:
+        if isinstance(msg, str):
+            msg = f"{msg}\n{CONFIDENCE_CONSTRAINT}"
+        rsp = await self.llm.aask(msg, *args, **kwargs)
+        match = CONFIDENCE_PATTERN.search(rsp)
+        if not match:
+            return rsp
+        confidence = float(match.group(1))
+        if confidence < self.min_confidence:
+            raise LowConfidenceError(f"confidence {confidence} < {self.min_confidence}")
+        return rsp[: match.start()]
+
+
+class LevelCostManager(CostManager):
+    """The costs of a level of a cascade, also added to the cost manager of the context"""
+
+    parent: Optional[CostManager] = None
+
+    def update_cost(self, prompt_tokens, completion_tokens, model, cached_tokens: int = 0, cache_write_tokens: int = 0):
+        super().update_cost(
+            prompt_tokens, completion_tokens, model, cached_tokens=cached_tokens, cache_write_tokens=cache_write_tokens
+        )
+        if self.parent:
+            self.parent.update_cost(
+                prompt_tokens,
+                completion_tokens,
+                model,
+                cached_tokens=cached_tokens,
+                cache_write_tokens=cache_write_tokens,
+            )
+
+
+class CascadeLevel:
+    """A model of a cascade with its usage"""
+
+    def __init__(self, llm: BaseLLM):
+        self.llm = llm
+        self.cost_manager = LevelCostManager(parent=llm.cost_manager)
+        llm.cost_manager = self.cost_manager
+        self.calls = 0
+        self.accepted = 0
+        self.seconds = 0.0
+
+    @property
+    def name(self) -> str:
+        return self.llm.pricing_plan or self.llm.config.model
+
+    def price(self, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+        costs = TOKEN_COSTS.get(self.name)
+        if not costs:
+            return None
+        return (prompt_tokens * costs["prompt"] + completion_tokens * costs["completion"]) / 1000
+
+
+class ModelCascade:
+    """LLMs tried in order, from the cheapest/fastest to the strongest.
+
+    A call is escalated to the next model when it raises on the current one: the output doesn't parse against the
+    schema, is rejected by a validator, or is rated under `min_confidence` by the model itself. The answer of the last
+    model is always taken.
+    """
+
+    def __init__(self, name: str, llms: list[BaseLLM], min_confidence: float = 0.0):
+        assert llms, "a cascade requires at least one llm"
+        self.name = name
+        self.levels = [CascadeLevel(llm) for llm in llms]
+        self.min_confidence = min_confidence
+
+    @property
+    def strongest(self) -> BaseLLM:
+        return self.levels[-1].llm
+
+    async def run(self, call: Callable[[BaseLLM], Awaitable[T]]) -> T:
+        """Return the result of `call` on the first model it succeeds with"""
+        for idx, level in enumerate(self.levels):
+            last = idx == len(self.levels) - 1
+            llm = level.llm if last or not self.min_confidence else ConfidenceLLM(level.llm, self.min_confidence)
+            level.calls += 1
+            start = time.perf_counter()
+            try:
+                result = await call(llm)
+            except Exception as e:
+                if last:
+                    raise
+                logger.info(f"cascade {self.name}: escalate from {level.name}, {e}")
+                continue
+            finally:
+                level.seconds += time.perf_counter() - start
+            level.accepted += 1
+            return result
+
+    def report(self) -> dict:
+        """The usage of each model, and the time and money saved compared with asking the strongest model only.
+
+        The savings are estimated: the answers accepted from a cheaper model are priced as if the strongest model had
+        produced as many tokens, and timed with the mean latency of the strongest model.
+        """
+        strongest = self.levels[-1]
+        calls = self.levels[0].calls
+        actual_cost = sum(level.cost_manager.total_cost for level in self.levels)
+        actual_seconds = sum(level.seconds for level in self.levels)
+        baseline_cost = strongest.cost_manager.total_cost
+        for level in self.levels[:-1]:
+            if not level.accepted or baseline_cost is None:
+                continue
+            share = level.accepted / level.calls
+            cost = strongest.price(
+                level.cost_manager.total_prompt_tokens * share, level.cost_manager.total_completion_tokens * share
+            )
+            baseline_cost = None if cost is None else baseline_cost + cost
+        baseline_seconds = calls * strongest.seconds / strongest.calls if strongest.calls else None
+        return {
+            "calls": calls,
+            "levels": {
+                level.name: {
+                    "calls": level.calls,
+                    "accepted": level.accepted,
+                    "seconds": round(level.seconds, 3),
+                    "cost": round(level.cost_manager.total_cost, 6),
+                }
+                for level in self.levels
+            },
+            "saved_cost": None if baseline_cost is None else round(baseline_cost - actual_cost, 6),
+            "saved_seconds": None if baseline_seconds is None else round(baseline_seconds - actual_seconds, 3),
+        }
+
+
+def cascade_report(context: Context) -> dict[str, dict]:
+    """The reports of the cascades used in the context"""
+    return {name: cascade.report() for name, cascade in context.cascades.items()}
+
+
+def get_cascade(rule: str, context: Context, models_config: Optional[ModelsConfig] = None) -> Optional[ModelCascade]:
+    """The cascade of the rule of `config2.yaml` in the context, built with the models of `models` on first use.
+
+    The actions of a context share its cascades so their savings add up, and the costs of the models go to the cost
+    manager of the context like the costs of the other llms.
+    """
+    if rule in context.cascades:
+        return context.cascades[rule]
+    models_config = models_config or ModelsConfig.default()
+    llms = []
+    for name in models_config.cascades.get(rule, []):
+        config = models_config.get(name)
+        if not config:
+            logger.warning(f"cascade {rule}: model {name} is not in `models`, skipped")
+            continue
+        llms.append(context.llm_with_cost_manager_from_llm_config(config))
+    if not llms:
+        return None
+    context.cascades[rule] = ModelCascade(rule, llms, min_confidence=models_config.cascade_min_confidence)
+    return context.cascades[rule]
+
+
+class CascadeLLM(BaseLLM):
+    """The llm of an action with cascade rules, the rest of its requests go to its own `llm`.
+
+    The rules are the keys of `cascades` in `config2.yaml`, `fnmatch` patterns of the action name (for `Action._aask`
+    and its action nodes) or of `{action name}/{node key}` (for an action node filled on its own). For example, with
+    `cascades: {"WritePRD": ["gpt-4o-mini", "gpt-4o"]}`, the PRD is asked to `gpt-4o-mini` first. The child nodes
+    are only filled on their own with `strgy="complex"`, with the default `strgy="simple"` a node asks all its children
+    in a single prompt and the rule of the action applies.
+
+    The cascades are looked up in the context of `owner` when they are called, which is the context of the role and
+    of its team once the action is attached to a role.
+    """
+
+    def __init__(self, llm: BaseLLM, owner: ContextMixin, models_config: Optional[ModelsConfig] = None):
+        self.llm = llm
+        self.owner = owner
+        self.action = owner.name
+        self.models_config = models_config or ModelsConfig.default()
+        self.config = llm.config
+        self.use_system_prompt = llm.use_system_prompt
+        self.system_prompt = llm.system_prompt
+
+    @classmethod
+    def match(cls, action: str, models_config: ModelsConfig) -> bool:
+        """If there are cascade rules for the action or its nodes"""
+        return any(fnmatchcase(action, rule.split("/", 1)[0]) for rule in models_config.cascades)
+
+    @property
+    def context(self) -> Context:
+        return self.owner.context
+
+    @property
+    def cost_manager(self) -> Optional[CostManager]:
+        return self.llm.cost_manager
+
+    @cost_manager.setter
+    def cost_manager(self, cost_manager: Optional[CostManager]):
+        self.llm.cost_manager = cost_manager
+
+    def node_rules(self, nodes: list[str]) -> list[str]:
+        """The rules of `{action name}/{node key}` matching any of the nodes"""
+        return [
+            rule
+            for rule in self.models_config.cascades
+            if "/" in rule and any(fnmatchcase(f"{self.action}/{node}", rule) for node in nodes)
+        ]
+
+    def cascade_for(self, node: Optional[str] = None) -> Optional[ModelCascade]:
+        names = ([f"{self.action}/{node}"] if node else []) + [self.action]
+        for name in names:
+            for rule in self.models_config.cascades:
+                if fnmatchcase(name, rule):
+                    return get_cascade(rule, self.context, self.models_config)
+        return None
+
+    async def aask(
+        self,
+        msg: Union[str, list[dict[str, str]]],
+        system_msgs: Optional[list[str]] = None,
+        format_msgs: Optional[list[dict[str, str]]] = None,
+        images: Optional[Union[str, list[str]]] = None,
+        timeout=USE_CONFIG_TIMEOUT,
+        stream=None,
+        cache_prefix: Optional[bool] = None,
+        coalesce: Optional[bool] = None,
+    ) -> str:
+        # the system prompt set on the action goes along to the models of the cascade
+        system_msgs = system_msgs or [self.system_prompt]
+
+        async def ask(llm: BaseLLM) -> str:
+            return await llm.aask(
+                msg,
+                system_msgs,
+                format_msgs,
+                images=images,
+                timeout=timeout,
+                stream=stream,
+                cache_prefix=cache_prefix,
+                coalesce=coalesce,
+            )
+
+        cascade = self.cascade_for()
+        if not cascade:
+            return await ask(self.llm)
+        return await cascade.run(ask)
+
+    async def aask_code(self, messages, timeout=USE_CONFIG_TIMEOUT, **kwargs) -> dict:
+        return await self.llm.aask_code(messages, timeout=timeout, **kwargs)
+
+    async def _achat_completion(self, messages: list[dict], timeout=USE_CONFIG_TIMEOUT):
+        return await self.llm._achat_completion(messages, timeout=timeout)
+
+    async def acompletion(self, messages: list[dict], timeout=USE_CONFIG_TIMEOUT):
+        return await self.llm.acompletion(messages, timeout=timeout)
+
+    async def _achat_completion_stream(self, messages: list[dict], timeout: int = USE_CONFIG_TIMEOUT) -> str:
+        return await self.llm._achat_completion_stream(messages, timeout=timeout)
+
+    async def acompletion_text(self, messages: list[dict], stream: bool = False, timeout=USE_CONFIG_TIMEOUT, **kwargs):
+        return await self.llm.acompletion_text(messages, stream=stream, timeout=timeout, **kwargs)
@@ -12,6 +12,8 @@ from metagpt.provider.general_api_requestor import GeneralAPIRequestor
 from metagpt.provider.llm_provider_registry import register_provider
 from metagpt.utils.cost_manager import TokenCostManager
 
+OLLAMA_PROMPT_CACHE_KEEP_ALIVE = "30m"
+
 
 @register_provider(LLMType.OLLAMA)
 class OllamaLLM(BaseLLM):
@@ -35,6 +37,9 @@ class OllamaLLM(BaseLLM):
 
     def _const_kwargs(self, messages: list[dict], stream: bool = False) -> dict:
         kwargs = {"model": self.model, "messages": messages, "options": {"temperature": 0.3}, "stream": stream}
+        if self.config.prompt_cache:
+            # ollama reuses the kv cache of the common prefix of the chats while the model stays loaded
+            kwargs["keep_alive"] = OLLAMA_PROMPT_CACHE_KEEP_ALIVE
         return kwargs
 
     def get_choice_text(self, resp: dict) -> str:
@@ -12,7 +12,7 @@ import json
 import re
 from typing import Optional, Union
 
-from openai import APIConnectionError, AsyncOpenAI, AsyncStream
+from openai import APIConnectionError, AsyncOpenAI, AsyncStream, NotFoundError
 from openai._base_client import AsyncHttpxClientWrapper
 from openai.types import CompletionUsage
 from openai.types.chat import ChatCompletion, ChatCompletionChunk
@@ -29,6 +29,7 @@ from metagpt.const import USE_CONFIG_TIMEOUT
 from metagpt.logs import log_llm_stream, logger
 from metagpt.provider.base_llm import BaseLLM
 from metagpt.provider.constant import GENERAL_FUNCTION_SCHEMA
+from metagpt.provider.llm_batch import BATCH_ENDPOINT, BatchUnavailableError
 from metagpt.provider.llm_provider_registry import register_provider
 from metagpt.utils.common import CodeParser, decode_image, log_and_reraise
 from metagpt.utils.cost_manager import CostManager
@@ -59,6 +60,7 @@ class OpenAILLM(BaseLLM):
         self._init_client()
         self.auto_max_tokens = False
         self.cost_manager: Optional[CostManager] = None
+        self._batch_unavailable = False  # the service answered the batch api with 404
 
     def _init_client(self):
         """https://github.com/openai/openai-python#async-usage"""
@@ -162,7 +164,7 @@ class OpenAILLM(BaseLLM):
         retry=retry_if_exception_type(APIConnectionError),
         retry_error_callback=log_and_reraise,
     )
-    async def acompletion_text(self, messages: list[dict], stream=False, timeout=USE_CONFIG_TIMEOUT) -> str:
+    async def _acompletion_text(self, messages: list[dict], stream=False, timeout=USE_CONFIG_TIMEOUT) -> str:
         """when streaming, print each token in place."""
         if stream:
             return await self._achat_completion_stream(messages, timeout=timeout)
@@ -170,6 +172,52 @@ class OpenAILLM(BaseLLM):
         rsp = await self._achat_completion(messages, timeout=self.get_timeout(timeout))
         return self.get_choice_text(rsp)
 
+    def _batch_body(self, messages: list[dict]) -> dict:
+        kwargs = self._cons_kwargs(messages)
+        kwargs.pop("timeout")
+        return kwargs
+
+    @property
+    def supports_batch(self) -> bool:
+        # the openai compatible services rarely have the batch api
+        return self.config.api_type == LLMType.OPENAI and not self._batch_unavailable
+
+    async def _acreate_batch(self, data: bytes) -> str:
+        """https://platform.openai.com/docs/guides/batch"""
+        try:
+            input_file = await self.aclient.files.create(file=("batch.jsonl", data), purpose="batch")
+        except NotFoundError as e:
+            self._batch_unavailable = True
+            raise BatchUnavailableError(f"no batch api at {self.config.base_url}") from e
+        batch = await self.aclient.batches.create(
+            input_file_id=input_file.id, endpoint=BATCH_ENDPOINT, completion_window="24h"
+        )
+        return batch.id
+
+    async def _aretrieve_batch(self, batch_id: str) -> Optional[list[dict]]:
+        batch = await self.aclient.batches.retrieve(batch_id)
+        if batch.status in ("validating", "in_progress", "finalizing", "cancelling"):
+            return None
+        if batch.status == "failed":
+            raise RuntimeError(f"batch {batch_id} failed: {batch.errors}")
+
+        # an expired or cancelled batch still has the output of the requests it has done
+        records = []
+        for file_id in filter(None, [batch.output_file_id, batch.error_file_id]):
+            content = await self.aclient.files.content(file_id)
+            for line in content.text.splitlines():
+                if not line.strip():
+                    continue
+                line = json.loads(line)
+                response = line.get("response") or {}
+                if response.get("status_code") != 200:
+                    records.append({"custom_id": line["custom_id"], "error": line.get("error") or response})
+                    continue
+                rsp = ChatCompletion(**response["body"])
+                self._update_costs(rsp.usage)
+                records.append({"custom_id": line["custom_id"], "content": self.get_choice_text(rsp)})
+        return records
+
     async def _achat_completion_function(
         self, messages: list[dict], timeout: int = USE_CONFIG_TIMEOUT, **chat_configs
     ) -> ChatCompletion:
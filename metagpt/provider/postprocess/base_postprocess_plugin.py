@@ -2,11 +2,12 @@
 # -*- coding: utf-8 -*-
 # @Desc   : base llm postprocess plugin to do the operations like repair the raw llm output
 
-from typing import Union
+from typing import Optional, Union
 
 from metagpt.utils.repair_llm_raw_output import (
     RepairType,
     extract_content_from_output,
+    fast_parse_content,
     repair_llm_raw_output,
     retry_parse_json_text,
 )
@@ -18,6 +19,7 @@ class BasePostProcessPlugin(object):
     def run_repair_llm_output(self, output: str, schema: dict, req_key: str = "[/CONTENT]") -> Union[dict, list]:
         """
         repair steps
+            0. parse the content with the fast path, use it if it has all the schema's fields
             1. repair the case sensitive problem using the schema's fields
             2. extract the content from the req_key pair( xx[REQ_KEY]xxx[/REQ_KEY]xx )
             3. repair the invalid json text in the content
@@ -25,6 +27,10 @@ class BasePostProcessPlugin(object):
         """
         output_class_fields = list(schema["properties"].keys())  # Custom ActionOutput's fields
 
+        parsed_data = self.run_fast_parse(output, req_key=req_key)
+        if isinstance(parsed_data, dict) and all(field in parsed_data for field in output_class_fields):
+            return parsed_data
+
         content = self.run_repair_llm_raw_output(output, req_keys=output_class_fields + [req_key])
         content = self.run_extract_content_from_output(content, right_key=req_key)
         # # req_keys mocked
@@ -33,6 +39,10 @@ class BasePostProcessPlugin(object):
 
         return parsed_data
 
+    def run_fast_parse(self, content: str, req_key: str) -> Optional[Union[dict, list]]:
+        """inherited class can re-implement the function"""
+        return fast_parse_content(content, right_key=req_key)
+
     def run_repair_llm_raw_output(self, content: str, req_keys: list[str], repair_type: str = None) -> str:
         """inherited class can re-implement the function"""
         return repair_llm_raw_output(content, req_keys=req_keys, repair_type=repair_type)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : a provider that routes requests across several configured backends, with hedging and circuit breaking
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+from metagpt.configs.llm_config import LLMConfig, LLMType
+from metagpt.const import USE_CONFIG_TIMEOUT
+from metagpt.logs import logger
+from metagpt.provider.base_llm import BaseLLM
+from metagpt.provider.llm_provider_registry import (
+    create_llm_instance,
+    register_provider,
+)
+from metagpt.utils.token_counter import TOKEN_COSTS
+
+LATENCY_WINDOW = 100  # latest latencies kept per backend for the p95 estimate
+LATENCY_EWMA_ALPHA = 0.3
+
+
+class RouterBackend:
+    """A backend llm with its observed latency and circuit state"""
+
+    def __init__(self, llm: BaseLLM, weight: float = 1.0):
+        self.llm = llm
+        self.weight = weight
+        self.current_weight = 0.0  # for smooth weighted round-robin
+        self.latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.ewma_latency: Optional[float] = None
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def name(self) -> str:
+        return f"{self.llm.config.api_type.value}:{self.llm.config.model}@{self.llm.config.base_url}"
+
+    @property
+    def unit_cost(self) -> float:
+        """prompt + completion price per 1k tokens, unknown models are considered the most expensive"""
+        costs = TOKEN_COSTS.get(self.llm.pricing_plan or self.llm.config.model)
+        if not costs:
+            return math.inf
+        return costs["prompt"] + costs["completion"]
+
+    def p95_latency(self, min_samples: int) -> Optional[float]:
+        if len(self.latencies) < max(min_samples, 1):
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def is_available(self, reset_timeout: float) -> bool:
+        """closed circuit, or open long enough to let a probe request through (half-open)"""
+        return self.opened_at is None or time.monotonic() - self.opened_at >= reset_timeout
+
+    def record_success(self, latency: float):
+        self.latencies.append(latency)
+        if self.ewma_latency is None:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency = LATENCY_EWMA_ALPHA * latency + (1 - LATENCY_EWMA_ALPHA) * self.ewma_latency
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    def record_failure(self, failure_threshold: int):
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"circuit opened for llm backend {self.name}")
+            self.opened_at = time.monotonic()
+
+
+@register_provider(LLMType.ROUTER)
+class RouterLLM(BaseLLM):
+    """Route each request to one of `config.backends` according to `config.routing_policy`.
+
+    - latency: the backend with the lowest observed latency (EWMA), unmeasured backends are tried first
+    - round_robin: smooth weighted round-robin with `config.backend_weights`
+    - cost: the cheapest backend according to `TOKEN_COSTS`
+
+    Failed requests fail over to the next backend. With `config.hedge`, a second request is fired to the next backend
+    once the p95 latency of the first one has elapsed, and the first result is taken.
+    """
+
+    def __init__(self, config: LLMConfig):
+        assert config.backends, "router requires at least one backend llm config"
+        self.config = config
+        weights = config.backend_weights or [1.0] * len(config.backends)
+        assert len(weights) == len(config.backends), "backend_weights must match backends"
+        self.backends = [
+            RouterBackend(create_llm_instance(backend_config), weight)
+            for backend_config, weight in zip(config.backends, weights)
+        ]
+        self.use_system_prompt = all(backend.llm.use_system_prompt for backend in self.backends)
+        self.cost_manager = None
+
+    def _rank_backends(self) -> list[RouterBackend]:
+        """Return backends in the order they should be tried"""
+        candidates = [b for b in self.backends if b.is_available(self.config.circuit_reset_timeout)]
+        if not candidates:
+            # every circuit is open, probe the one that has been open for the longest time
+            candidates = sorted(self.backends, key=lambda b: b.opened_at)
+
+        policy = self.config.routing_policy
+        if policy == "round_robin":
+            total = sum(b.weight for b in candidates)
+            for b in candidates:
+                b.current_weight += b.weight
+            selected = max(candidates, key=lambda b: b.current_weight)
+            selected.current_weight -= total
+            return [selected] + [b for b in candidates if b is not selected]
+        if policy == "cost":
+            return sorted(candidates, key=lambda b: (b.unit_cost, b.ewma_latency or 0.0))
+        return sorted(candidates, key=lambda b: b.ewma_latency or 0.0)
+
+    async def _invoke(self, backend: RouterBackend, call: Callable[[BaseLLM], Awaitable]):
+        if backend.llm.cost_manager is None:
+            backend.llm.cost_manager = self.cost_manager
+        start = time.perf_counter()
+        try:
+            rsp = await call(backend.llm)
+        except Exception as e:
+            backend.record_failure(self.config.circuit_failure_threshold)
+            logger.warning(f"llm backend {backend.name} failed: {e}")
+            raise
+        backend.record_success(time.perf_counter() - start)
+        return rsp
+
+    async def _route(self, call: Callable[[BaseLLM], Awaitable], hedge: bool = True):
+        """Run `call` on the ranked backends, failing over on error and hedging on slowness"""
+        queue = self._rank_backends()
+        tasks: dict[asyncio.Task, RouterBackend] = {}
+
+        def launch():
+            backend = queue.pop(0)
+            tasks[asyncio.create_task(self._invoke(backend, call))] = backend
+
+        launch()
+        hedged = not (hedge and self.config.hedge)
+        last_error = None
+        try:
+            while tasks:
+                hedge_delay = None
+                if not hedged and queue:
+                    (primary,) = tasks.values()
+                    hedge_delay = primary.p95_latency(self.config.hedge_min_samples)
+                done, _ = await asyncio.wait(tasks, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    logger.debug(f"hedging llm request after {hedge_delay:.2f}s")
+                    launch()
+                    continue
+                for task in done:
+                    tasks.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+                if not tasks and queue:
+                    launch()
+            raise last_error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _achat_completion(self, messages: list[dict], timeout=USE_CONFIG_TIMEOUT):
+        return await self._route(lambda llm: llm._achat_completion(messages, timeout=timeout))
+
+    async def acompletion(self, messages: list[dict], timeout=USE_CONFIG_TIMEOUT):
+        return await self._route(lambda llm: llm.acompletion(messages, timeout=self.get_timeout(timeout)))
+
+    async def _achat_completion_stream(self, messages: list[dict], timeout: int = USE_CONFIG_TIMEOUT) -> str:
+        # streamed chunks are logged as they arrive, so a stream is never hedged, only failed over
+        return await self._route(
+            lambda llm: llm.acompletion_text(messages, stream=True, timeout=self.get_timeout(timeout), coalesce=False),
+            hedge=False,
+        )
+
+    async def _acompletion_text(
+        self, messages: list[dict], stream: bool = False, timeout: int = USE_CONFIG_TIMEOUT
+    ) -> str:
+        """Each backend parses its own response format, so route at the text level, already coalesced here"""
+        if stream:
+            return await self._achat_completion_stream(messages, timeout=timeout)
+        return await self._route(
+            lambda llm: llm.acompletion_text(messages, stream=False, timeout=self.get_timeout(timeout), coalesce=False)
+        )
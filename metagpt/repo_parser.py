@@ -12,16 +12,23 @@ This script is designed to create a symbols repository from the provided source
 from __future__ import annotations
 
 import ast
+import hashlib
 import json
 import re
 import subprocess
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import pandas as pd
 from pydantic import BaseModel, Field, field_validator
 
-from metagpt.const import AGGREGATION, COMPOSITION, GENERALIZATION
+from metagpt.const import (
+    AGGREGATION,
+    COMPOSITION,
+    DEFAULT_WORKSPACE_ROOT,
+    GENERALIZATION,
+)
 from metagpt.logs import logger
 from metagpt.utils.common import any_to_str, aread, remove_white_spaces
 from metagpt.utils.exceptions import handle_exception
@@ -419,15 +426,28 @@ class DotClassMethod(BaseModel):
         return attrs
 
 
+REPO_PARSER_CACHE_ROOT = DEFAULT_WORKSPACE_ROOT / ".repo_parser_cache"
+
+
 class RepoParser(BaseModel):
     """
     Tool to build a symbols repository from a project directory.
 
     Attributes:
         base_directory (Path): The base directory of the project.
+        cache_root (Optional[Path]): The directory of the persistent symbols cache, e.g. `REPO_PARSER_CACHE_ROOT`.
+            Defaults to None, the cache is disabled.
+        max_workers (Optional[int]): The number of parsing processes, defaults to the number of CPUs.
+        chunk_size (int): The number of files parsed per process task.
+        min_parallel_files (int): Fewer files to parse than this are parsed in-process, without starting a process
+            pool.
     """
 
     base_directory: Path = Field(default=None)
+    cache_root: Optional[Path] = None
+    max_workers: Optional[int] = None
+    chunk_size: int = 64
+    min_parallel_files: int = 512
 
     @classmethod
     @handle_exception(exception_type=Exception, default_return=[])
@@ -477,19 +497,83 @@ class RepoParser(BaseModel):
         Returns:
             List[RepoFileInfo]: A list of RepoFileInfo objects containing the extracted information.
         """
-        files_classes = []
-        directory = self.base_directory
+        return list(self.iter_symbols())
+
+    def iter_symbols(self) -> Iterator[RepoFileInfo]:
+        """
+        Streams the symbols of the '.py' files in the project directory.
+
+        Files are parsed in a process pool by chunks of `chunk_size` files, or in-process if there are fewer than
+        `min_parallel_files` of them. Files whose (path, mtime, size) or content hash match the persistent cache are
+        not parsed again.
 
+        Yields:
+            RepoFileInfo: The extracted information of a file, cached files first.
+        """
+        directory = self.base_directory
         matching_files = []
         extensions = ["*.py"]
         for ext in extensions:
             matching_files += directory.rglob(ext)
-        for path in matching_files:
-            tree = self._parse_file(path)
-            file_info = self.extract_class_and_function_info(tree, path)
-            files_classes.append(file_info)
 
-        return files_classes
+        cache = self._load_symbols_cache()
+        new_cache = {}
+        todo = []
+        try:
+            for path in matching_files:
+                key = str(path.relative_to(directory))
+                entry = cache.get(key)
+                stat = path.stat()
+                if entry and entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                    new_cache[key] = entry
+                    yield _load_file_info(entry["info"])
+                else:
+                    todo.append((path, entry["hash"] if entry else None))
+
+            chunks = [todo[i : i + self.chunk_size] for i in range(0, len(todo), self.chunk_size)]
+            if len(todo) < self.min_parallel_files or len(chunks) <= 1 or self.max_workers == 1:
+                results = (_extract_symbols_chunk(directory, chunk) for chunk in chunks)
+                yield from self._collect_symbols(results, cache, new_cache)
+            else:
+                with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                    results = executor.map(_extract_symbols_chunk, [directory] * len(chunks), chunks)
+                    yield from self._collect_symbols(results, cache, new_cache)
+        finally:
+            if len(new_cache) == len(matching_files):
+                self._save_symbols_cache(new_cache)
+
+    @staticmethod
+    def _collect_symbols(results, cache: dict, new_cache: dict) -> Iterator[RepoFileInfo]:
+        for chunk_result in results:
+            for key, mtime, size, digest, info in chunk_result:
+                if info is None:  # only touched, the content hash is unchanged
+                    info = cache[key]["info"]
+                new_cache[key] = {"mtime": mtime, "size": size, "hash": digest, "info": info}
+                yield _load_file_info(info)
+
+    @property
+    def _symbols_cache_pathname(self) -> Optional[Path]:
+        if not self.cache_root:
+            return None
+        key = hashlib.sha256(str(self.base_directory.resolve()).encode()).hexdigest()
+        return self.cache_root / f"{key}.json"
+
+    def _load_symbols_cache(self) -> Dict[str, Dict]:
+        pathname = self._symbols_cache_pathname
+        if not pathname or not pathname.exists():
+            return {}
+        try:
+            return json.loads(pathname.read_text())
+        except (ValueError, OSError) as e:
+            logger.warning(f"ignore the broken symbols cache {pathname}: {e}")
+            return {}
+
+    def _save_symbols_cache(self, cache: Dict[str, Dict]):
+        pathname = self._symbols_cache_pathname
+        if not pathname:
+            return
+        pathname.parent.mkdir(parents=True, exist_ok=True)
+        pathname.write_text(json.dumps(cache))
 
     def generate_json_structure(self, output_path: Path):
         """
@@ -1010,6 +1094,46 @@ class RepoParser(BaseModel):
         return "." + full_key[0:ix]
 
 
+def _load_file_info(info: Dict) -> RepoFileInfo:
+    file_info = RepoFileInfo.model_validate(info)
+    file_info.page_info = [CodeBlockInfo.model_validate(i) for i in file_info.page_info]
+    return file_info
+
+
+def _extract_symbols_chunk(
+    base_directory: Path, files: List[Tuple[Path, Optional[str]]]
+) -> List[Tuple[str, int, int, str, Optional[Dict]]]:
+    """
+    Extracts the symbols of a chunk of files, runs in the worker processes of `RepoParser.iter_symbols`.
+
+    Args:
+        base_directory (Path): The base directory of the project.
+        files (List[Tuple[Path, Optional[str]]]): The files to parse and their cached content hash.
+
+    Returns:
+        List[Tuple[str, int, int, str, Optional[Dict]]]: (relative path, mtime, size, content hash, dumped
+            RepoFileInfo) of each file, the RepoFileInfo is None if the content hash equals the cached one.
+    """
+    parser = RepoParser(base_directory=base_directory)
+    results = []
+    for path, cached_digest in files:
+        stat = path.stat()
+        content = path.read_bytes()
+        digest = hashlib.sha256(content).hexdigest()
+        key = str(path.relative_to(base_directory))
+        if digest == cached_digest:
+            results.append((key, stat.st_mtime_ns, stat.st_size, digest, None))
+            continue
+        try:
+            tree = ast.parse(content).body
+        except Exception as e:
+            logger.error(f"parse {path} failed: {e}")
+            tree = []
+        info = parser.extract_class_and_function_info(tree, path)
+        results.append((key, stat.st_mtime_ns, stat.st_size, digest, info.model_dump()))
+    return results
+
+
 def is_func(node) -> bool:
     """
     Returns True if the given node represents a function.
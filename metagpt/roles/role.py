@@ -31,7 +31,7 @@ from metagpt.actions import Action, ActionOutput
 from metagpt.actions.action_node import ActionNode
 from metagpt.actions.add_requirement import UserRequirement
 from metagpt.context_mixin import ContextMixin
-from metagpt.logs import logger
+from metagpt.logs import logger, stream_channel
 from metagpt.memory import Memory
 from metagpt.provider import HumanProvider
 from metagpt.schema import Message, MessageQueue, SerializationMixin
@@ -548,7 +548,8 @@ class Role(SerializationMixin, ContextMixin, BaseModel):
             logger.debug(f"{self._setting}: no news. waiting.")
             return
 
-        rsp = await self.react()
+        with stream_channel(self.name):
+            rsp = await self.react()
 
         # Reset the next action to be taken.
         self.set_todo(None)
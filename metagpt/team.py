@@ -19,8 +19,10 @@ from metagpt.const import MESSAGE_ROUTE_TO_ALL, SERDESER_PATH
 from metagpt.context import Context
 from metagpt.environment import Environment
 from metagpt.logs import logger
+from metagpt.provider.model_cascade import cascade_report
 from metagpt.roles import Role
 from metagpt.schema import Message
+from metagpt.utils.ahttp_client import session_scope
 from metagpt.utils.common import (
     NoMoneyException,
     read_json_file,
@@ -125,14 +127,20 @@ class Team(BaseModel):
         if idea:
             self.run_project(idea=idea, send_to=send_to)
 
-        while n_round > 0:
-            if self.env.is_idle:
-                logger.debug("All roles are idle.")
-                break
-            n_round -= 1
-            self._check_balance()
-            await self.env.run()
-
-            logger.debug(f"max {n_round=} left.")
+        try:
+            # the pooled http connections of the llm providers are released once no team of the loop runs
+            async with session_scope():
+                while n_round > 0:
+                    if self.env.is_idle:
+                        logger.debug("All roles are idle.")
+                        break
+                    n_round -= 1
+                    self._check_balance()
+                    await self.env.run()
+
+                    logger.debug(f"max {n_round=} left.")
+        finally:
+            if self.env.context.cascades:
+                logger.info(f"model cascades: {cascade_report(self.env.context)}")
         self.env.archive(auto_archive)
         return self.env.history
@@ -2,11 +2,108 @@
 # -*- coding: utf-8 -*-
 # @Desc   : pure async http_client
 
-from typing import Any, Mapping, Optional, Union
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Mapping, Optional, Union
 
 import aiohttp
 from aiohttp.client import DEFAULT_TIMEOUT
 
+from metagpt.const import (
+    HTTP_DNS_CACHE_TTL,
+    HTTP_KEEPALIVE_TIMEOUT,
+    HTTP_POOL_LIMIT,
+    HTTP_POOL_LIMIT_PER_HOST,
+)
+
+# a session is bound to the event loop it was created in
+_SESSIONS: dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+# the number of `session_scope` and in-flight requests using the shared session of a loop
+_SESSION_HOLDS: dict[asyncio.AbstractEventLoop, int] = {}
+# the loops whose shared session is closed once it is no longer held
+_SESSION_CLOSING: set[asyncio.AbstractEventLoop] = set()
+# the tasks closing the shared session of a loop when the loop shuts down
+_SESSION_WATCHERS: dict[asyncio.AbstractEventLoop, asyncio.Task] = {}
+
+
+def get_session() -> aiohttp.ClientSession:
+    """The keep-alive session shared by the requests of the running event loop, created on first use.
+
+    Its connections are pooled per host and its dns lookups are cached, so the requests to the same api reuse the
+    tcp/tls connections. Don't close it, run the http users within `session_scope` instead. Outside any scope, it is
+    closed when the loop shuts down, e.g. when `asyncio.run` cancels the remaining tasks.
+    """
+    loop = asyncio.get_running_loop()
+    for closed_loop in [lp for lp in _SESSIONS if lp.is_closed()]:
+        # the loop ended without shutting down its tasks, its connections are already gone
+        _SESSIONS.pop(closed_loop)
+        _SESSION_HOLDS.pop(closed_loop, None)
+        _SESSION_CLOSING.discard(closed_loop)
+        _SESSION_WATCHERS.pop(closed_loop, None)
+
+    session = _SESSIONS.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        )
+        session = aiohttp.ClientSession(connector=connector)
+        _SESSIONS[loop] = session
+        _SESSION_WATCHERS[loop] = loop.create_task(_close_on_loop_shutdown(session))
+    return session
+
+
+async def _close_on_loop_shutdown(session: aiohttp.ClientSession):
+    try:
+        await asyncio.get_running_loop().create_future()  # never done, cancelled when the loop shuts down
+    finally:
+        if not session.closed:
+            await session.close()
+
+
+async def close_session():
+    """Close the shared session of the running event loop at once, the next request opens a new one"""
+    loop = asyncio.get_running_loop()
+    session = _SESSIONS.pop(loop, None)
+    watcher = _SESSION_WATCHERS.pop(loop, None)
+    if watcher:
+        watcher.cancel()
+    if session and not session.closed:
+        await session.close()
+
+
+@asynccontextmanager
+async def _hold_session(close_on_release: bool = False) -> AsyncIterator[aiohttp.ClientSession]:
+    loop = asyncio.get_running_loop()
+    _SESSION_HOLDS[loop] = _SESSION_HOLDS.get(loop, 0) + 1
+    try:
+        yield get_session()
+    finally:
+        _SESSION_HOLDS[loop] -= 1
+        if close_on_release:
+            _SESSION_CLOSING.add(loop)
+        if not _SESSION_HOLDS[loop]:
+            _SESSION_HOLDS.pop(loop)
+            if loop in _SESSION_CLOSING:
+                _SESSION_CLOSING.discard(loop)
+                await close_session()
+
+
+def hold_session() -> AsyncIterator[aiohttp.ClientSession]:
+    """Use the shared session of the running event loop for a request, it is not closed until the request is done"""
+    return _hold_session()
+
+
+def session_scope() -> AsyncIterator[aiohttp.ClientSession]:
+    """Keep the shared session of the running event loop open within the scope, e.g. a `Team.run`.
+
+    Scopes are reference counted: the session is closed once the last scope of the loop has exited and no request is
+    in flight, so concurrent scopes and requests in the same loop don't close it under each other.
+    """
+    return _hold_session(close_on_release=True)
+
 
 async def apost(
     url: str,
@@ -18,7 +115,7 @@ async def apost(
     encoding: str = "utf-8",
     timeout: int = DEFAULT_TIMEOUT.total,
 ) -> Union[str, dict]:
-    async with aiohttp.ClientSession() as session:
+    async with hold_session() as session:
         async with session.post(url=url, params=params, json=json, data=data, headers=headers, timeout=timeout) as resp:
             if as_json:
                 data = await resp.json()
@@ -43,7 +140,7 @@ async def apost_stream(
         async for line in result:
             deal_with(line)
     """
-    async with aiohttp.ClientSession() as session:
+    async with hold_session() as session:
         async with session.post(url=url, params=params, json=json, data=data, headers=headers, timeout=timeout) as resp:
             async for line in resp.content:
                 yield line.decode(encoding)
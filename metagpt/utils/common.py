@@ -40,6 +40,7 @@ from tenacity import RetryCallState, RetryError, _utils
 from metagpt.const import MESSAGE_ROUTE_TO_ALL
 from metagpt.logs import logger
 from metagpt.utils.exceptions import handle_exception
+from metagpt.utils.markdown_document import parse_markdown
 
 
 def check_cmd_exists(command) -> int:
@@ -64,8 +65,8 @@ def require_python_version(req_version: Tuple) -> bool:
 class OutputParser:
     @classmethod
     def parse_blocks(cls, text: str):
-        # 首先根据"##"将文本分割成不同的block
-        blocks = text.split("##")
+        # 根据"##"分割出的block，标题和内容已在第一个换行处分开
+        blocks = parse_markdown(text).raw_blocks
 
         # 创建一个字典，用于存储每个block的标题和内容
         block_dict = {}
@@ -73,9 +74,9 @@ class OutputParser:
         # 遍历所有的block
         for block in blocks:
             # 如果block不为空，则继续处理
-            if block.strip() != "":
+            if "".join(block).strip() != "":
                 # 将block的标题和内容分开，并分别去掉前后的空白字符
-                block_title, block_content = block.split("\n", 1)
+                block_title, block_content = block
                 # LLM可能出错，在这里做一下修正
                 if block_title[-1] == ":":
                     block_title = block_title[:-1]
@@ -85,11 +86,8 @@ class OutputParser:
 
     @classmethod
     def parse_code(cls, text: str, lang: str = "") -> str:
-        pattern = rf"```{lang}.*?\s+(.*?)```"
-        match = re.search(pattern, text, re.DOTALL)
-        if match:
-            code = match.group(1)
-        else:
+        code = parse_markdown(text).code(lang)
+        if code is None:
             raise Exception
         return code
 
@@ -117,11 +115,8 @@ class OutputParser:
 
     @staticmethod
     def parse_python_code(text: str) -> str:
-        for pattern in (r"(.*?```python.*?\s+)?(?P<code>.*)(```.*?)", r"(.*?```python.*?\s+)?(?P<code>.*)"):
-            match = re.search(pattern, text, re.DOTALL)
-            if not match:
-                continue
-            code = match.group("code")
+        # the code of a closed fence, then of a fence without its closing line
+        for code in parse_markdown(text).loose_code("python"):
             if not code:
                 continue
             with contextlib.suppress(Exception):
@@ -148,11 +143,12 @@ class OutputParser:
 
     @staticmethod
     def extract_content(text, tag="CONTENT"):
-        # Use regular expression to extract content between [CONTENT] and [/CONTENT]
-        extracted_content = re.search(rf"\[{tag}\](.*?)\[/{tag}\]", text, re.DOTALL)
+        # Extract content between the first [CONTENT] and the [/CONTENT] after it
+        start = text.find(f"[{tag}]")
+        end = text.find(f"[/{tag}]", start + len(tag) + 2) if start >= 0 else -1
 
-        if extracted_content:
-            return extracted_content.group(1).strip()
+        if end >= 0:
+            return text[start + len(tag) + 2 : end].strip()
         else:
             raise ValueError(f"Could not find content between [{tag}] and [/{tag}]")
 
@@ -249,37 +245,16 @@ class CodeParser:
 
     @classmethod
     def parse_blocks(cls, text: str):
-        # 首先根据"##"将文本分割成不同的block
-        blocks = text.split("##")
-
-        # 创建一个字典，用于存储每个block的标题和内容
-        block_dict = {}
-
-        # 遍历所有的block
-        for block in blocks:
-            # 如果block不为空，则继续处理
-            if block.strip() == "":
-                continue
-            if "\n" not in block:
-                block_title = block
-                block_content = ""
-            else:
-                # 将block的标题和内容分开，并分别去掉前后的空白字符
-                block_title, block_content = block.split("\n", 1)
-            block_dict[block_title.strip()] = block_content.strip()
-
-        return block_dict
+        # 根据"##"分割出的block，标题和内容均已去掉前后的空白字符
+        return dict(parse_markdown(text).blocks)
 
     @classmethod
     def parse_code(cls, block: str, text: str, lang: str = "") -> str:
         if block:
             text = cls.parse_block(block, text)
-        pattern = rf"```{lang}.*?\s+(.*?)```"
-        match = re.search(pattern, text, re.DOTALL)
-        if match:
-            code = match.group(1)
-        else:
-            logger.error(f"{pattern} not match following text:")
+        code = parse_markdown(text).code(lang)
+        if code is None:
+            logger.error(f"```{lang} code block not found in following text:")
             logger.error(text)
             # raise Exception
             return text  # just assume original text is code
@@ -722,9 +697,7 @@ def list_files(root: str | Path) -> List[Path]:
 
 
 def parse_json_code_block(markdown_text: str) -> List[str]:
-    json_blocks = (
-        re.findall(r"```json(.*?)```", markdown_text, re.DOTALL) if "```json" in markdown_text else [markdown_text]
-    )
+    json_blocks = parse_markdown(markdown_text).codes("json") if "```json" in markdown_text else [markdown_text]
 
     return [v.strip() for v in json_blocks]
 
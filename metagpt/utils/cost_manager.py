@@ -27,12 +27,14 @@ class CostManager(BaseModel):
 
     total_prompt_tokens: int = 0
     total_completion_tokens: int = 0
+    total_cached_tokens: int = 0  # the part of the prompt tokens read from the prompt cache of the provider
+    total_cache_write_tokens: int = 0  # the part of the prompt tokens written into the prompt cache of the provider
     total_budget: float = 0
     max_budget: float = 10.0
     total_cost: float = 0
     token_costs: dict[str, dict[str, float]] = TOKEN_COSTS  # different model's token cost
 
-    def update_cost(self, prompt_tokens, completion_tokens, model):
+    def update_cost(self, prompt_tokens, completion_tokens, model, cached_tokens: int = 0, cache_write_tokens: int = 0):
         """
         Update the total cost, prompt tokens, and completion tokens.
 
@@ -40,23 +42,36 @@ class CostManager(BaseModel):
         prompt_tokens (int): The number of tokens used in the prompt.
         completion_tokens (int): The number of tokens used in the completion.
         model (str): The model used for the API call.
+        cached_tokens (int): The number of prompt tokens read from the prompt cache, priced at the `cached_prompt`
+            cost of the model if it has one.
+        cache_write_tokens (int): The number of prompt tokens written into the prompt cache, priced at the
+            `cache_write` cost of the model if it has one.
         """
         if prompt_tokens + completion_tokens == 0 or not model:
             return
         self.total_prompt_tokens += prompt_tokens
         self.total_completion_tokens += completion_tokens
+        self.total_cached_tokens += cached_tokens
+        self.total_cache_write_tokens += cache_write_tokens
         if model not in self.token_costs:
             logger.warning(f"Model {model} not found in TOKEN_COSTS.")
             return
 
+        token_costs = self.token_costs[model]
+        cached_prompt_cost = token_costs.get("cached_prompt", token_costs["prompt"])
+        cache_write_cost = token_costs.get("cache_write", token_costs["prompt"])
         cost = (
-            prompt_tokens * self.token_costs[model]["prompt"]
-            + completion_tokens * self.token_costs[model]["completion"]
+            (prompt_tokens - cached_tokens - cache_write_tokens) * token_costs["prompt"]
+            + cached_tokens * cached_prompt_cost
+            + cache_write_tokens * cache_write_cost
+            + completion_tokens * token_costs["completion"]
         ) / 1000
         self.total_cost += cost
         logger.info(
             f"Total running cost: ${self.total_cost:.3f} | Max budget: ${self.max_budget:.3f} | "
             f"Current cost: ${cost:.3f}, prompt_tokens: {prompt_tokens}, completion_tokens: {completion_tokens}"
+            + (f", cached_tokens: {cached_tokens}" if cached_tokens else "")
+            + (f", cache_write_tokens: {cache_write_tokens}" if cache_write_tokens else "")
         )
 
     def get_total_prompt_tokens(self):
@@ -77,6 +92,24 @@ class CostManager(BaseModel):
         """
         return self.total_completion_tokens
 
+    def get_total_cached_tokens(self):
+        """
+        Get the total number of prompt tokens read from the prompt cache.
+
+        Returns:
+        int: The total number of cached prompt tokens.
+        """
+        return self.total_cached_tokens
+
+    def get_total_cache_write_tokens(self):
+        """
+        Get the total number of prompt tokens written into the prompt cache.
+
+        Returns:
+        int: The total number of prompt tokens written into the cache.
+        """
+        return self.total_cache_write_tokens
+
     def get_total_cost(self):
         """
         Get the total cost of API calls.
@@ -94,7 +127,7 @@ class CostManager(BaseModel):
 class TokenCostManager(CostManager):
     """open llm model is self-host, it's free and without cost"""
 
-    def update_cost(self, prompt_tokens, completion_tokens, model):
+    def update_cost(self, prompt_tokens, completion_tokens, model, cached_tokens: int = 0, cache_write_tokens: int = 0):
         """
         Update the total cost, prompt tokens, and completion tokens.
 
@@ -102,9 +135,13 @@ class TokenCostManager(CostManager):
         prompt_tokens (int): The number of tokens used in the prompt.
         completion_tokens (int): The number of tokens used in the completion.
         model (str): The model used for the API call.
+        cached_tokens (int): The number of prompt tokens read from the prompt cache.
+        cache_write_tokens (int): The number of prompt tokens written into the prompt cache.
         """
         self.total_prompt_tokens += prompt_tokens
         self.total_completion_tokens += completion_tokens
+        self.total_cached_tokens += cached_tokens
+        self.total_cache_write_tokens += cache_write_tokens
         logger.info(f"prompt_tokens: {prompt_tokens}, completion_tokens: {completion_tokens}")
 
 
@@ -127,7 +164,14 @@ class FireworksCostManager(CostManager):
                 token_costs = FIREWORKS_GRADE_TOKEN_COSTS["-1"]
         return token_costs
 
-    def update_cost(self, prompt_tokens: int, completion_tokens: int, model: str):
+    def update_cost(
+        self,
+        prompt_tokens: int,
+        completion_tokens: int,
+        model: str,
+        cached_tokens: int = 0,
+        cache_write_tokens: int = 0,
+    ):
         """
         Refs to `https://app.fireworks.ai/pricing` **Developer pricing**
         Update the total cost, prompt tokens, and completion tokens.
@@ -136,9 +180,13 @@ class FireworksCostManager(CostManager):
         prompt_tokens (int): The number of tokens used in the prompt.
         completion_tokens (int): The number of tokens used in the completion.
         model (str): The model used for the API call.
+        cached_tokens (int): The number of prompt tokens read from the prompt cache.
+        cache_write_tokens (int): The number of prompt tokens written into the prompt cache.
         """
         self.total_prompt_tokens += prompt_tokens
         self.total_completion_tokens += completion_tokens
+        self.total_cached_tokens += cached_tokens
+        self.total_cache_write_tokens += cache_write_tokens
 
         token_costs = self.model_grade_token_costs(model)
         cost = (prompt_tokens * token_costs["prompt"] + completion_tokens * token_costs["completion"]) / 1000000
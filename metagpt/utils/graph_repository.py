@@ -101,6 +101,17 @@ class GraphRepository(ABC):
         """
         pass
 
+    async def insert_batch(self, triples: List[SPO]):
+        """Insert several triples into the graph repository.
+
+        Implementations with a bulk insert path should override it.
+
+        Args:
+            triples (List[SPO]): The triples to insert.
+        """
+        for t in triples:
+            await self.insert(subject=t.subject, predicate=t.predicate, object_=t.object_)
+
     @abstractmethod
     async def select(self, subject: str = None, predicate: str = None, object_: str = None) -> List[SPO]:
         """Retrieve triples from the graph repository based on specified criteria.
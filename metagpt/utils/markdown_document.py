@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : index the `##` blocks and the ``` fences of a markdown text once, for the output parsers to share
+
+from __future__ import annotations
+
+import re
+from bisect import bisect_left
+from functools import cached_property, lru_cache
+from typing import Optional
+
+BLOCK_SEPARATOR = "##"
+FENCE = "```"
+WHITESPACES_PATTERN = re.compile(r"\s+")
+
+
+class MarkdownDocument:
+    """The blocks between the separators `##` and the offsets of the fences ``` of a text, indexed once.
+
+    The `CodeParser`/`OutputParser` methods answer from them instead of splitting the text and running regexes over it
+    for every call, the text is only sliced for what is asked. The answers are the same as the ones of
+    `text.split("##")` and of the fence regexes, e.g. `code("python")` is the first group of
+    ```` re.search(r"```python.*?\\s+(.*?)```", text, re.DOTALL) ````.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.fences: list[int] = []  # overlapping like a regex search, a "````" holds 2 fences
+        idx = text.find(FENCE)
+        while idx >= 0:
+            self.fences.append(idx)
+            idx = text.find(FENCE, idx + 1)
+        self._codes: dict[str, Optional[str]] = {}
+
+    @cached_property
+    def raw_blocks(self) -> list[tuple[str, ...]]:
+        """The parts of `text.split("##")`, each split into `(title, content)` at its first line break, or `(title,)`
+        if it has a single line"""
+        return [tuple(block.split("\n", 1)) for block in self.text.split(BLOCK_SEPARATOR)]
+
+    @cached_property
+    def blocks(self) -> dict[str, str]:
+        """The stripped title to the stripped content of the blocks"""
+        block_dict = {}
+        for block in self.raw_blocks:
+            title, content = block if len(block) == 2 else (block[0], "")
+            if title.strip() == "" and content.strip() == "":
+                continue
+            block_dict[title.strip()] = content.strip()
+        return block_dict
+
+    def _next_fence(self, start: int) -> int:
+        idx = bisect_left(self.fences, start)
+        return self.fences[idx] if idx < len(self.fences) else -1
+
+    def code(self, lang: str = "") -> Optional[str]:
+        """The content of the first fence opened with ```{lang}, from the whitespaces after the tag to the next fence,
+        None if there isn't one"""
+        if lang in self._codes:
+            return self._codes[lang]
+        text = self.text
+        code = None
+        for fence in self.fences:
+            if not text.startswith(lang, fence + len(FENCE)):
+                continue
+            space = WHITESPACES_PATTERN.search(text, fence + len(FENCE) + len(lang))
+            if not space:
+                break  # no whitespace after this fence, nor after the next ones
+            end = self._next_fence(space.end())
+            if end >= 0:
+                code = text[space.end() : end]
+            break  # else no closing fence after this one, nor after the next ones
+        self._codes[lang] = code
+        return code
+
+    def codes(self, lang: str = "") -> list[str]:
+        """The contents of the fences opened with ```{lang}, as `re.findall(rf"```{lang}(.*?)```", text, re.DOTALL)`"""
+        text = self.text
+        codes = []
+        start = 0
+        for fence in self.fences:
+            if fence < start or not text.startswith(lang, fence + len(FENCE)):
+                continue
+            begin = fence + len(FENCE) + len(lang)
+            end = self._next_fence(begin)
+            if end < 0:
+                break
+            codes.append(text[begin:end])
+            start = end + len(FENCE)
+        return codes
+
+    def loose_code(self, lang: str) -> list[str]:
+        """The code of a fence which may lack its opening or closing line: first up to the last fence, then up to the end
+        of the text. The same as the `code` group of
+        ```` (.*?```{lang}.*?\\s+)?(?P<code>.*)(```.*?) ```` and of ```` (.*?```{lang}.*?\\s+)?(?P<code>.*) ````.
+        """
+        text = self.text
+        begin = None
+        opening = text.find(FENCE + lang)
+        if opening >= 0:
+            space = WHITESPACES_PATTERN.search(text, opening + len(FENCE) + len(lang))
+            begin = space.end() if space else None
+        codes = []
+        last = self.fences[-1] if self.fences else -1
+        if begin is not None and last >= begin:
+            codes.append(text[begin:last])
+        elif last >= 0:
+            codes.append(text[:last])
+        codes.append(text if begin is None else text[begin:])
+        return codes
+
+
+@lru_cache(maxsize=32)
+def parse_markdown(text: str) -> MarkdownDocument:
+    """The document of the text, shared by the parsers called one after another on the same llm output"""
+    return MarkdownDocument(text)
@@ -3,8 +3,9 @@
 # @Desc   : repair llm raw output with particular conditions
 
 import copy
+import json
 from enum import Enum
-from typing import Callable, Union
+from typing import Callable, Optional, Union
 
 import regex as re
 from tenacity import RetryCallState, retry, stop_after_attempt, wait_fixed
@@ -239,6 +240,163 @@ def repair_invalid_json(output: str, error: str) -> str:
     return output
 
 
+JSON_ESCAPES = set('"\\/bfnrtu')
+JSON_LITERALS = {"true": "true", "false": "false", "null": "null", "True": "true", "False": "false", "None": "null"}
+CLOSERS = {"{": "}", "[": "]"}
+
+
+def _next_significant(text: str, idx: int) -> tuple[int, bool]:
+    """The index of the next non-whitespace char from `idx`, and if a newline is skipped on the way"""
+    newline = False
+    n = len(text)
+    while idx < n and text[idx] in " \t\r\n":
+        newline = newline or text[idx] == "\n"
+        idx += 1
+    return idx, newline
+
+
+def _scan_string(text: str, start: int) -> tuple[str, int]:
+    """Read the string quoted at `start` with `"`, `'`, `\"\"\"` or `\'\'\'`, return it as a json string and the
+    index after it.
+
+    A lone quote char closes the string only if it's followed by `,:}]`, the end of the text, or a newline and
+    another quote (the next key), so the unescaped quotes inside a value are kept in the value.
+    """
+    quote = text[start] * 3 if text.startswith(text[start] * 3, start) else text[start]
+    n = len(text)
+    idx = start + len(quote)
+    buf = []
+    while idx < n:
+        char = text[idx]
+        if char == "\\" and idx + 1 < n:
+            nxt = text[idx + 1]
+            if nxt in JSON_ESCAPES:
+                buf.append(char + nxt)
+            elif nxt == "'":
+                buf.append("'")
+            else:
+                buf.append("\\\\" + nxt)
+            idx += 2
+            continue
+        if text.startswith(quote, idx):
+            end = idx + len(quote)
+            if len(quote) == 3:
+                return '"' + "".join(buf) + '"', end
+            sig, newline = _next_significant(text, end)
+            if sig >= n or text[sig] in ",:}]" or (newline and text[sig] in "\"'"):
+                return '"' + "".join(buf) + '"', end
+        if char == '"':
+            buf.append('\\"')
+        elif char == "\n":
+            buf.append("\\n")
+        elif char == "\r":
+            buf.append("\\r")
+        elif char == "\t":
+            buf.append("\\t")
+        else:
+            buf.append(char)
+        idx += 1
+    return '"' + "".join(buf) + '"', n  # unterminated
+
+
+def repair_json_scan(text: str) -> str:
+    """
+    Repair the json-like text of llm outputs in a single linear scan, fix
+        1. trailing or doubled commas, missing commas between values
+        2. single or triple quoted strings, raw newlines/tabs and unescaped quotes inside strings
+        3. `#` or `//` comments, python literals `True`/`False`/`None`, unquoted keys
+        4. stray closing brackets like `xx"],` in an object, a closed root object followed by more pairs,
+           and unclosed brackets or string of a truncated output
+    """
+    out = []
+    stack = []
+    after_value = False  # a complete value has just been read, a `,` or a closer is expected
+    root_closer = None  # the index in `out` of the bracket which closed the root value
+    n = len(text)
+    idx = 0
+    while idx < n:
+        char = text[idx]
+        if char in " \t\r\n":
+            out.append(char)
+            idx += 1
+        elif char == "#" or text.startswith("//", idx):
+            end = text.find("\n", idx)
+            idx = n if end < 0 else end
+        elif char in "\"'":
+            if after_value and stack:
+                out.append(",")
+            string, idx = _scan_string(text, idx)
+            out.append(string)
+            after_value = True
+        elif char == ":":
+            out.append(char)
+            after_value = False
+            idx += 1
+        elif char == ",":
+            idx += 1
+            sig = idx
+            while sig < n and text[sig] in " \t\r\n,":
+                sig += 1
+            if not stack and root_closer is not None and sig < n and text[sig] not in "}]":
+                # the root object was closed too early, reopen it
+                stack.append(out[root_closer] == "}" and "{" or "[")
+                out[root_closer] = ""
+                root_closer = None
+            if after_value and stack and (sig < n and text[sig] not in "}]"):
+                out.append(char)
+                after_value = False
+        elif char in "{[":
+            if after_value and stack:
+                out.append(",")
+            stack.append(char)
+            out.append(char)
+            after_value = False
+            idx += 1
+        elif char in "}]":
+            if stack and CLOSERS[stack[-1]] == char:
+                stack.pop()
+                out.append(char)
+                after_value = True
+                if not stack:
+                    root_closer = len(out) - 1
+            idx += 1  # else a stray closer, dropped
+        else:
+            end = idx
+            while end < n and (text[end].isalnum() or text[end] in "_.+-"):
+                end += 1
+            if end == idx:  # an unexpected char, kept as is
+                out.append(char)
+                idx += 1
+                continue
+            token = text[idx:end]
+            if after_value and stack:
+                out.append(",")
+            sig, _ = _next_significant(text, end)
+            if sig < n and text[sig] == ":" and stack and stack[-1] == "{":
+                out.append(json.dumps(token))  # unquoted key
+            else:
+                out.append(JSON_LITERALS.get(token, token))
+            after_value = True
+            idx = end
+    out.extend(CLOSERS[opener] for opener in reversed(stack))
+    return "".join(out)
+
+
+def parse_json_text(output: str) -> Union[list, dict]:
+    """Parse with the json decoder, then with the decoder on the output repaired by `repair_json_scan` if
+    `config.repair_llm_output`, and with the tolerant `CustomDecoder` at last"""
+    try:
+        return json.loads(output, strict=False)
+    except ValueError:
+        pass
+    if config.repair_llm_output:
+        try:
+            return json.loads(repair_json_scan(output), strict=False)
+        except ValueError:
+            pass
+    return CustomDecoder(strict=False).decode(output)
+
+
 def run_after_exp_and_passon_next_retry(logger: "loguru.Logger") -> Callable[["RetryCallState"], None]:
     def run_and_passon(retry_state: RetryCallState) -> None:
         """
@@ -293,7 +451,7 @@ def retry_parse_json_text(output: str) -> Union[list, dict]:
     # logger.debug(f"output to json decode:\n{output}")
 
     # if CONFIG.repair_llm_output is True, it will try to fix output until the retry break
-    parsed_data = CustomDecoder(strict=False).decode(output)
+    parsed_data = parse_json_text(output)
 
     return parsed_data
 
@@ -331,6 +489,36 @@ def extract_content_from_output(content: str, right_key: str = "[/CONTENT]"):
     return new_content
 
 
+def fast_parse_content(output: str, right_key: str = "[/CONTENT]") -> Optional[Union[dict, list]]:
+    """
+    Parse the json inside [CONTENT](xxx)[/CONTENT] with a plain search of the keys, the json decoder and, if
+    `config.repair_llm_output`, a single `repair_json_scan`. Return None when it doesn't work out, for the caller to go
+    on with the regex repairs.
+    """
+    left_key = right_key.replace("/", "")
+    start = output.find(left_key)
+    if start < 0:
+        return None
+    start += len(left_key)
+    end = output.find(right_key, start)
+    content = output[start:] if end < 0 else output[start:end]
+    begins = [idx for idx in (content.find("{"), content.find("[")) if idx >= 0]
+    if not begins:
+        return None
+    ends = [idx for idx in (content.rfind("}"), content.rfind("]")) if idx >= 0]
+    content = content[min(begins) : max(ends) + 1] if ends else content[min(begins) :]  # drop the ``` and the like
+    try:
+        return json.loads(content, strict=False)
+    except ValueError:
+        pass
+    if not config.repair_llm_output:
+        return None
+    try:
+        return json.loads(repair_json_scan(content), strict=False)
+    except ValueError:
+        return None
+
+
 def extract_state_value_from_output(content: str) -> str:
     """
     For openai models, they will always return state number. But for open llm models, the instruction result maybe a
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : share one in-flight call among the concurrent callers of the same request
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+
+@dataclass
+class _Flight:
+    task: Optional[asyncio.Task] = None
+    chunks: list[str] = field(default_factory=list)
+    subscribers: list[asyncio.Queue] = field(default_factory=list)
+
+    def publish(self, chunk: str):
+        self.chunks.append(chunk)
+        for queue in self.subscribers:
+            queue.put_nowait(chunk)
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share the call of the first one, and its result or exception.
+
+    The call runs in a task of its own, so that it isn't cancelled with the caller who started it. The chunks it
+    `publish`es, like the tokens of a stream, are replayed to the other callers as they arrive.
+
+    Attributes:
+        calls: the number of calls actually made.
+        coalesced: the number of callers served by the call of another caller.
+    """
+
+    def __init__(self):
+        self._flights: dict[tuple[asyncio.AbstractEventLoop, str], _Flight] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(
+        self,
+        key: str,
+        func: Callable[[Callable[[str], None]], Awaitable[Any]],
+        on_chunk: Optional[Callable[[str], None]] = None,
+    ) -> Any:
+        """
+        Args:
+            key: the canonical key of the call.
+            func: makes the call, given the function to publish its chunks with.
+            on_chunk: receives the chunks of a call made by another caller, in order.
+        """
+        flight_key = (asyncio.get_running_loop(), key)
+        flight = self._flights.get(flight_key)
+        if flight is None:
+            self.calls += 1
+            flight = _Flight()
+            flight.task = asyncio.create_task(func(flight.publish))
+            self._flights[flight_key] = flight
+            flight.task.add_done_callback(lambda _: self._flights.pop(flight_key, None))
+            return await asyncio.shield(flight.task)
+
+        self.coalesced += 1
+        if on_chunk is None:
+            return await asyncio.shield(flight.task)
+
+        queue = asyncio.Queue()
+        for chunk in flight.chunks:
+            queue.put_nowait(chunk)
+        flight.subscribers.append(queue)
+        done = asyncio.ensure_future(asyncio.shield(flight.task))
+        get = None
+        try:
+            while True:
+                get = asyncio.ensure_future(queue.get())
+                await asyncio.wait([get, done], return_when=asyncio.FIRST_COMPLETED)
+                if not get.done():
+                    break
+                on_chunk(get.result())
+            while not queue.empty():
+                on_chunk(queue.get_nowait())
+            return await done
+        finally:
+            flight.subscribers.remove(queue)
+            for fut in (get, done):
+                if fut and not fut.done():
+                    fut.cancel()
+
+    def stats(self) -> dict[str, int]:
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._flights)}
@@ -40,10 +40,10 @@ TOKEN_COSTS = {
     "gpt-4-vision-preview": {"prompt": 0.01, "completion": 0.03},  # TODO add extra image price calculator
     "gpt-4-1106-vision-preview": {"prompt": 0.01, "completion": 0.03},
     "gpt-4o": {"prompt": 0.005, "completion": 0.015},
-    "gpt-4o-mini": {"prompt": 0.00015, "completion": 0.0006},
-    "gpt-4o-mini-2024-07-18": {"prompt": 0.00015, "completion": 0.0006},
+    "gpt-4o-mini": {"prompt": 0.00015, "completion": 0.0006, "cached_prompt": 0.000075},
+    "gpt-4o-mini-2024-07-18": {"prompt": 0.00015, "completion": 0.0006, "cached_prompt": 0.000075},
     "gpt-4o-2024-05-13": {"prompt": 0.005, "completion": 0.015},
-    "gpt-4o-2024-08-06": {"prompt": 0.0025, "completion": 0.01},
+    "gpt-4o-2024-08-06": {"prompt": 0.0025, "completion": 0.01, "cached_prompt": 0.00125},
     "o1-preview": {"prompt": 0.015, "completion": 0.06},
     "o1-preview-2024-09-12": {"prompt": 0.015, "completion": 0.06},
     "o1-mini": {"prompt": 0.003, "completion": 0.012},
@@ -66,9 +66,19 @@ TOKEN_COSTS = {
     "claude-2.0": {"prompt": 0.008, "completion": 0.024},
     "claude-2.1": {"prompt": 0.008, "completion": 0.024},
     "claude-3-sonnet-20240229": {"prompt": 0.003, "completion": 0.015},
-    "claude-3-5-sonnet-20240620": {"prompt": 0.003, "completion": 0.015},
-    "claude-3-opus-20240229": {"prompt": 0.015, "completion": 0.075},
-    "claude-3-haiku-20240307": {"prompt": 0.00025, "completion": 0.00125},
+    "claude-3-5-sonnet-20240620": {
+        "prompt": 0.003,
+        "completion": 0.015,
+        "cached_prompt": 0.0003,
+        "cache_write": 0.00375,
+    },
+    "claude-3-opus-20240229": {"prompt": 0.015, "completion": 0.075, "cached_prompt": 0.0015, "cache_write": 0.01875},
+    "claude-3-haiku-20240307": {
+        "prompt": 0.00025,
+        "completion": 0.00125,
+        "cached_prompt": 0.00003,
+        "cache_write": 0.0003,
+    },
     "yi-34b-chat-0205": {"prompt": 0.0003, "completion": 0.0003},
     "yi-34b-chat-200k": {"prompt": 0.0017, "completion": 0.0017},
     "yi-large": {"prompt": 0.0028, "completion": 0.0028},
@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : triple_store_repository.py
+@Desc    : Graph repository based on hash-indexed triples.
+    Triples are indexed by subject (SPO), predicate (POS) and object (OSP), so any bound pattern is answered in
+    O(result), and several predicates may link the same pair of nodes. The repository is persisted either as
+    node-link JSON, compatible with `DiGraphRepository`, or as a compact SQLite file with interned terms.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import networkx
+
+from metagpt.utils.common import aread, awrite
+from metagpt.utils.graph_repository import SPO, GraphRepository
+
+# first key -> second key -> ordered set of third keys
+TripleIndex = Dict[str, Dict[str, Dict[str, None]]]
+
+SQLITE_SUFFIX = ".db"
+
+
+class TripleStoreRepository(GraphRepository):
+    """Graph repository based on SPO/POS/OSP hash indexes."""
+
+    def __init__(self, name: str | Path, **kwargs):
+        super().__init__(name=str(name), **kwargs)
+        self._spo: TripleIndex = {}
+        self._pos: TripleIndex = {}
+        self._osp: TripleIndex = {}
+        self._count = 0
+
+    @staticmethod
+    def _add(index: TripleIndex, a: str, b: str, c: str) -> bool:
+        thirds = index.setdefault(a, {}).setdefault(b, {})
+        if c in thirds:
+            return False
+        thirds[c] = None
+        return True
+
+    @staticmethod
+    def _remove(index: TripleIndex, a: str, b: str, c: str):
+        seconds = index[a]
+        thirds = seconds[b]
+        del thirds[c]
+        if not thirds:
+            del seconds[b]
+            if not seconds:
+                del index[a]
+
+    def _insert(self, subject: str, predicate: str, object_: str):
+        if self._add(self._spo, subject, predicate, object_):
+            self._add(self._pos, predicate, object_, subject)
+            self._add(self._osp, object_, subject, predicate)
+            self._count += 1
+
+    async def insert(self, subject: str, predicate: str, object_: str):
+        """Insert a new triple into the repository, an existing identical triple is ignored.
+
+        Args:
+            subject (str): The subject of the triple.
+            predicate (str): The predicate describing the relationship.
+            object_ (str): The object of the triple.
+
+        Example:
+            await my_triple_repo.insert(subject="Node1", predicate="connects_to", object_="Node2")
+            await my_triple_repo.insert(subject="Node1", predicate="depends_on", object_="Node2")
+            # Both relationships between Node1 and Node2 are kept.
+        """
+        self._insert(subject, predicate, object_)
+
+    async def insert_batch(self, triples: Iterable[SPO]):
+        """Insert several triples at once.
+
+        Args:
+            triples (Iterable[SPO]): The triples to insert.
+        """
+        for t in triples:
+            self._insert(t.subject, t.predicate, t.object_)
+
+    def _match(self, subject: str = None, predicate: str = None, object_: str = None) -> Iterator[Tuple[str, str, str]]:
+        """Yield the (subject, predicate, object) triples matching the bound terms, using the best index."""
+        if subject:
+            seconds = self._spo.get(subject, {})
+            if predicate:
+                objects = seconds.get(predicate, {})
+                if object_:
+                    if object_ in objects:
+                        yield subject, predicate, object_
+                    return
+                for o in objects:
+                    yield subject, predicate, o
+                return
+            if object_:
+                for p in self._osp.get(object_, {}).get(subject, {}):
+                    yield subject, p, object_
+                return
+            for p, objects in seconds.items():
+                for o in objects:
+                    yield subject, p, o
+            return
+        if predicate:
+            seconds = self._pos.get(predicate, {})
+            if object_:
+                for s in seconds.get(object_, {}):
+                    yield s, predicate, object_
+                return
+            for o, subjects in seconds.items():
+                for s in subjects:
+                    yield s, predicate, o
+            return
+        if object_:
+            for s, predicates in self._osp.get(object_, {}).items():
+                for p in predicates:
+                    yield s, p, object_
+            return
+        for s, seconds in self._spo.items():
+            for p, objects in seconds.items():
+                for o in objects:
+                    yield s, p, o
+
+    async def select(self, subject: str = None, predicate: str = None, object_: str = None) -> List[SPO]:
+        """Retrieve triples from the repository based on specified criteria.
+
+        Args:
+            subject (str, optional): The subject of the triple to filter by.
+            predicate (str, optional): The predicate describing the relationship to filter by.
+            object_ (str, optional): The object of the triple to filter by.
+
+        Returns:
+            List[SPO]: A list of SPO objects representing the selected triples.
+        """
+        return [SPO(subject=s, predicate=p, object_=o) for s, p, o in self._match(subject, predicate, object_)]
+
+    async def delete(self, subject: str = None, predicate: str = None, object_: str = None) -> int:
+        """Delete triples from the repository based on specified criteria.
+
+        Args:
+            subject (str, optional): The subject of the triple to filter by.
+            predicate (str, optional): The predicate describing the relationship to filter by.
+            object_ (str, optional): The object of the triple to filter by.
+
+        Returns:
+            int: The number of triples deleted from the repository.
+        """
+        rows = list(self._match(subject, predicate, object_))
+        for s, p, o in rows:
+            self._remove(self._spo, s, p, o)
+            self._remove(self._pos, p, o, s)
+            self._remove(self._osp, o, s, p)
+        self._count -= len(rows)
+        return len(rows)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def to_networkx(self) -> networkx.MultiDiGraph:
+        """Convert the repository to a networkx MultiDiGraph, one edge per triple."""
+        graph = networkx.MultiDiGraph()
+        for s, p, o in self._match():
+            graph.add_edge(s, o, predicate=p)
+        return graph
+
+    def json(self) -> str:
+        """Convert the repository to a node-link JSON-formatted string."""
+        return json.dumps(networkx.node_link_data(self.to_networkx()))
+
+    def load_json(self, val: str):
+        """Load triples from a node-link JSON string, as written by `json` or `DiGraphRepository.json`."""
+        if not val:
+            return self
+        graph = networkx.node_link_graph(json.loads(val))
+        for s, o, p in graph.edges(data="predicate"):
+            self._insert(s, p, o)
+        return self
+
+    def _save_sqlite(self, pathname: Path):
+        terms: Dict[str, int] = {}
+        rows = []
+        for triple in self._match():
+            rows.append(tuple(terms.setdefault(term, len(terms)) for term in triple))
+        pathname.unlink(missing_ok=True)
+        with sqlite3.connect(pathname) as conn:
+            conn.execute("CREATE TABLE terms (id INTEGER PRIMARY KEY, value TEXT NOT NULL)")
+            conn.execute("CREATE TABLE triples (s INTEGER NOT NULL, p INTEGER NOT NULL, o INTEGER NOT NULL)")
+            conn.executemany("INSERT INTO terms (id, value) VALUES (?, ?)", ((i, v) for v, i in terms.items()))
+            conn.executemany("INSERT INTO triples (s, p, o) VALUES (?, ?, ?)", rows)
+        conn.close()
+
+    def _load_sqlite(self, pathname: Path):
+        with sqlite3.connect(pathname) as conn:
+            terms = dict(conn.execute("SELECT id, value FROM terms"))
+            for s, p, o in conn.execute("SELECT s, p, o FROM triples ORDER BY rowid"):
+                self._insert(terms[s], terms[p], terms[o])
+        conn.close()
+
+    async def save(self, path: str | Path = None):
+        """Save the repository to `{path}/{name}{suffix}`, as SQLite if the suffix is `.db`, else as JSON.
+
+        Args:
+            path (Union[str, Path], optional): The directory path where the file will be saved.
+                If not provided, the default path is taken from the 'root' key in the keyword arguments.
+        """
+        path = Path(path or self.root)
+        path.mkdir(parents=True, exist_ok=True)
+        pathname = (path / self.name).with_suffix(self.suffix)
+        if self.suffix == SQLITE_SUFFIX:
+            await asyncio.to_thread(self._save_sqlite, pathname)
+        else:
+            await awrite(filename=pathname, data=self.json(), encoding="utf-8")
+
+    async def load(self, pathname: str | Path):
+        """Load triples from a SQLite or node-link JSON file, according to its suffix."""
+        pathname = Path(pathname)
+        if pathname.suffix == SQLITE_SUFFIX:
+            await asyncio.to_thread(self._load_sqlite, pathname)
+        else:
+            data = await aread(filename=pathname, encoding="utf-8")
+            self.load_json(data)
+
+    @staticmethod
+    async def load_from(pathname: str | Path) -> GraphRepository:
+        """Create and load a repository from a `.db` or `.json` file, later saves use the same format.
+
+        Args:
+            pathname (Union[str, Path]): The path to the file to be loaded.
+
+        Returns:
+            GraphRepository: A new instance of the graph repository loaded from the specified file.
+        """
+        pathname = Path(pathname)
+        graph = TripleStoreRepository(name=pathname.stem, root=pathname.parent, suffix=pathname.suffix or SQLITE_SUFFIX)
+        if pathname.exists():
+            await graph.load(pathname=pathname)
+        return graph
+
+    @property
+    def root(self) -> str:
+        """Return the root directory path for the graph repository files."""
+        return self._kwargs.get("root")
+
+    @property
+    def suffix(self) -> str:
+        """Return the file suffix, which decides the persistence format."""
+        return self._kwargs.get("suffix", SQLITE_SUFFIX)
+
+    @property
+    def pathname(self) -> Path:
+        """Return the path and filename to the graph repository file."""
+        p = Path(self.root) / self.name
+        return p.with_suffix(self.suffix)
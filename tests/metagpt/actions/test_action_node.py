@@ -5,6 +5,7 @@
 @Author  : alexanderwu
 @File    : test_action_node.py
 """
+import asyncio
 from pathlib import Path
 from typing import List, Optional, Tuple
 
@@ -316,5 +317,54 @@ def test_optional():
     assert t1
 
 
+class SpeculativeLLM:
+    """answers after `delays[i]` seconds with `contents[i]`, for the i-th call"""
+
+    def __init__(self, contents: list[str], delays: list[float]):
+        self.contents = contents
+        self.delays = delays
+        self.prompts = []
+        self.cancelled = 0
+
+    async def aask(self, msg, system_msgs=None, images=None, timeout=3, stream=None, coalesce=None) -> str:
+        idx = len(self.prompts)
+        self.prompts.append(msg)
+        try:
+            await asyncio.sleep(self.delays[idx])
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return self.contents[idx]
+
+
+@pytest.mark.asyncio
+async def test_action_node_fill_speculative():
+    node = ActionNode(key="Project Name", expected_type=str, instruction="name the project", example="game_2048")
+    valid = '[CONTENT]{"Project Name": "snake_game"}[/CONTENT]'
+    invalid = '[CONTENT]{"Name": "snake_game"}[/CONTENT]'  # missing field
+
+    # the first valid candidate is accepted, the slower ones are cancelled
+    llm = SpeculativeLLM([invalid, valid, valid], [0, 0.01, 1])
+    await node.fill(context="a snake game", llm=llm, candidates=3)
+    assert node.instruct_content.model_dump() == {"Project Name": "snake_game"}
+    assert len(llm.prompts) == 3
+    assert llm.cancelled == 1
+
+    # the rejected candidates are the negative examples of the next round
+    llm = SpeculativeLLM([invalid, '[CONTENT]{"Project Name": "snake game"}[/CONTENT]', valid, invalid], [0] * 4)
+    await node.fill(
+        context="a snake game", llm=llm, candidates=2, accept=lambda ic: " " not in ic.model_dump()["Project Name"]
+    )
+    assert node.instruct_content.model_dump() == {"Project Name": "snake_game"}
+    assert "## rejected outputs" not in llm.prompts[0]
+    assert "rejected by the review" in llm.prompts[2]
+    assert "Missing fields" in llm.prompts[2]
+
+    llm = SpeculativeLLM([invalid] * 6, [0] * 6)
+    with pytest.raises(ValueError):
+        await node.fill(context="a snake game", llm=llm, candidates=2)
+    assert len(llm.prompts) == 6
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-s"])
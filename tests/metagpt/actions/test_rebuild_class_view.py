@@ -15,7 +15,8 @@ from metagpt.llm import LLM
 
 
 @pytest.mark.asyncio
-async def test_rebuild(context):
+async def test_rebuild(context, mocker, tmp_path):
+    mocker.patch("metagpt.actions.rebuild_class_view.REPO_PARSER_CACHE_ROOT", tmp_path / "repo_parser_cache")
     action = RebuildClassView(
         name="RedBean",
         i_context=str(Path(__file__).parent.parent.parent.parent / "metagpt"),
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : the unittest of the box suppression of text_icon_localization
+
+import random
+
+import numpy as np
+import pytest
+
+from metagpt.environment.android.text_icon_localization import (
+    calculate_iou,
+    calculate_size,
+    pairwise_iou,
+    remove_boxes,
+)
+
+
+def legacy_remove_boxes(boxes_filt: list, size: tuple, iou_threshold: float = 0.5) -> list:
+    """the per-pair loop replaced by `remove_boxes`"""
+    boxes_to_remove = set()
+
+    for i in range(len(boxes_filt)):
+        if calculate_size(boxes_filt[i]) > 0.05 * size[0] * size[1]:
+            boxes_to_remove.add(i)
+        for j in range(len(boxes_filt)):
+            if calculate_size(boxes_filt[j]) > 0.05 * size[0] * size[1]:
+                boxes_to_remove.add(j)
+            if i == j:
+                continue
+            if i in boxes_to_remove or j in boxes_to_remove:
+                continue
+            iou = calculate_iou(boxes_filt[i], boxes_filt[j])
+            if iou >= iou_threshold:
+                boxes_to_remove.add(j)
+
+    return [box for idx, box in enumerate(boxes_filt) if idx not in boxes_to_remove]
+
+
+def test_pairwise_iou():
+    boxes = [[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30], [2, 2, 8, 8]]
+    iou = pairwise_iou(np.asarray(boxes, dtype=np.float64))
+    for i, box1 in enumerate(boxes):
+        for j, box2 in enumerate(boxes):
+            assert iou[i, j] == pytest.approx(calculate_iou(box1, box2))
+
+
+@pytest.mark.parametrize(
+    ("boxes", "expected"),
+    [
+        # equal-IoU ties at the threshold: the earlier box suppresses the later ones
+        ([[0, 0, 10, 10], [0, 0, 10, 20], [0, 10, 10, 30]], [[0, 0, 10, 10], [0, 10, 10, 30]]),
+        # identical boxes
+        ([[0, 0, 10, 10], [0, 0, 10, 10], [0, 0, 10, 10]], [[0, 0, 10, 10]]),
+        # a box contained in a kept box, with IoU above and below the threshold
+        ([[0, 0, 20, 20], [0, 0, 20, 15], [5, 5, 10, 10]], [[0, 0, 20, 20], [5, 5, 10, 10]]),
+        # a suppressed box does not suppress others
+        ([[0, 0, 10, 10], [3, 0, 13, 10], [6, 0, 16, 10]], [[0, 0, 10, 10], [6, 0, 16, 10]]),
+        # boxes larger than 5% of the image are dropped and don't suppress others
+        ([[0, 0, 46, 44], [0, 0, 44, 44]], [[0, 0, 44, 44]]),
+        ([], []),
+    ],
+)
+def test_remove_boxes_cases(boxes, expected):
+    size = (200, 200)
+    assert remove_boxes(boxes, size) == expected
+    assert legacy_remove_boxes(boxes, size) == expected
+
+
+def test_remove_boxes_same_as_legacy():
+    rng = random.Random(0)
+    size = (100, 200)
+    for _ in range(200):
+        boxes = []
+        for _ in range(rng.randint(1, 30)):
+            # a coarse grid makes many equal IoUs and nested boxes
+            x1, y1 = rng.randint(0, 20) * 2, rng.randint(0, 20) * 2
+            boxes.append([x1, y1, x1 + rng.randint(1, 8) * 2, y1 + rng.randint(1, 8) * 2])
+        for iou_threshold in [0.3, 0.5]:
+            assert remove_boxes(boxes, size, iou_threshold) == legacy_remove_boxes(boxes, size, iou_threshold)
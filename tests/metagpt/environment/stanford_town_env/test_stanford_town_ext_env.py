@@ -2,6 +2,9 @@
 # -*- coding: utf-8 -*-
 # @Desc   : the unittest of StanfordTownExtEnv
 
+import heapq
+import timeit
+from operator import itemgetter
 from pathlib import Path
 
 from metagpt.environment.stanford_town.env_space import (
@@ -11,6 +14,7 @@ from metagpt.environment.stanford_town.env_space import (
     EnvObsType,
 )
 from metagpt.environment.stanford_town.stanford_town_ext_env import StanfordTownExtEnv
+from metagpt.logs import logger
 
 maze_asset_path = (
     Path(__file__)
@@ -20,7 +24,7 @@ maze_asset_path = (
 
 
 def test_stanford_town_ext_env():
-    ext_env = StanfordTownExtEnv(maze_asset_path=maze_asset_path)
+    ext_env = StanfordTownExtEnv(maze_asset_path=maze_asset_path, maze_cache_root=None)
 
     tile_coord = ext_env.turn_coordinate_to_tile((64, 64))
     assert tile_coord == (2, 2)
@@ -46,7 +50,7 @@ def test_stanford_town_ext_env():
 
 
 def test_stanford_town_ext_env_observe_step():
-    ext_env = StanfordTownExtEnv(maze_asset_path=maze_asset_path)
+    ext_env = StanfordTownExtEnv(maze_asset_path=maze_asset_path, maze_cache_root=None)
     obs, info = ext_env.reset()
     assert len(info) == 0
     assert len(obs["address_tiles"]) == 306
@@ -62,3 +66,114 @@ def test_stanford_town_ext_env_observe_step():
     event = ("double studio:double studio:bedroom 2:bed", None, None, None)
     obs, _, _, _, _ = ext_env.step(action=EnvAction(action_type=EnvActionType.ADD_TILE_EVENT, coord=tile, event=event))
     assert len(ext_env.tiles[tile[1]][tile[0]]["events"]) == 1
+
+
+def test_stanford_town_ext_env_find_path():
+    ext_env = StanfordTownExtEnv(maze_asset_path=maze_asset_path, maze_cache_root=None)
+    assert ext_env.collision_grid.shape == (100, 140)
+
+    start, end = (21, 42), (21, 65)
+    path = ext_env.find_path(start, end)
+    assert path[0] == start and path[-1] == end
+    for (x0, y0), (x1, y1) in zip(path, path[1:]):
+        assert abs(x0 - x1) + abs(y0 - y1) == 1
+        assert not ext_env.tiles[y1][x1]["collision"]
+    assert ext_env.find_path(start, end) == path  # cached
+
+    closest_path, target = ext_env.find_closest_path(start, [(72, 14), end])
+    assert target == end and closest_path == path
+    assert len(ext_env.find_path(start, (72, 14))) > len(path)
+
+    # a multi-target query is cached on all of its targets, not only on the chosen one
+    near = path[len(path) // 2]
+    assert ext_env.find_closest_path(start, [near, end]) == (path[: len(path) // 2 + 1], near)
+    assert ext_env.find_closest_path(start, [end]) == (path, end)
+    assert ext_env.find_closest_path(start, [end, near]) == (path[: len(path) // 2 + 1], near)
+
+    blocked = next((x, y) for y in range(100) for x in range(140) if ext_env.tiles[y][x]["collision"])
+    assert ext_env.find_path(start, blocked) == [blocked]
+
+
+def test_stanford_town_ext_env_perceive():
+    ext_env = StanfordTownExtEnv(maze_asset_path=maze_asset_path, maze_cache_root=None)
+    tile = (21, 42)
+    event = ("Isabella Rodriguez", "is", "sleeping", "sleeping")
+    ext_env.add_event_from_tile(event, (22, 42))
+    assert ext_env.event_grid[42, 22] == len(ext_env.access_tile((22, 42))["events"])
+
+    perception = ext_env.observe(EnvObsParams(obs_type=EnvObsType.PERCEPTION, coord=tile, vision_radius=4))
+    nearby_tiles = ext_env.get_nearby_tiles(tile=tile, vision_r=4)
+    assert perception["nearby_tiles"] == nearby_tiles
+    assert perception["curr_arena_path"] == "the Ville:Johnson Park:park"
+    addresses = {
+        tuple(ext_env.access_tile(t)[level] for level in ["world", "sector", "arena", "game_object"])
+        for t in nearby_tiles
+    }
+    assert set(perception["addresses"]) == addresses
+    assert [1.0, event] in perception["events"]
+    for _, (subject, *_) in perception["events"]:
+        assert subject == "Isabella Rodriguez" or subject.startswith(perception["curr_arena_path"])
+
+    ext_env.remove_subject_events_from_tile(subject="Isabella Rodriguez", tile=(22, 42))
+    perception = ext_env.perceive(tile=tile, vision_r=4)
+    assert [1.0, event] not in perception["events"]
+
+
+def test_stanford_town_ext_env_maze_cache(tmp_path):
+    compiled = StanfordTownExtEnv(maze_asset_path=maze_asset_path, maze_cache_root=None)
+    first = StanfordTownExtEnv(maze_asset_path=maze_asset_path, maze_cache_root=tmp_path)
+    (cache_path,) = tmp_path.iterdir()
+    assert cache_path.joinpath("layers.npy").exists() and cache_path.joinpath("tables.pkl").exists()
+
+    cached = StanfordTownExtEnv(maze_asset_path=maze_asset_path, maze_cache_root=tmp_path)
+    for ext_env in [first, cached]:
+        assert ext_env.tiles == compiled.tiles
+        assert ext_env.address_tiles == compiled.address_tiles
+        assert ext_env.collision_maze == compiled.collision_maze
+        assert (ext_env.event_grid == compiled.event_grid).all()
+
+    # each env owns its tiles
+    cached.add_event_from_tile(("Isabella Rodriguez", "is", "idle", "idle"), (58, 9))
+    assert len(cached.access_tile((58, 9))["events"]) == len(first.access_tile((58, 9))["events"]) + 1
+
+
+class CountingEvents(list):
+    """the events of a tile, counting how many times they are read"""
+
+    reads = 0
+
+    def __iter__(self):
+        CountingEvents.reads += 1
+        return super().__iter__()
+
+
+def test_stanford_town_ext_env_perceive_crowded():
+    ext_env = StanfordTownExtEnv(maze_asset_path=maze_asset_path, maze_cache_root=None)
+    tile, vision_r, att_bandwidth = (21, 42), 8, 3
+    crowded_tiles = 0
+    for x, y in ext_env.get_nearby_tiles(tile=tile, vision_r=vision_r):
+        if ext_env.get_tile_path((x, y), level="arena") == "the Ville:Johnson Park:park":
+            for idx in range(50):
+                ext_env.add_event_from_tile((f"person {x} {y} {idx}", "is", "dancing", "dancing"), (x, y))
+            ext_env.tiles[y][x]["events"] = CountingEvents(ext_env.tiles[y][x]["events"])
+            crowded_tiles += 1
+
+    CountingEvents.reads = 0
+    full = ext_env.perceive(tile=tile, vision_r=vision_r)["events"]
+    assert CountingEvents.reads == crowded_tiles
+    CountingEvents.reads = 0
+    closest = ext_env.perceive(tile=tile, vision_r=vision_r, att_bandwidth=att_bandwidth)["events"]
+    # the cost depends on the attention bandwidth, not on the number of events in view: stopped at the closest tile
+    assert CountingEvents.reads == 1
+    assert len(full) > 4000
+    assert [event for _, event in closest] == [
+        event for _, event in heapq.nsmallest(att_bandwidth, full, key=itemgetter(0))
+    ]
+
+    def best_time(**kwargs) -> float:
+        return min(timeit.repeat(lambda: ext_env.perceive(tile=tile, vision_r=vision_r, **kwargs), number=5, repeat=3))
+
+    logger.info(
+        f"perceive {len(full)} events in view: {best_time() * 200:.2f}ms, "
+        f"with att_bandwidth={att_bandwidth}: {best_time(att_bandwidth=att_bandwidth) * 200:.2f}ms"
+    )
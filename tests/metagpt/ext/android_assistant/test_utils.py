@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : the unittest of the element list parsing of android_assistant utils
+
+import random
+from pathlib import Path
+from xml.etree.ElementTree import Element, SubElement, iterparse, tostring
+
+import pytest
+
+from metagpt.config2 import config
+from metagpt.ext.android_assistant.utils import utils
+from metagpt.ext.android_assistant.utils.schema import AndroidElement
+from metagpt.ext.android_assistant.utils.utils import (
+    ElementGridIndex,
+    elem_list_from_xml_tree,
+    get_id_from_element,
+)
+
+
+def legacy_traverse_xml_tree(xml_path: Path, elem_list: list[AndroidElement], attrib: str, add_index=False):
+    """the traversal with a linear scan of the collected elements, replaced by `_traverse_xml_tree`"""
+    path = []
+    extra_config = config.extra
+    for event, elem in iterparse(str(xml_path), ["start", "end"]):
+        if event == "start":
+            path.append(elem)
+            if attrib in elem.attrib and elem.attrib[attrib] == "true":
+                parent_prefix = ""
+                if len(path) > 1:
+                    parent_prefix = get_id_from_element(path[-2])
+                bounds = elem.attrib["bounds"][1:-1].split("][")
+                x1, y1 = map(int, bounds[0].split(","))
+                x2, y2 = map(int, bounds[1].split(","))
+                center = (x1 + x2) // 2, (y1 + y2) // 2
+                elem_id = get_id_from_element(elem)
+                if parent_prefix:
+                    elem_id = parent_prefix + "_" + elem_id
+                if add_index:
+                    elem_id += f"_{elem.attrib['index']}"
+                close = False
+                for e in elem_list:
+                    bbox = e.bbox
+                    center_ = (bbox[0][0] + bbox[1][0]) // 2, (bbox[0][1] + bbox[1][1]) // 2
+                    dist = (abs(center[0] - center_[0]) ** 2 + abs(center[1] - center_[1]) ** 2) ** 0.5
+                    if dist <= extra_config.get("min_dist", 30):
+                        close = True
+                        break
+                if not close:
+                    elem_list.append(AndroidElement(uid=elem_id, bbox=((x1, y1), (x2, y2)), attrib=attrib))
+
+        if event == "end":
+            path.pop()
+
+
+def legacy_elem_list_from_xml_tree(xml_path: Path, useless_list: list[str], min_dist: int) -> list[AndroidElement]:
+    """the two-pass parsing replaced by `elem_list_from_xml_tree`"""
+    clickable_list = []
+    focusable_list = []
+    legacy_traverse_xml_tree(xml_path, clickable_list, "clickable", True)
+    legacy_traverse_xml_tree(xml_path, focusable_list, "focusable", True)
+    elem_list = []
+    for elem in clickable_list:
+        if elem.uid in useless_list:
+            continue
+        elem_list.append(elem)
+    for elem in focusable_list:
+        if elem.uid in useless_list:
+            continue
+        bbox = elem.bbox
+        center = (bbox[0][0] + bbox[1][0]) // 2, (bbox[0][1] + bbox[1][1]) // 2
+        close = False
+        for e in clickable_list:
+            bbox = e.bbox
+            center_ = (bbox[0][0] + bbox[1][0]) // 2, (bbox[0][1] + bbox[1][1]) // 2
+            dist = (abs(center[0] - center_[0]) ** 2 + abs(center[1] - center_[1]) ** 2) ** 0.5
+            if dist <= min_dist:
+                close = True
+                break
+        if not close:
+            elem_list.append(elem)
+    return elem_list
+
+
+def build_ui_dump(seed: int, n_nodes: int = 300) -> bytes:
+    """a uiautomator-like screen dump with nested, overlapping and duplicated elements"""
+    rng = random.Random(seed)
+    hierarchy = Element("hierarchy", rotation="0")
+    root = {"index": "0", "class": "android.widget.FrameLayout", "clickable": "false", "bounds": "[0,0][1080,2400]"}
+    parents = [SubElement(hierarchy, "node", root)]
+    for i in range(n_nodes):
+        # coarse coordinates make many centers exactly `min_dist` apart
+        x1, y1 = rng.randint(0, 36) * 30, rng.randint(0, 80) * 30
+        w, h = rng.randint(1, 10) * 15, rng.randint(1, 6) * 15
+        attrib = {
+            "index": str(i % 7),
+            "class": rng.choice(["android.widget.TextView", "android.widget.Button", "android.view.View"]),
+            "resource-id": rng.choice(["", f"com.demo:id/item_{i % 11}"]),
+            "content-desc": rng.choice(["", "Search", "a description longer than twenty chars"]),
+            "clickable": rng.choice(["true", "false"]),
+            "focusable": rng.choice(["true", "false"]),
+            "bounds": f"[{x1},{y1}][{x1 + w},{y1 + h}]",
+        }
+        node = SubElement(rng.choice(parents[-5:]), "node", attrib)
+        parents.append(node)
+    return tostring(hierarchy)
+
+
+@pytest.fixture
+def ui_dumps(tmp_path, mocker):
+    mocker.patch.object(utils, "_ELEM_LIST_CACHE", utils.OrderedDict())
+    paths = []
+    for seed in range(5):
+        path = tmp_path / f"screen_{seed}.xml"
+        path.write_bytes(build_ui_dump(seed))
+        paths.append(path)
+    return paths
+
+
+def test_element_grid_index():
+    index = ElementGridIndex(30)
+    index.add((100, 100))
+    assert index.has_close((130, 100))  # on the boundary
+    assert index.has_close((121, 121))
+    assert not index.has_close((122, 122))
+    assert not index.has_close((131, 100))
+
+
+@pytest.mark.parametrize("min_dist", [0, 30, 45])
+def test_elem_list_from_xml_tree_same_as_legacy(ui_dumps, min_dist):
+    for path in ui_dumps:
+        legacy = legacy_elem_list_from_xml_tree(path, [], min_dist)
+        useless_list = [elem.uid for elem in legacy[::5]]
+        assert elem_list_from_xml_tree(path, useless_list, min_dist) == legacy_elem_list_from_xml_tree(
+            path, useless_list, min_dist
+        )
+
+
+def test_elem_list_from_xml_tree_cache(ui_dumps):
+    path = ui_dumps[0]
+    elem_list = elem_list_from_xml_tree(path, [], 30)
+    expected = [elem.model_copy() for elem in elem_list]
+    assert elem_list
+
+    # modifying the result doesn't change the cached one
+    elem_list.pop()
+    elem_list[0].uid = "modified"
+    cached = elem_list_from_xml_tree(path, [], 30)
+    assert cached == expected
+    assert cached is not elem_list
+    assert len(utils._ELEM_LIST_CACHE) == 1
+
+    # another filter is another entry
+    assert elem_list_from_xml_tree(path, [expected[0].uid], 30) == [e for e in expected if e.uid != expected[0].uid]
+    assert len(utils._ELEM_LIST_CACHE) == 2
@@ -87,3 +87,136 @@ class TestAgentMemory:
 
             retrieved[focal_pt] = final_result
         logger.info(f"检索结果为{retrieved}")
+
+
+def test_agent_memory_indexes():
+    agent_memory = AgentMemory()
+    created = datetime(2023, 2, 13, 8)
+    for idx in range(5):
+        created += timedelta(minutes=10)
+        agent_memory.add_event(
+            created,
+            None,
+            "Isabella Rodriguez",
+            "is",
+            f"cooking {idx}",
+            f"cooking {idx}",
+            {"Isabella Rodriguez"},
+            3,
+            (f"cooking {idx}", [0.1]),
+            [],
+        )
+    thought = agent_memory.add_thought(
+        created,
+        None,
+        "Isabella Rodriguez",
+        "plans",
+        "party",
+        "plans a party",
+        {"Party"},
+        6,
+        ("party", [0.2]),
+        ["node_1", "node_2"],
+    )
+    agent_memory.add_chat(
+        created,
+        None,
+        "Isabella Rodriguez",
+        "chat with",
+        "Maria Lopez",
+        "hello",
+        {"Maria Lopez"},
+        4,
+        ("hello", [0.3]),
+        [],
+    )
+
+    assert [node.memory_id for node in agent_memory.event_list] == [f"node_{idx}" for idx in range(5, 0, -1)]
+    assert agent_memory.get_node("node_6") is thought
+    assert thought.depth == 1
+    assert agent_memory.chat_list[0].type_count == 1
+
+    agent_memory.add(agent_memory.event_list[0])  # already stored
+    assert len(agent_memory.storage) == 7 and len(agent_memory.event_list) == 5
+
+    assert agent_memory.get_summarized_latest_events(2) == {
+        ("Isabella Rodriguez", "is", "cooking 4"),
+        ("Isabella Rodriguez", "is", "cooking 3"),
+    }
+    assert len(agent_memory.retrieve_relevant_events("isabella rodriguez", "is", "")) == 5
+    assert agent_memory.retrieve_relevant_thoughts("", "PARTY", "") == {thought}
+    assert agent_memory.get_last_chat("maria lopez").embedding_key == "hello"
+    assert agent_memory.get_nodes_by_last_accessed()[-1] is thought
+
+
+def test_agent_memory_save_load(tmp_path):
+    def add_events(agent_memory: AgentMemory, start: int, count: int):
+        for idx in range(start, start + count):
+            created = datetime(2023, 2, 13, 8) + timedelta(minutes=idx)
+            agent_memory.add_event(
+                created,
+                None,
+                "Klaus Mueller",
+                "is",
+                f"reading {idx}",
+                f"reading {idx}",
+                {"Klaus Mueller"},
+                2,
+                (f"reading {idx}", [float(idx), 1.0]),
+                [],
+            )
+
+    agent_memory = AgentMemory()
+    add_events(agent_memory, 0, 3)
+    agent_memory.save_json(tmp_path)  # the format of GA
+    agent_memory.save(tmp_path)
+
+    loaded = AgentMemory()
+    loaded.load(tmp_path)
+    assert [node.to_record() for node in loaded.storage] == [node.to_record() for node in agent_memory.storage]
+    assert loaded.get_summarized_latest_events(1) == {("Klaus Mueller", "is", "reading 2")}
+    assert loaded.embeddings["reading 1"].tolist() == [1.0, 1.0]
+    assert loaded.kw_strength_event == {"klaus mueller": 3}
+
+    # a later save only appends the new nodes
+    add_events(loaded, 3, 2)
+    loaded.save(tmp_path)
+    reloaded = AgentMemory()
+    reloaded.load(tmp_path)
+    assert [node.memory_id for node in reloaded.storage] == [f"node_{idx}" for idx in range(1, 6)]
+    assert len(reloaded.embeddings) == 5
+    assert len(tmp_path.joinpath("nodes.jsonl").read_text().splitlines()) == 5
+
+    # the JSON files of GA are still imported
+    tmp_path.joinpath("memory_meta.json").unlink()
+    imported = AgentMemory()
+    imported.load(tmp_path)
+    assert [node.to_record() for node in imported.storage] == [node.to_record() for node in agent_memory.storage]
+
+
+def test_agent_memory_latest_events():
+    agent_memory = AgentMemory()
+    agent_memory.set_event_retention(3)
+    created = datetime(2023, 2, 13, 8)
+    for obj in ["bed", "desk", "bed", "sink", "stove"]:
+        agent_memory.add_event(
+            created,
+            None,
+            "Klaus Mueller",
+            "use",
+            obj,
+            f"using {obj}",
+            {"Klaus Mueller"},
+            2,
+            (f"using {obj}", [1.0]),
+            [],
+        )
+
+    assert agent_memory.get_summarized_latest_events(3) == {
+        ("Klaus Mueller", "use", "bed"),
+        ("Klaus Mueller", "use", "sink"),
+        ("Klaus Mueller", "use", "stove"),
+    }
+    assert agent_memory.has_latest_event(("Klaus Mueller", "use", "bed"), 3)
+    assert not agent_memory.has_latest_event(("Klaus Mueller", "use", "desk"), 3)
+    assert agent_memory.has_latest_event(("Klaus Mueller", "use", "desk"), 4)
@@ -23,7 +23,7 @@ async def init_two_roles(fork_sim_code: str = "base_the_ville_isabella_maria_kla
     role_ir_name = "Isabella Rodriguez"
     role_km_name = "Klaus Mueller"
 
-    env = StanfordTownEnv(maze_asset_path=MAZE_ASSET_PATH)
+    env = StanfordTownEnv(maze_asset_path=MAZE_ASSET_PATH, maze_cache_root=None)
 
     role_ir = STRole(
         name=role_ir_name,
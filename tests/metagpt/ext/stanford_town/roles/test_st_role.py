@@ -17,7 +17,7 @@ async def test_observe():
         start_time="February 13, 2023",
         curr_time="February 13, 2023, 00:00:00",
     )
-    role.set_env(StanfordTownEnv(maze_asset_path=MAZE_ASSET_PATH))
+    role.set_env(StanfordTownEnv(maze_asset_path=MAZE_ASSET_PATH, maze_cache_root=None))
     await role.init_curr_tile()
 
     ret_events = await role.observe()
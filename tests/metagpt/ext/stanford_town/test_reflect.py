@@ -2,6 +2,8 @@
 # -*- coding: utf-8 -*-
 # @Desc   : the unittest of reflection
 
+from types import SimpleNamespace
+
 import pytest
 
 from metagpt.environment import StanfordTownEnv
@@ -10,6 +12,11 @@ from metagpt.ext.stanford_town.actions.run_reflect_action import (
     AgentFocusPt,
     AgentInsightAndGuidance,
 )
+from metagpt.ext.stanford_town.actions.st_action import STAction
+from metagpt.ext.stanford_town.reflect.reflect import (
+    generate_action_event_triples,
+    generate_poig_scores,
+)
 from metagpt.ext.stanford_town.roles.st_role import STRole
 from metagpt.ext.stanford_town.utils.const import MAZE_ASSET_PATH
 
@@ -24,7 +31,7 @@ async def test_reflect():
         start_time="February 13, 2023",
         curr_time="February 13, 2023, 00:00:00",
     )
-    role.set_env(StanfordTownEnv(maze_asset_path=MAZE_ASSET_PATH))
+    role.set_env(StanfordTownEnv(maze_asset_path=MAZE_ASSET_PATH, maze_cache_root=None))
     role.init_curr_tile()
 
     run_focus = AgentFocusPt()
@@ -45,3 +52,26 @@ async def test_reflect():
 
     role.scratch.importance_trigger_curr = -1
     role.reflect()
+
+
+@pytest.mark.asyncio
+async def test_batched_poig_scores_and_triples(mocker):
+    mocker.patch("metagpt.ext.stanford_town.actions.st_action.backoff")
+    role = SimpleNamespace(
+        name="Klaus Mueller", scratch=SimpleNamespace(name="Klaus Mueller", get_str_iss=lambda: "Klaus is a student")
+    )
+    events = ["bed is being slept in", "Klaus Mueller is idle", "desk is being used"]
+
+    aask = mocker.patch.object(STAction, "_aask", return_value='{"output": [2, 6]}')
+    assert await generate_poig_scores(role, "event", events) == [2, 1, 6]
+    assert aask.call_count == 1  # both events in one prompt
+
+    # a batched response that can't be matched to the events falls back to one call per event
+    aask = mocker.patch.object(STAction, "_aask", side_effect=['{"output": [2]}', '{"output": "3"}', '{"output": "3"}'])
+    assert await generate_poig_scores(role, "event", events) == [3, 1, 3]
+    assert aask.call_count == 3
+
+    aask = mocker.patch.object(STAction, "_aask", return_value='{"output": [["read", "paper"], "(write, essay)"]}')
+    triples = await generate_action_event_triples(["(reading a paper)", "(writing an essay)"], role)
+    assert triples == [("Klaus Mueller", "read", "paper"), ("Klaus Mueller", "write", "essay")]
+    assert aask.call_count == 1
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : the unittest of llm_trace
+
+import time
+
+import pytest
+
+from metagpt.ext.stanford_town.utils import llm_trace
+from metagpt.ext.stanford_town.utils.llm_trace import (
+    LLMTrace,
+    backoff,
+    backoff_sync,
+    set_llm_trace,
+)
+from metagpt.ext.stanford_town.utils.sim_profiler import SIM_PROFILER
+from metagpt.ext.stanford_town.utils.utils import get_embeddings
+
+
+@pytest.fixture
+def reset_trace():
+    yield
+    set_llm_trace(None)
+
+
+@pytest.mark.asyncio
+async def test_llm_trace_record_replay(tmp_path, reset_trace):
+    trace_file = tmp_path / "llm_trace.jsonl"
+    answers = iter(["first", "second", "other"])
+
+    async def ask(prompt: str) -> str:
+        return next(answers)
+
+    recorder = LLMTrace(trace_file, mode="record")
+    assert await recorder.aask("hello", ask) == "first"
+    assert await recorder.aask("hello", ask) == "second"
+    assert await recorder.aask("bye", ask) == "other"
+
+    fetched = []
+
+    def fetch(texts: list[str]) -> list[list[float]]:
+        fetched.extend(texts)
+        return [[float(len(text))] for text in texts]
+
+    assert recorder.embed(["a", "bb", "a"], "model", fetch) == [[1.0], [2.0], [1.0]]
+    assert recorder.embed(["bb"], "model", fetch) == [[2.0]]
+    assert fetched == ["a", "bb"]
+
+    async def live_ask(prompt: str) -> str:
+        raise AssertionError("replay must not call the llm")
+
+    def live_fetch(texts: list[str]) -> list[list[float]]:
+        raise AssertionError("replay must not call the embedding api")
+
+    SIM_PROFILER.reset()
+    replayer = LLMTrace(trace_file, mode="replay")
+    assert replayer.fast_forward
+    # the recorded responses of a repeated prompt are replayed in order, the last one repeats
+    assert [await replayer.aask("hello", live_ask) for _ in range(3)] == ["first", "second", "second"]
+    assert await replayer.aask("bye", live_ask) == "other"
+    assert replayer.embed(["bb", "a"], "model", live_fetch) == [[2.0], [1.0]]
+    assert replayer.misses == 0
+
+    with pytest.raises(KeyError):
+        await replayer.aask("not recorded", live_ask)
+    pseudo = replayer.embed(["not recorded"], "model", live_fetch)[0]
+    assert len(pseudo) == 1536
+    assert pseudo == replayer.pseudo_embedding("not recorded")
+    assert replayer.misses == 2
+
+    report = SIM_PROFILER.report()
+    assert report["llm"]["calls"] == 5
+    assert report["embedding"]["calls"] == 2
+
+
+@pytest.mark.asyncio
+async def test_llm_trace_fast_forward(tmp_path, reset_trace):
+    trace_file = tmp_path / "llm_trace.jsonl"
+    trace_file.write_text("")
+    set_llm_trace(LLMTrace(trace_file, mode="replay"))
+    assert llm_trace.get_llm_trace().fast_forward
+
+    start = time.perf_counter()
+    await backoff(5)
+    backoff_sync(5)
+    assert time.perf_counter() - start < 1
+
+    # the embeddings of the actions are routed through the trace
+    embeddings = get_embeddings(["chat\nwith Klaus", "chat with Klaus"])
+    assert embeddings[0] == embeddings[1]
+    assert llm_trace.get_llm_trace().misses == 1
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : the unittest of mg_ga_transform
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from metagpt.ext.stanford_town.utils import mg_ga_transform
+from metagpt.ext.stanford_town.utils.mg_ga_transform import (
+    checkpoint_sim_store,
+    get_role_environment,
+    get_sim_store,
+    save_environment,
+    save_movement,
+    wait_role_environment,
+)
+from metagpt.utils.common import read_json_file
+
+
+@pytest.fixture(autouse=True)
+def sim_storage(tmp_path, mocker):
+    """a clean in-memory state of the simulations and an empty storage per test"""
+    mocker.patch.object(mg_ga_transform, "STORAGE_PATH", tmp_path)
+    mocker.patch.dict(mg_ga_transform._SIM_STORES, clear=True)
+    mocker.patch.dict(mg_ga_transform._ENV_READY_EVENTS, clear=True)
+    return tmp_path
+
+
+@pytest.mark.asyncio
+async def test_wait_role_environment():
+    async def write_later():
+        await asyncio.sleep(0.1)
+        save_environment("Klaus Mueller", 1, "wait_sim", [3, 4])
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    role_env, _ = await asyncio.gather(
+        wait_role_environment("wait_sim", "Klaus Mueller", 1, timeout=5, poll_interval=5), write_later()
+    )
+    # woken up by the write instead of the next poll
+    assert loop.time() - start < 1
+    assert role_env == {"maze": "the_ville", "x": 3, "y": 4}
+
+    assert await wait_role_environment("wait_sim", "Isabella Rodriguez", 1, timeout=0.1) is None
+    assert mg_ga_transform._ENV_READY_EVENTS
+
+    checkpoint_sim_store("wait_sim", final=True)
+    assert not mg_ga_transform._SIM_STORES
+    assert not mg_ga_transform._ENV_READY_EVENTS
+
+
+def test_sim_store_checkpoint(sim_storage):
+    tmp_path = sim_storage
+    curr_time = datetime(2023, 2, 13, 0, 0, 10)
+    for name, x in [("Klaus Mueller", 1), ("Isabella Rodriguez", 2)]:
+        save_movement(name, {"movement": [x, 1]}, step=0, sim_code="sim", curr_time=curr_time)
+        save_environment(name, 1, "sim", [x, 1])
+    assert not (tmp_path / "sim").exists()  # nothing is written before the checkpoint
+    assert get_role_environment("sim", "Isabella Rodriguez", 1) == {"maze": "the_ville", "x": 2, "y": 1}
+
+    checkpoint_sim_store("sim")
+    store = get_sim_store("sim")
+    frames = store.load_frames()
+    assert len(frames) == 1 and frames[0]["step"] == 0
+    assert set(frames[0]["movement"]["persona"]) == {"Klaus Mueller", "Isabella Rodriguez"}
+    # per-step json files of the replay frontend
+    assert read_json_file(tmp_path / "sim/movement/0.json")["meta"]["curr_time"] == "February 13, 2023, 00:00:10"
+    assert read_json_file(tmp_path / "sim/environment/1.json")["Klaus Mueller"]["x"] == 1
+    # the next step is still fed from memory
+    assert get_role_environment("sim", "Klaus Mueller", 1) == {"maze": "the_ville", "x": 1, "y": 1}
+
+    checkpoint_sim_store("sim", final=True)
+    frames = store.load_frames()
+    assert [frame["step"] for frame in frames] == [0, 1]
+    assert frames[1]["environment"]["Klaus Mueller"]["x"] == 1
+    assert "sim" not in mg_ga_transform._SIM_STORES
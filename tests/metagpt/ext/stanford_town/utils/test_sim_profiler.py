@@ -0,0 +1,25 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : the unittest of sim_profiler
+
+import pytest
+
+from metagpt.ext.stanford_town.utils.sim_profiler import SimProfiler
+
+
+def test_sim_profiler():
+    profiler = SimProfiler()
+    for _ in range(3):
+        with profiler.timed("plan"):
+            pass
+    with pytest.raises(ValueError):
+        with profiler.timed("execute"):
+            raise ValueError("the time is still counted")
+
+    report = profiler.report()
+    assert report["plan"]["calls"] == 3
+    assert report["execute"]["calls"] == 1
+    assert all(item["seconds"] >= 0 for item in report.values())
+
+    profiler.reset()
+    assert profiler.report() == {}
@@ -2,8 +2,17 @@
 # -*- coding: utf-8 -*-
 # @Desc   :
 
+import json
+import time
 
+import regex as re
+
+from metagpt.config2 import config
+from metagpt.const import TEST_DATA_PATH
+from metagpt.logs import logger
 from metagpt.provider.postprocess.base_postprocess_plugin import BasePostProcessPlugin
+from metagpt.utils import repair_llm_raw_output
+from metagpt.utils.repair_llm_raw_output import fast_parse_content
 
 raw_output = """
 [CONTENT]
@@ -29,3 +38,58 @@ def test_llm_post_process_plugin():
 
     output = post_process_plugin.run(output=raw_output, schema=raw_schema)
     assert "Original Requirements" in output
+
+
+class LegacyPostProcessPlugin(BasePostProcessPlugin):
+    def run_fast_parse(self, content: str, req_key: str):
+        return None
+
+
+def break_json(output: str) -> list[str]:
+    """the usual ways llms break the json: a trailing comma, single quotes and raw newlines in the strings"""
+    start, end = output.find("{"), output.rfind("}")
+    content = output[start : end + 1]
+    single_quoted = re.sub(r'"((?:[^"\\]|\\.)*)"', lambda m: "'" + m.group(1).replace("'", "\\'") + "'", content)
+    variants = [content[:-1].rstrip() + ",\n}", single_quoted, content.replace("\\n", "\n")]
+    return [output[:start] + variant + output[end + 1 :] for variant in variants]
+
+
+def test_llm_post_process_plugin_corpus(mocker):
+    rsp_cache = json.loads((TEST_DATA_PATH / "rsp_cache.json").read_text())
+    outputs = [rsp for rsp in rsp_cache.values() if "[CONTENT]" in rsp and "[/CONTENT]" in rsp]
+    assert len(outputs) > 50
+    legacy = LegacyPostProcessPlugin()
+    fast = BasePostProcessPlugin()
+    legacy_repair = mocker.spy(legacy, "run_repair_llm_raw_output")
+    fast_repair = mocker.spy(fast, "run_repair_llm_raw_output")
+
+    schemas, targets = [], []
+    start = time.perf_counter()
+    for output in outputs:
+        target = legacy.run(output=output, schema={"properties": {"key": {}}})
+        schemas.append({"properties": {key: {} for key in target}})
+        targets.append(target)
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for output, schema, target in zip(outputs, schemas, targets):
+        assert fast.run(output=output, schema=schema) == target
+    fast_seconds = time.perf_counter() - start
+    logger.info(
+        f"parse {len(outputs)} outputs: legacy {legacy_seconds * 1000:.2f}ms, fast path {fast_seconds * 1000:.2f}ms"
+    )
+    # every output of the corpus skips the regex repairs on the fast path
+    assert legacy_repair.call_count >= len(outputs)
+    assert fast_repair.call_count == 0
+
+    # the broken outputs are repaired in one pass, only if the repair is enabled
+    mocker.patch.object(config, "repair_llm_output", True)
+    for output, target in zip(outputs, targets):
+        for broken in break_json(output):
+            assert fast_parse_content(broken) == target
+    mocker.patch.object(config, "repair_llm_output", False)
+    scan = mocker.spy(repair_llm_raw_output, "repair_json_scan")
+    for output in outputs:
+        for broken in break_json(output):
+            fast_parse_content(broken)
+    assert scan.call_count == 0
@@ -4,8 +4,10 @@
 
 import pytest
 from anthropic.resources.completions import Completion
+from anthropic.types import Usage
 
-from metagpt.provider.anthropic_api import AnthropicLLM
+from metagpt.provider.anthropic_api import PROMPT_CACHING_BETA, AnthropicLLM
+from metagpt.utils.cost_manager import CostManager
 from tests.metagpt.provider.mock_llm_config import mock_llm_config_anthropic
 from tests.metagpt.provider.req_resp_const import (
     get_anthropic_response,
@@ -44,3 +46,44 @@ async def test_anthropic_acompletion(mocker):
     assert resp.content[0].text == resp_cont
 
     await llm_general_chat_funcs_test(anthropic_llm, prompt, messages, resp_cont)
+
+
+@pytest.mark.asyncio
+async def test_anthropic_prompt_cache(mocker):
+    requests = []
+
+    async def mock_create(self, **kwargs):
+        requests.append(kwargs)
+        resp = get_anthropic_response(name)
+        resp.usage = Usage(
+            input_tokens=10, output_tokens=10, cache_creation_input_tokens=500, cache_read_input_tokens=2000
+        )
+        return resp
+
+    mocker.patch("anthropic.resources.messages.AsyncMessages.create", mock_create)
+    anthropic_llm = AnthropicLLM(mock_llm_config_anthropic)
+    anthropic_llm.cost_manager = CostManager()
+
+    history = [{"role": "user", "content": "the PRD"}, {"role": "assistant", "content": "ok"}]
+    resp = await anthropic_llm.aask(
+        prompt, system_msgs=["You are a engineer"], format_msgs=history, cache_prefix=True, stream=False
+    )
+    assert resp == resp_cont
+    kwargs = requests[-1]
+    assert kwargs["system"] == [{"type": "text", "text": "You are a engineer", "cache_control": {"type": "ephemeral"}}]
+    # the breakpoint ends the stable prefix, the question after it is not cached
+    assert kwargs["messages"][1]["content"] == [{"type": "text", "text": "ok", "cache_control": {"type": "ephemeral"}}]
+    assert kwargs["messages"][0] == history[0]
+    assert kwargs["messages"][-1] == {"role": "user", "content": prompt}
+    assert kwargs["extra_headers"] == {"anthropic-beta": PROMPT_CACHING_BETA}
+    assert anthropic_llm.cost_manager.get_total_cached_tokens() == 2000
+    assert anthropic_llm.cost_manager.get_total_cache_write_tokens() == 500
+    assert anthropic_llm.cost_manager.get_total_prompt_tokens() == 2510
+    # cache reads and writes are priced at their own rates
+    assert anthropic_llm.cost_manager.get_total_cost() == pytest.approx(
+        (10 * 0.015 + 2000 * 0.0015 + 500 * 0.01875 + 10 * 0.075) / 1000
+    )
+
+    await anthropic_llm.aask(prompt, cache_prefix=False, stream=False)
+    assert "extra_headers" not in requests[-1]
+    assert requests[-1]["system"] == anthropic_llm.system_prompt
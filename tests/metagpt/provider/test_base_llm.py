@@ -6,11 +6,21 @@
 @File    : test_base_llm.py
 """
 
+import asyncio
+
 import pytest
 
 from metagpt.configs.llm_config import LLMConfig
-from metagpt.provider.base_llm import BaseLLM
+from metagpt.logs import (
+    _llm_stream_log,
+    get_stream_channel,
+    log_llm_stream,
+    set_llm_stream_logfunc,
+    stream_channel,
+)
+from metagpt.provider.base_llm import LLM_SINGLEFLIGHT, BaseLLM
 from metagpt.schema import Message
+from metagpt.utils.cost_manager import CostManager
 from tests.metagpt.provider.mock_llm_config import mock_llm_config
 from tests.metagpt.provider.req_resp_const import (
     default_resp_cont,
@@ -37,7 +47,7 @@ class MockBaseLLM(BaseLLM):
     async def _achat_completion_stream(self, messages: list[dict], timeout: int = 3) -> str:
         pass
 
-    async def acompletion_text(self, messages: list[dict], stream=False, timeout=3) -> str:
+    async def acompletion_text(self, messages: list[dict], stream=False, timeout=3, coalesce=None) -> str:
         return default_resp_cont
 
 
@@ -104,3 +114,66 @@ async def test_async_base_llm():
 
     # resp = await base_llm.aask_code([prompt])
     # assert resp == default_resp_cont
+
+
+@pytest.mark.asyncio
+async def test_base_llm_prompt_cache():
+    class CapturingLLM(MockBaseLLM):
+        async def acompletion_text(self, messages: list[dict], stream=False, timeout=3, coalesce=None) -> str:
+            self.sent = messages
+            return default_resp_cont
+
+    base_llm = CapturingLLM()
+    history = [{"role": "user", "content": "the PRD"}]
+    await base_llm.aask(prompt, system_msgs=["You are a engineer"], format_msgs=history, cache_prefix=True)
+    # the stable prefix goes first, the marks are dropped for the providers reusing prefixes by themselves
+    assert base_llm.sent == [
+        {"role": "system", "content": "You are a engineer"},
+        {"role": "user", "content": "the PRD"},
+        {"role": "user", "content": prompt},
+    ]
+    assert history == [{"role": "user", "content": "the PRD"}]
+
+    base_llm.cost_manager = CostManager()
+    usage = {"prompt_tokens": 1000, "completion_tokens": 10, "prompt_tokens_details": {"cached_tokens": 768}}
+    base_llm._update_costs(usage, model="gpt-4o-mini")
+    assert base_llm.cost_manager.get_total_cached_tokens() == 768
+
+
+@pytest.mark.asyncio
+async def test_base_llm_coalesce():
+    class SlowLLM(MockBaseLLM):
+        calls = 0
+
+        async def _achat_completion_stream(self, messages: list[dict], timeout: int = 3) -> str:
+            SlowLLM.calls += 1
+            for chunk in ["Hello", " World"]:
+                log_llm_stream(chunk)
+                await asyncio.sleep(0.01)
+            return "Hello World"
+
+    streamed = {}
+
+    def collect(text):
+        streamed.setdefault(get_stream_channel(), []).append(text)
+
+    llm = SlowLLM(mock_llm_config.model_copy(update={"temperature": 0}))
+    coalesced = LLM_SINGLEFLIGHT.coalesced
+
+    async def ask(name: str, **kwargs) -> str:
+        with stream_channel(name):
+            return await BaseLLM.acompletion_text(llm, [{"role": "user", "content": "hi"}], stream=True, **kwargs)
+
+    set_llm_stream_logfunc(collect)
+    try:
+        rsps = await asyncio.gather(*(ask(f"role{i}") for i in range(3)))
+        assert rsps == ["Hello World"] * 3
+        assert SlowLLM.calls == 1
+        assert LLM_SINGLEFLIGHT.coalesced == coalesced + 2
+        # every waiter gets the stream in its own channel
+        assert streamed == {f"role{i}": ["Hello", " World"] for i in range(3)}
+
+        await asyncio.gather(*(ask(f"role{i}", coalesce=False) for i in range(3)))
+        assert SlowLLM.calls == 4
+    finally:
+        set_llm_stream_logfunc(_llm_stream_log)
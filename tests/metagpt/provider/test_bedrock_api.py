@@ -1,4 +1,6 @@
+import asyncio
 import json
+import threading
 
 import pytest
 
@@ -22,13 +24,13 @@ usage = {
 }
 
 
-def mock_invoke_model(self: BedrockLLM, *args, **kwargs) -> dict:
+async def mock_invoke_model(self: BedrockLLM, *args, **kwargs) -> dict:
     provider = self.config.model.split(".")[0]
     self._update_costs(usage, self.config.model)
     return BEDROCK_PROVIDER_RESPONSE_BODY[provider]
 
 
-def mock_invoke_model_stream(self: BedrockLLM, *args, **kwargs) -> dict:
+async def mock_invoke_model_stream(self: BedrockLLM, *args, **kwargs) -> dict:
     # use json object to mock EventStream
     def dict2bytes(x):
         return json.dumps(x).encode("utf-8")
@@ -36,18 +38,24 @@ def mock_invoke_model_stream(self: BedrockLLM, *args, **kwargs) -> dict:
     provider = self.config.model.split(".")[0]
 
     if provider == "amazon":
-        response_body_bytes = dict2bytes({"outputText": "Hello World"})
+        response_body = {"outputText": "Hello World"}
     elif provider == "anthropic":
-        response_body_bytes = dict2bytes(
-            {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "Hello World"}}
-        )
+        response_body = {
+            "type": "content_block_delta",
+            "index": 0,
+            "delta": {"type": "text_delta", "text": "Hello World"},
+        }
     elif provider == "cohere":
-        response_body_bytes = dict2bytes({"is_finished": False, "text": "Hello World"})
+        response_body = {"is_finished": False, "text": "Hello World"}
     else:
-        response_body_bytes = dict2bytes(BEDROCK_PROVIDER_RESPONSE_BODY[provider])
-
-    response_body_stream = {"body": [{"chunk": {"bytes": response_body_bytes}}]}
-    self._update_costs(usage, self.config.model)
+        response_body = dict(BEDROCK_PROVIDER_RESPONSE_BODY[provider])
+    # the usage of a stream comes with its last event
+    response_body["amazon-bedrock-invocationMetrics"] = {
+        "inputTokenCount": usage["prompt_tokens"],
+        "outputTokenCount": usage["completion_tokens"],
+    }
+
+    response_body_stream = {"body": [{"chunk": {"bytes": dict2bytes(response_body)}}]}
     return response_body_stream
 
 
@@ -107,3 +115,47 @@ class TestBedrockAPI:
         self._patch_invoke_model_stream(mocker)
         assert await bedrock_api.aask(messages, stream=False) == "Hello World"
         assert await bedrock_api.aask(messages, stream=True) == "Hello World"
+
+
+@pytest.mark.asyncio
+async def test_stream_events_relayed_as_they_arrive():
+    mock_llm_config_bedrock.model = "anthropic.claude-3-haiku-20240307-v1:0"
+    api = BedrockLLM(mock_llm_config_bedrock)
+    second_chunk_allowed = threading.Event()
+
+    def event_stream():
+        yield {"chunk": {"bytes": b'{"type": "content_block_delta", "delta": {"text": "Hello"}}'}}
+        # boto3 blocks until the next event, the first one must already be delivered
+        assert second_chunk_allowed.wait(timeout=5)
+        body = {
+            "type": "content_block_delta",
+            "delta": {"text": " World"},
+            "amazon-bedrock-invocationMetrics": {"inputTokenCount": 10, "outputTokenCount": 2},
+        }
+        yield {"chunk": {"bytes": json.dumps(body).encode("utf-8")}}
+
+    events = api._aiter_stream_events(event_stream())
+    first = await asyncio.wait_for(events.__anext__(), timeout=5)
+    assert api.provider.get_choice_text_from_stream(first) == "Hello"
+    second_chunk_allowed.set()
+    assert [api.provider.get_choice_text_from_stream(event) async for event in events] == [" World"]
+
+    # usage is reported once, from the last event
+    api.cost_manager.total_prompt_tokens = api.cost_manager.total_completion_tokens = 0
+    collected = await api._get_stream_response_body({"body": event_stream()})
+    assert "".join(collected) == "Hello World"
+    assert api.cost_manager.total_prompt_tokens == 10
+    assert api.cost_manager.total_completion_tokens == 2
+
+
+@pytest.mark.asyncio
+async def test_stream_error_raised_in_event_loop():
+    mock_llm_config_bedrock.model = "anthropic.claude-3-haiku-20240307-v1:0"
+    api = BedrockLLM(mock_llm_config_bedrock)
+
+    def event_stream():
+        yield {"chunk": {"bytes": b'{"type": "content_block_delta", "delta": {"text": "Hello"}}'}}
+        raise ConnectionError("stream broken")
+
+    with pytest.raises(ConnectionError):
+        await api._get_stream_response_body({"body": event_stream()})
@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : unittest of llm_batch, against a local mock of the OpenAI Batch API
+
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+from aiohttp import web
+
+from metagpt.configs.llm_config import LLMConfig
+from metagpt.provider.base_llm import BaseLLM
+from metagpt.provider.llm_batch import LLMBatch
+from metagpt.provider.openai_api import OpenAILLM
+from metagpt.utils.cost_manager import CostManager
+from tests.metagpt.provider.mock_llm_config import mock_llm_config
+from tests.metagpt.provider.req_resp_const import get_openai_chat_completion
+from tests.metagpt.provider.test_base_llm import MockBaseLLM
+
+
+class MockBatchServer:
+    """The files and batches endpoints, a batch is done at its second retrieval"""
+
+    def __init__(self):
+        self.files: dict[str, str] = {}
+        self.batches: dict[str, dict] = {}
+        self.retrievals: dict[str, int] = {}
+
+    def _file(self, file_id: str, content: str, purpose: str) -> dict:
+        self.files[file_id] = content
+        return {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": f"{file_id}.jsonl",
+            "purpose": purpose,
+            "status": "processed",
+        }
+
+    async def upload(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        content = form["file"].file.read().decode("utf-8")
+        return web.json_response(self._file(f"file-{len(self.files)}", content, form["purpose"]))
+
+    async def content(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.files[request.match_info["file_id"]])
+
+    async def create(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        batch_id = f"batch-{len(self.batches)}"
+        self.batches[batch_id] = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": body["endpoint"],
+            "input_file_id": body["input_file_id"],
+            "completion_window": body["completion_window"],
+            "status": "in_progress",
+            "created_at": int(time.time()),
+        }
+        self.retrievals[batch_id] = 0
+        return web.json_response(self.batches[batch_id])
+
+    async def retrieve(self, request: web.Request) -> web.Response:
+        batch = self.batches[request.match_info["batch_id"]]
+        self.retrievals[batch["id"]] += 1
+        if batch["status"] == "in_progress" and self.retrievals[batch["id"]] >= 2:
+            lines = []
+            for line in self.files[batch["input_file_id"]].splitlines():
+                line = json.loads(line)
+                question = line["body"]["messages"][-1]["content"]
+                if question == "fail":
+                    response = {"status_code": 400, "body": {"error": {"message": "bad request"}}}
+                else:
+                    body = get_openai_chat_completion(question).model_dump()
+                    response = {"status_code": 200, "body": body}
+                lines.append(
+                    json.dumps({"id": f"req-{len(lines)}", "custom_id": line["custom_id"], "response": response})
+                )
+            output = self._file(f"file-{len(self.files)}", "\n".join(lines), "batch_output")
+            batch.update(status="completed", output_file_id=output["id"])
+        return web.json_response(batch)
+
+    async def chat(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        return web.json_response(get_openai_chat_completion(body["messages"][-1]["content"]).model_dump())
+
+    @asynccontextmanager
+    async def serve(self, batch_api: bool = True):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.chat)
+        if batch_api:
+            app.router.add_post("/v1/files", self.upload)
+            app.router.add_get("/v1/files/{file_id}/content", self.content)
+            app.router.add_post("/v1/batches", self.create)
+            app.router.add_get("/v1/batches/{batch_id}", self.retrieve)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            yield f"http://127.0.0.1:{port}/v1"
+        finally:
+            await runner.cleanup()
+
+
+def openai_llm(base_url: str) -> OpenAILLM:
+    llm = OpenAILLM(LLMConfig(api_type="openai", api_key="sk-mock", base_url=base_url, model="gpt-4o-mini"))
+    llm.cost_manager = CostManager()
+    return llm
+
+
+@pytest.mark.asyncio
+async def test_llm_batch_api(tmp_path):
+    server = MockBatchServer()
+    async with server.serve() as base_url:
+        llm = openai_llm(base_url)
+        checkpoint_dir = tmp_path / "checkpoint"
+        llm_batch = LLMBatch(checkpoint_dir=checkpoint_dir, flush_interval=0.01, poll_interval=0.01)
+        assert not checkpoint_dir.exists()  # created on entering only
+        async with llm_batch:
+            questions = ["a", "b", "c", "a", "fail"]
+            rsps = await asyncio.gather(*(llm.aask(q, stream=False) for q in questions), return_exceptions=True)
+
+        assert rsps[:4] == ["I'm a", "I'm b", "I'm c", "I'm a"]
+        assert isinstance(rsps[4], RuntimeError)
+        assert len(server.batches) == 1
+        # the identical requests are sent once
+        batch = next(iter(server.batches.values()))
+        assert len(server.files[batch["input_file_id"]].splitlines()) == 4
+        assert llm.cost_manager.total_prompt_tokens > 0
+        assert (checkpoint_dir / "input-1.jsonl").exists()
+        assert len((checkpoint_dir / "results.jsonl").read_text().splitlines()) == 3
+
+        # the answers of a finished run are read back from the checkpoint
+        async with LLMBatch(checkpoint_dir=checkpoint_dir, flush_interval=0.01, poll_interval=0.01):
+            assert await llm.aask("b", stream=False) == "I'm b"
+        assert len(server.batches) == 1
+
+
+@pytest.mark.asyncio
+async def test_llm_batch_resume(tmp_path):
+    server = MockBatchServer()
+    async with server.serve() as base_url:
+        llm = openai_llm(base_url)
+        batch = LLMBatch(checkpoint_dir=tmp_path, flush_interval=0.01, poll_interval=60)
+        async with batch:
+            job = asyncio.create_task(llm.aask("a", stream=False))
+            while not server.batches:
+                await asyncio.sleep(0.01)
+            # crash while the batch is in progress
+            await asyncio.sleep(0.1)
+            job.cancel()
+            for task in list(batch._jobs):
+                task.cancel()
+        assert not (tmp_path / "results.jsonl").exists()
+
+        async with LLMBatch(checkpoint_dir=tmp_path, flush_interval=0.01, poll_interval=0.01):
+            assert await llm.aask("a", stream=False) == "I'm a"
+        # polled the batch submitted before the crash instead of submitting it again
+        assert len(server.batches) == 1
+
+
+@pytest.mark.asyncio
+async def test_llm_batch_local_pool():
+    class CountingLLM(MockBaseLLM):
+        running = 0
+        max_running = 0
+
+        async def _acompletion_text(self, messages: list[dict], stream: bool = False, timeout: int = 3) -> str:
+            CountingLLM.running += 1
+            CountingLLM.max_running = max(CountingLLM.max_running, CountingLLM.running)
+            await asyncio.sleep(0.01)
+            CountingLLM.running -= 1
+            return messages[-1]["content"].upper()
+
+    llm = CountingLLM(mock_llm_config)
+    async with LLMBatch(max_requests=10, flush_interval=0.01, concurrency=3):
+        rsps = await asyncio.gather(
+            *(BaseLLM.acompletion_text(llm, [{"role": "user", "content": f"q{i}"}]) for i in range(20))
+        )
+    assert rsps == [f"Q{i}" for i in range(20)]
+    assert CountingLLM.max_running == 3
+
+
+@pytest.mark.asyncio
+async def test_llm_batch_unavailable():
+    server = MockBatchServer()
+    async with server.serve(batch_api=False) as base_url:
+        llm = openai_llm(base_url)
+        assert llm.supports_batch
+        async with LLMBatch(flush_interval=0.01):
+            assert await llm.aask("a", stream=False) == "I'm a"
+        # the 404 of the batch api is remembered, the next batches run locally at once
+        assert not llm.supports_batch
+        async with LLMBatch(flush_interval=0.01):
+            assert await llm.aask("b", stream=False) == "I'm b"
+        assert not server.files
+
+    compatible = OpenAILLM(LLMConfig(api_type="open_llm", api_key="sk-mock", base_url=base_url, model="llama3"))
+    assert not compatible.supports_batch
+    assert not MockBaseLLM(mock_llm_config).supports_batch
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : unittest of model_cascade
+
+import pytest
+
+from metagpt.actions.action_node import ActionNode
+from metagpt.configs.models_config import ModelsConfig
+from metagpt.context import Context
+from metagpt.provider.model_cascade import (
+    CascadeLLM,
+    LowConfidenceError,
+    ModelCascade,
+    cascade_report,
+)
+from metagpt.utils.cost_manager import CostManager
+from tests.metagpt.provider.mock_llm_config import mock_llm_config
+from tests.metagpt.provider.test_base_llm import MockBaseLLM
+
+
+class ScriptedLLM(MockBaseLLM):
+    """answers with `answers` in order, each answer costs 1000 prompt tokens and 100 completion tokens"""
+
+    def __init__(self, model: str, answers: list[str]):
+        super().__init__(mock_llm_config.model_copy(update={"model": model}))
+        self.model = model
+        self.answers = answers
+        self.prompts = []
+        self.cost_manager = CostManager()
+
+    async def aask(self, msg, *args, **kwargs) -> str:
+        self.prompts.append(msg)
+        self._update_costs({"prompt_tokens": 1000, "completion_tokens": 100})
+        return self.answers.pop(0)
+
+
+class Owner:
+    """an action stand-in, with the context of a role"""
+
+    def __init__(self, name: str, context: Context):
+        self.name = name
+        self.context = context
+
+
+def mock_cascade_llms(mocker, *llms: ScriptedLLM):
+    """the cascades get the scripted llm of their model, with the cost manager of the context"""
+    scripted = {llm.model: llm for llm in llms}
+    llm_from_config = Context.llm_with_cost_manager_from_llm_config
+
+    def llm_with_cost_manager_from_llm_config(self, config):
+        if config.model not in scripted:
+            return llm_from_config(self, config)
+        llm = scripted[config.model]
+        llm.cost_manager = self.cost_manager
+        return llm
+
+    mocker.patch.object(Context, "llm_with_cost_manager_from_llm_config", llm_with_cost_manager_from_llm_config)
+
+
+@pytest.fixture
+def models_config() -> ModelsConfig:
+    return ModelsConfig(
+        models={
+            "gpt-4o-mini": mock_llm_config.model_copy(update={"model": "gpt-4o-mini"}),
+            "gpt-4o": mock_llm_config.model_copy(update={"model": "gpt-4o"}),
+        },
+        cascades={"WritePRD/Project Name": ["gpt-4o-mini", "gpt-4o"], "WriteDesign": ["gpt-4o-mini", "gpt-4o"]},
+        cascade_min_confidence=0.5,
+    )
+
+
+@pytest.mark.asyncio
+async def test_model_cascade_escalation():
+    cheap = ScriptedLLM("gpt-4o-mini", ["42\n[CONFIDENCE] 0.9", "maybe\n[CONFIDENCE] 0.2"])
+    strong = ScriptedLLM("gpt-4o", ["43"])
+    shared = strong.cost_manager
+    cascade = ModelCascade("test", [cheap, strong], min_confidence=0.5)
+
+    assert await cascade.run(lambda llm: llm.aask("question")) == "42"
+    assert "[CONFIDENCE]" in cheap.prompts[0]
+    # rated under min_confidence, escalated to the strong model which isn't asked for a rating
+    assert await cascade.run(lambda llm: llm.aask("question")) == "43"
+    assert "[CONFIDENCE]" not in strong.prompts[0]
+
+    report = cascade.report()
+    assert report["calls"] == 2
+    assert report["levels"]["gpt-4o-mini"] == {
+        "calls": 2,
+        "accepted": 1,
+        "seconds": pytest.approx(0, abs=0.1),
+        "cost": 0.00042,
+    }
+    assert report["levels"]["gpt-4o"]["accepted"] == 1
+    # 1 call at the price of gpt-4o, minus the 2 calls of gpt-4o-mini
+    assert report["saved_cost"] == pytest.approx(0.0065 - 0.00042, abs=1e-6)
+    assert report["saved_seconds"] is not None
+    # the costs still add up in the cost manager of the context
+    assert shared.total_prompt_tokens == 1000
+
+    async def fail(llm):
+        raise LowConfidenceError("unsure")
+
+    with pytest.raises(LowConfidenceError):
+        await cascade.run(fail)
+
+
+@pytest.mark.asyncio
+async def test_model_cascade_action_node(mocker, models_config):
+    cheap = ScriptedLLM(
+        "gpt-4o-mini", ['[CONTENT]{"Name": "snake"}[/CONTENT]', '[CONTENT]{"Project Name": "snake"}[/CONTENT]']
+    )
+    strong = ScriptedLLM("gpt-4o", ['[CONTENT]{"Project Name": "snake_game"}[/CONTENT]'])
+    mock_cascade_llms(mocker, cheap, strong)
+
+    default = ScriptedLLM("gpt-4-turbo", [])
+    owner = Owner("WritePRD", Context())
+    llm = CascadeLLM(default, owner=owner, models_config=models_config)
+    assert CascadeLLM.match("WritePRD", models_config)
+    assert not CascadeLLM.match("WriteTasks", models_config)
+    assert llm.cascade_for() is None
+    # the cascade is built in the context of the owner when it's called
+    context = Context()
+    owner.context = context
+    assert llm.cascade_for("Project Name") is context.cascades["WritePRD/Project Name"]
+    assert llm.node_rules(["Project Name", "Goals"]) == ["WritePRD/Project Name"]
+
+    node = ActionNode(key="Project Name", expected_type=str, instruction="name the project", example="game_2048")
+    # a schema failure of the cheap model is escalated
+    await node.fill(context="a snake game", llm=llm)
+    assert node.instruct_content.model_dump() == {"Project Name": "snake_game"}
+    assert len(cheap.prompts) == 1
+    # the cheap answer is taken when it's valid
+    await node.fill(context="a snake game", llm=llm)
+    assert node.instruct_content.model_dump() == {"Project Name": "snake"}
+    assert len(strong.prompts) == 1
+    assert not default.prompts
+    # the costs go to the cost manager of the context
+    assert context.cost_manager.total_prompt_tokens == 3000
+    assert cascade_report(context)["WritePRD/Project Name"]["calls"] == 2
+
+    # the rule of a child node applies when the children are filled one by one
+    cheap.answers.append('[CONTENT]{"Project Name": "snake_2"}[/CONTENT]')
+    default.answers.append('[CONTENT]{"Project Name": "snake_3"}[/CONTENT]')
+    prd = ActionNode.from_children("WritePRD", [node])
+    await prd.fill(context="a snake game", llm=llm, strgy="complex")
+    assert prd.instruct_content.model_dump() == {"Project Name": "snake_2"}
+    await prd.fill(context="a snake game", llm=llm)
+    assert prd.instruct_content.model_dump() == {"Project Name": "snake_3"}
+
+
+def test_model_cascade_action(mocker, models_config, context):
+    from metagpt.actions import WritePRD
+    from metagpt.actions.project_management import WriteTasks
+
+    mocker.patch.object(ModelsConfig, "default", return_value=models_config)
+    assert isinstance(WritePRD(context=context).llm, CascadeLLM)
+    assert not isinstance(WriteTasks(context=context).llm, CascadeLLM)
+
+
+@pytest.mark.asyncio
+async def test_model_cascade_role(mocker, models_config, context):
+    from metagpt.actions.design_api import WriteDesign
+    from metagpt.roles import Architect
+
+    mocker.patch.object(ModelsConfig, "default", return_value=models_config)
+    cheap = ScriptedLLM("gpt-4o-mini", ["a design"])
+    strong = ScriptedLLM("gpt-4o", [])
+    mock_cascade_llms(mocker, cheap, strong)
+
+    architect = Architect(context=context)
+    architect.set_actions([WriteDesign])
+    action = architect.actions[0]
+    # the llm the role sets to its actions stays behind the cascade
+    assert isinstance(action.llm, CascadeLLM)
+    assert action.llm.llm is architect.llm
+
+    assert await action._aask("design it") == "a design"
+    assert list(context.cascades) == ["WriteDesign"]
+    assert context.cost_manager.total_prompt_tokens == 1000
@@ -7,7 +7,7 @@ from typing import Any, Tuple
 
 import pytest
 
-from metagpt.provider.ollama_api import OllamaLLM
+from metagpt.provider.ollama_api import OLLAMA_PROMPT_CACHE_KEEP_ALIVE, OllamaLLM
 from tests.metagpt.provider.mock_llm_config import mock_llm_config
 from tests.metagpt.provider.req_resp_const import (
     llm_general_chat_funcs_test,
@@ -53,3 +53,9 @@ async def test_gemini_acompletion(mocker):
     assert resp == resp_cont
 
     await llm_general_chat_funcs_test(ollama_llm, prompt, messages, resp_cont)
+
+
+def test_ollama_prompt_cache_keep_alive():
+    config = mock_llm_config.model_copy(update={"prompt_cache": True})
+    assert OllamaLLM(config)._const_kwargs(messages)["keep_alive"] == OLLAMA_PROMPT_CACHE_KEEP_ALIVE
+    assert "keep_alive" not in OllamaLLM(mock_llm_config)._const_kwargs(messages)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : the unittest of router api, with local mock ollama servers as backends
+
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from metagpt.configs.llm_config import LLMConfig
+from metagpt.provider.router_api import RouterLLM
+from tests.metagpt.provider.req_resp_const import messages
+
+
+async def start_mock_ollama(name: str, delay: float = 0, fail: bool = False):
+    calls = []
+
+    async def chat(request: web.Request):
+        calls.append(await request.json())
+        await asyncio.sleep(delay)
+        if fail:
+            return web.json_response({"error": "service unavailable"}, status=503)
+        return web.json_response(
+            {"message": {"role": "assistant", "content": name}, "prompt_eval_count": 1, "eval_count": 1}
+        )
+
+    app = web.Application()
+    app.router.add_post("/api/chat", chat)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    config = LLMConfig(api_type="ollama", base_url=f"http://127.0.0.1:{port}/api", model=name)
+    return runner, config, calls
+
+
+def make_router(*backends: LLMConfig, **kwargs) -> RouterLLM:
+    return RouterLLM(LLMConfig(api_type="router", backends=list(backends), **kwargs))
+
+
+@pytest.mark.asyncio
+async def test_router_latency_policy():
+    slow, slow_config, _ = await start_mock_ollama("slow", delay=0.2)
+    fast, fast_config, _ = await start_mock_ollama("fast")
+    try:
+        router = make_router(slow_config, fast_config)
+        # both backends get measured first, then the fast one is preferred
+        for _ in range(2):
+            await router.acompletion_text(messages)
+        for _ in range(3):
+            assert await router.acompletion_text(messages) == "fast"
+    finally:
+        await slow.cleanup()
+        await fast.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_router_round_robin_policy():
+    a, a_config, a_calls = await start_mock_ollama("a")
+    b, b_config, b_calls = await start_mock_ollama("b")
+    try:
+        router = make_router(a_config, b_config, routing_policy="round_robin", backend_weights=[2, 1])
+        rsps = [await router.acompletion_text(messages) for _ in range(6)]
+        assert rsps.count("a") == 4 and rsps.count("b") == 2
+        assert len(a_calls) == 4 and len(b_calls) == 2
+    finally:
+        await a.cleanup()
+        await b.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_router_failover_and_circuit_breaking():
+    down, down_config, down_calls = await start_mock_ollama("down", fail=True)
+    up, up_config, _ = await start_mock_ollama("up", delay=0.01)
+    try:
+        router = make_router(down_config, up_config, circuit_failure_threshold=2, circuit_reset_timeout=60)
+        for _ in range(4):
+            assert await router.acompletion_text(messages) == "up"
+        # the circuit of the failing backend is opened after 2 failures, so it is not called anymore
+        assert len(down_calls) == 2
+        assert router.backends[0].opened_at is not None
+    finally:
+        await down.cleanup()
+        await up.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_router_hedged_request(mocker):
+    stalled, stalled_config, _ = await start_mock_ollama("stalled", delay=30)
+    backup, backup_config, backup_calls = await start_mock_ollama("backup")
+    try:
+        router = make_router(stalled_config, backup_config, routing_policy="round_robin", hedge=True)
+        router.backends[1].current_weight = -10  # make sure the stalled backend is tried first
+        router.backends[0].latencies.extend([0.05] * 20)
+
+        invoked, cancelled = [], asyncio.Event()
+        invoke = router._invoke
+
+        async def spy_invoke(backend, call):
+            invoked.append(backend.llm.config.model)
+            try:
+                return await invoke(backend, call)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        mocker.patch.object(router, "_invoke", spy_invoke)
+        assert await router.acompletion_text(messages) == "backup"
+        assert invoked == ["stalled", "backup"]  # the backup got the hedged request
+        assert len(backup_calls) == 1
+        await asyncio.wait_for(cancelled.wait(), timeout=5)  # the stalled request is cancelled
+    finally:
+        await stalled.cleanup()
+        await backup.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_router_cost_policy():
+    cheap = LLMConfig(api_type="openai", api_key="xxx", model="gpt-3.5-turbo")
+    expensive = LLMConfig(api_type="openai", api_key="xxx", model="gpt-4")
+    router = make_router(expensive, cheap, routing_policy="cost")
+    assert router._rank_backends()[0].llm.config.model == "gpt-3.5-turbo"
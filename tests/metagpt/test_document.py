@@ -27,7 +27,8 @@ def load_existing_repo(path):
     assert repo.get("code/wtf_file.py").content == "def hello():\n    print('hello')"
 
 
-def test_repo_set_load():
+def test_repo_set_load(mocker, tmp_path):
+    mocker.patch("metagpt.document.REPO_PARSER_CACHE_ROOT", tmp_path / "repo_parser_cache")
     repo_path = config.workspace.path / "test_repo"
     set_existing_repo(repo_path)
     load_existing_repo(repo_path)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : unittest of the llm stream output of logs
+
+import asyncio
+import io
+import threading
+import time
+
+import pytest
+
+from metagpt.logs import (
+    STREAM_OUTPUT,
+    CallbackSink,
+    FileSink,
+    StreamOutput,
+    StreamSink,
+    TextSink,
+    log_llm_stream,
+    logger,
+    stream_channel,
+)
+
+
+class SlowSink(StreamSink):
+    """a sink taking 1ms per write, like a slow terminal"""
+
+    def __init__(self):
+        self.texts: dict[str, list[str]] = {}
+        self.writes = 0
+
+    def write(self, channel: str, text: str):
+        time.sleep(0.001)
+        self.writes += 1
+        self.texts.setdefault(channel, []).append(text)
+
+
+@pytest.mark.asyncio
+async def test_stream_output_concurrent_streams():
+    sink = SlowSink()
+    output = StreamOutput(sinks=[sink], interval=0.01)
+
+    async def stream(name: str):
+        with stream_channel(name):
+            for i in range(100):
+                output.put(f"{i},")
+                await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(asyncio.create_task(stream(f"role{i}")) for i in range(20)))
+    elapsed = time.perf_counter() - start
+    output.flush()
+
+    expected = "".join(f"{i}," for i in range(100))
+    assert {channel: "".join(texts) for channel, texts in sink.texts.items()} == {
+        f"role{i}": expected for i in range(20)
+    }
+    # 2000 chunks coalesced into a few writes per channel, instead of 2s of writing
+    assert sink.writes < 2000 / 10
+    assert elapsed < 1
+
+
+@pytest.mark.asyncio
+async def test_stream_output_sinks(tmp_path):
+    terminal = io.StringIO()
+    piped = []
+    output = StreamOutput(sinks=[TextSink(terminal)], interval=0.01)
+    output.add_sink(FileSink(tmp_path / "stream.log"))
+    output.add_sink(CallbackSink(piped.append, channels=["Bob"]))
+
+    with stream_channel("Alice"):
+        output.put("Hello")
+        output.put(" Bob")
+        with stream_channel("Bob"):  # the enclosing channel is kept
+            output.put("!")
+    output.flush()
+    with stream_channel("Bob"):
+        output.put("Hi")
+    await asyncio.sleep(0.05)  # written by the background writer
+
+    assert terminal.getvalue() == "Hello Bob!\n[Bob] Hi"
+    assert piped == ["Hi"]
+    for sink in output.sinks[1:]:
+        output.remove_sink(sink)
+    assert (tmp_path / "stream.log").read_text() == "Hello Bob!\n[Bob] Hi"
+
+
+def test_stream_output_without_event_loop():
+    terminal = io.StringIO()
+    output = StreamOutput(sinks=[TextSink(terminal)])
+    output.put("written through")
+    assert terminal.getvalue() == "written through"
+
+
+def test_stream_sink_is_abstract():
+    with pytest.raises(TypeError):
+        StreamSink()
+
+
+@pytest.mark.asyncio
+async def test_stream_output_flushed_in_order():
+    texts = []
+    sink = CallbackSink(texts.append)
+    STREAM_OUTPUT.add_sink(sink)
+    try:
+        log_llm_stream("Hello")
+        assert texts == []  # buffered
+        logger.info("a log line after the stream text")
+        assert texts == ["Hello"]
+        log_llm_stream(" world")
+        log_llm_stream("\n")  # the end of the stream
+        assert texts == ["Hello", " world\n"]
+    finally:
+        STREAM_OUTPUT.remove_sink(sink)
+
+
+def test_stream_output_loop_per_thread():
+    sink = SlowSink()
+    output = StreamOutput(sinks=[sink], interval=0.001)
+
+    async def stream(name: str):
+        with stream_channel(name):
+            for i in range(50):
+                output.put(f"{i},")
+                await asyncio.sleep(0)
+
+    threads = [threading.Thread(target=asyncio.run, args=(stream(f"role{i}"),)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    output.flush()
+
+    expected = "".join(f"{i}," for i in range(50))
+    assert {channel: "".join(texts) for channel, texts in sink.texts.items()} == {
+        f"role{i}": expected for i in range(4)
+    }
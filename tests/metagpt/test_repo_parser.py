@@ -1,3 +1,4 @@
+import time
 from pathlib import Path
 from pprint import pformat
 
@@ -5,7 +6,13 @@ import pytest
 
 from metagpt.const import METAGPT_ROOT
 from metagpt.logs import logger
-from metagpt.repo_parser import DotClassAttribute, DotClassMethod, DotReturn, RepoParser
+from metagpt.repo_parser import (
+    CodeBlockInfo,
+    DotClassAttribute,
+    DotClassMethod,
+    DotReturn,
+    RepoParser,
+)
 
 
 def test_repo_parser():
@@ -21,6 +28,72 @@ def test_repo_parser():
     assert output_path.exists()
 
 
+def test_repo_parser_cache(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "a.py").write_text("class A:\n    def run(self):\n        pass\n")
+    (repo / "b.py").write_text("def b():\n    pass\n")
+    cache_root = tmp_path / "cache"
+
+    symbols = RepoParser(base_directory=repo, cache_root=cache_root).generate_symbols()
+    assert {i.file for i in symbols} == {"a.py", "b.py"}
+    assert list(cache_root.glob("*.json"))
+
+    (repo / "b.py").write_text("def b2():\n    pass\n")
+    symbols = {i.file: i for i in RepoParser(base_directory=repo, cache_root=cache_root).generate_symbols()}
+    assert symbols["a.py"].classes == [{"name": "A", "methods": ["run"]}]
+    assert symbols["b.py"].functions == ["b2"]
+    assert all(isinstance(i, CodeBlockInfo) for i in symbols["a.py"].page_info)
+
+
+def _make_synthetic_repo(repo: Path, n_files: int):
+    for i in range(n_files):
+        package = repo / f"pkg{i // 100}"
+        package.mkdir(parents=True, exist_ok=True)
+        (package / f"mod{i}.py").write_text(
+            f"import os\n\nVALUE_{i} = {i}\n\n\nclass Class{i}:\n    def method(self):\n        return os.getcwd()\n\n\n"
+            f"def func{i}(a, b=1):\n    if a:\n        return b\n    return VALUE_{i}\n"
+        )
+
+
+def test_repo_parser_parallel(tmp_path):
+    n_files = 200
+    repo = tmp_path / "repo"
+    _make_synthetic_repo(repo, n_files)
+
+    serial = RepoParser(base_directory=repo, max_workers=1).generate_symbols()
+    cache_root = tmp_path / "cache"
+    parallel = RepoParser(
+        base_directory=repo, cache_root=cache_root, max_workers=2, chunk_size=16, min_parallel_files=0
+    ).generate_symbols()
+    cached = RepoParser(base_directory=repo, cache_root=cache_root).generate_symbols()
+
+    assert len(serial) == len(parallel) == len(cached) == n_files
+    by_file = {i.file: i for i in serial}
+    assert all(i == by_file[i.file] for i in parallel)
+    assert all(i == by_file[i.file] for i in cached)
+
+
+@pytest.mark.skip(reason="benchmark, run it manually")
+def test_repo_parser_benchmark(tmp_path):
+    """Serial vs process pool vs cached symbol extraction on a synthetic 10k-file repo."""
+    n_files = 10_000
+    repo = tmp_path / "repo"
+    _make_synthetic_repo(repo, n_files)
+
+    costs = {}
+    start = time.perf_counter()
+    RepoParser(base_directory=repo, max_workers=1).generate_symbols()
+    costs["serial"] = time.perf_counter() - start
+    start = time.perf_counter()
+    RepoParser(base_directory=repo, cache_root=tmp_path / "cache").generate_symbols()
+    costs["parallel"] = time.perf_counter() - start
+    start = time.perf_counter()
+    RepoParser(base_directory=repo, cache_root=tmp_path / "cache").generate_symbols()
+    costs["cached"] = time.perf_counter() - start
+    logger.info(f"RepoParser.generate_symbols on {n_files} files, cost(s): {costs}")
+
+
 def test_error():
     """_parse_file should return empty list when file not existed"""
     rsp = RepoParser._parse_file(Path("test_not_existed_file.py"))
@@ -2,9 +2,26 @@
 # -*- coding: utf-8 -*-
 # @Desc   : unittest of ahttp_client
 
+import asyncio
+import json
+import statistics
+import time
+from contextlib import asynccontextmanager
+
+import aiohttp
 import pytest
+from aiohttp import web
 
-from metagpt.utils.ahttp_client import apost, apost_stream
+from metagpt.logs import logger
+from metagpt.provider.general_api_requestor import GeneralAPIRequestor
+from metagpt.utils.ahttp_client import (
+    apost,
+    apost_stream,
+    close_session,
+    get_session,
+    hold_session,
+    session_scope,
+)
 
 
 @pytest.mark.asyncio
@@ -27,3 +44,119 @@ async def test_apost_stream():
     result = apost_stream(url="http://aider.meizu.com/app/weather/listWeather", data={"cityIds": "101240101"})
     async for line in result:
         assert len(line) >= 0
+
+
+@asynccontextmanager
+async def mock_server():
+    """a local completion api, recording the client port of every request"""
+    peers = []
+
+    async def completion(request: web.Request) -> web.Response:
+        peers.append(request.transport.get_extra_info("peername")[1])
+        if (await request.json()).get("stream"):
+            body = json.dumps({"message": {"role": "assistant", "content": "hi"}, "done": True})
+            return web.Response(text=body + "\n", content_type="application/x-ndjson")
+        return web.json_response({"message": {"role": "assistant", "content": "hi"}, "done": True})
+
+    app = web.Application()
+    app.router.add_post("/api/chat", completion)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}", peers
+    finally:
+        await close_session()
+        await runner.cleanup()
+
+
+async def _p50(request, n: int = 50) -> float:
+    latencies = []
+    for _ in range(n):
+        start = time.perf_counter()
+        await request()
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies)
+
+
+@pytest.mark.asyncio
+async def test_shared_session_keep_alive():
+    async with mock_server() as (base_url, peers):
+        await _check_shared_session_keep_alive(f"{base_url}/api/chat", peers)
+
+
+async def _check_shared_session_keep_alive(url: str, peers: list):
+    async def fresh_post():
+        async with aiohttp.ClientSession() as session:
+            async with session.post(url, json={"model": "llama2"}) as resp:
+                return await resp.json()
+
+    fresh_p50 = await _p50(fresh_post)
+    assert len(set(peers)) == len(peers)  # a connection per request
+    peers.clear()
+
+    shared_p50 = await _p50(lambda: apost(url, json={"model": "llama2"}, as_json=True))
+    assert len(set(peers)) == 1  # one kept-alive connection
+    logger.info(
+        f"small completion p50: fresh session {fresh_p50 * 1000:.2f}ms, shared session {shared_p50 * 1000:.2f}ms"
+    )
+
+    session = get_session()
+    assert session is get_session()
+    await close_session()
+    assert session.closed
+    assert get_session() is not session
+
+
+@pytest.mark.asyncio
+async def test_session_scope():
+    async with session_scope() as session:
+        async with session_scope():
+            assert get_session() is session
+        assert not session.closed  # still used by the outer scope
+    assert session.closed
+
+    # a request in flight when the last scope exits keeps the session open until it is done
+    async with hold_session() as session:
+        async with session_scope():
+            pass
+        assert not session.closed
+    assert session.closed
+
+    # requests outside any scope don't close the session
+    async with hold_session() as session:
+        pass
+    assert not session.closed
+    await close_session()
+
+
+def test_session_closed_at_loop_shutdown():
+    sessions = []
+
+    async def request():
+        async with hold_session() as session:
+            sessions.append(session)
+
+    asyncio.run(request())
+    assert sessions[0].closed  # no scope, closed when `asyncio.run` shuts the loop down
+    asyncio.run(request())
+    assert sessions[1] is not sessions[0]
+    assert sessions[1].closed
+
+
+@pytest.mark.asyncio
+async def test_general_api_requestor_shared_session():
+    async with mock_server() as (base_url, peers):
+        requestor = GeneralAPIRequestor(base_url=base_url)
+        for _ in range(5):
+            resp, _, _ = await requestor.arequest(method="post", url="/api/chat", params={"model": "llama2"})
+            assert json.loads(resp.decode())["done"]
+        stream_resp, _, _ = await requestor.arequest(
+            method="post", url="/api/chat", params={"stream": True}, stream=True
+        )
+        async for line in stream_resp:
+            assert line
+        assert len(peers) == 6
+        assert len(set(peers)) == 1
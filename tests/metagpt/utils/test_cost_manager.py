@@ -28,5 +28,38 @@ def test_cost_manager():
     assert cost.total_budget == 20
 
 
+def test_cost_manager_cached_tokens():
+    cm = CostManager()
+    cm.update_cost(prompt_tokens=1000, completion_tokens=100, model="gpt-4o-2024-08-06", cached_tokens=800)
+    assert cm.get_total_prompt_tokens() == 1000
+    assert cm.get_total_cached_tokens() == 800
+    assert cm.get_total_cost() == pytest.approx((200 * 0.0025 + 800 * 0.00125 + 100 * 0.01) / 1000)
+
+    # models without a cached price are charged the full prompt price
+    cm = CostManager()
+    cm.update_cost(prompt_tokens=1000, completion_tokens=100, model="gpt-4-turbo", cached_tokens=800)
+    assert cm.get_total_cost() == 0.013
+
+
+def test_cost_manager_cache_write_tokens():
+    cm = CostManager()
+    cm.update_cost(
+        prompt_tokens=3000,
+        completion_tokens=100,
+        model="claude-3-5-sonnet-20240620",
+        cached_tokens=1000,
+        cache_write_tokens=1500,
+    )
+    assert cm.get_total_prompt_tokens() == 3000
+    assert cm.get_total_cached_tokens() == 1000
+    assert cm.get_total_cache_write_tokens() == 1500
+    assert cm.get_total_cost() == pytest.approx((500 * 0.003 + 1000 * 0.0003 + 1500 * 0.00375 + 100 * 0.015) / 1000)
+
+    # models without a cache write price are charged the full prompt price
+    cm = CostManager()
+    cm.update_cost(prompt_tokens=1000, completion_tokens=100, model="gpt-4-turbo", cache_write_tokens=800)
+    assert cm.get_total_cost() == 0.013
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-s"])
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : unittest of markdown_document, against the regexes it replaces
+
+import json
+import random
+import re
+import time
+
+from metagpt.const import TEST_DATA_PATH
+from metagpt.logs import logger
+from metagpt.utils.common import CodeParser
+from metagpt.utils.markdown_document import MarkdownDocument, parse_markdown
+from tests.metagpt.utils.test_code_parser import t_text
+
+
+def regex_code(text: str, lang: str):
+    match = re.search(rf"```{lang}.*?\s+(.*?)```", text, re.DOTALL)
+    return match.group(1) if match else None
+
+
+def split_blocks(text: str) -> dict[str, str]:
+    block_dict = {}
+    for block in text.split("##"):
+        if block.strip() == "":
+            continue
+        title, content = block.split("\n", 1) if "\n" in block else (block, "")
+        block_dict[title.strip()] = content.strip()
+    return block_dict
+
+
+def regex_loose_code(text: str) -> list[str]:
+    codes = []
+    for pattern in (r"(.*?```python.*?\s+)?(?P<code>.*)(```.*?)", r"(.*?```python.*?\s+)?(?P<code>.*)"):
+        match = re.search(pattern, text, re.DOTALL)
+        if match:
+            codes.append(match.group("code"))
+    return codes
+
+
+def texts() -> list[str]:
+    """the llm outputs of the test data, and random texts made of the marks"""
+    rsp_cache = json.loads((TEST_DATA_PATH / "rsp_cache.json").read_text())
+    marks = ["`", "```", "##", "#", "\n", " ", "\t", ":", "python", "json", "a"]
+    rnd = random.Random(0)
+    fuzz = ["".join(rnd.choice(marks) for _ in range(rnd.randint(0, 30))) for _ in range(5000)]
+    return [rsp for rsp in rsp_cache.values() if isinstance(rsp, str)] + [t_text] + fuzz
+
+
+def test_markdown_document():
+    doc = MarkdownDocument(t_text)
+    assert "Task list" in doc.blocks
+    assert doc.code("python").startswith('"""\nflask==1.1.2')
+    assert doc.code("mermaid") is None
+    assert len(doc.codes("python")) == len(doc.fences) // 2
+    assert parse_markdown(t_text) is parse_markdown(t_text)
+
+    for text in texts():
+        doc = MarkdownDocument(text)
+        for lang in ("", "python", "json"):
+            assert doc.code(lang) == regex_code(text, lang)
+            assert doc.codes(lang) == re.findall(rf"```{lang}(.*?)```", text, re.DOTALL)
+        assert doc.blocks == split_blocks(text)
+        assert doc.loose_code("python") == regex_loose_code(text)
+
+
+def test_markdown_document_perf(mocker):
+    text = "\n".join(t_text for _ in range(20))
+    # the blocks asked one after another from a long llm output
+    titles = [title for title, content in split_blocks(t_text).items() if regex_code(content, "python")]
+    assert len(titles) > 1
+    rounds = 10
+
+    start = time.perf_counter()
+    expected = []
+    for _ in range(rounds):
+        for title in titles:
+            block = next(v for k, v in split_blocks(text).items() if title in k)
+            expected.append(regex_code(block, "python"))
+    regex_seconds = time.perf_counter() - start
+
+    indexed = mocker.spy(MarkdownDocument, "__init__")
+    start = time.perf_counter()
+    codes = []
+    for _ in range(rounds):
+        parse_markdown.cache_clear()
+        for title in titles:
+            codes.append(CodeParser.parse_code(title, text, "python"))
+    index_seconds = time.perf_counter() - start
+    logger.info(
+        f"parse {len(titles)} blocks of {len(text)} chars: regex {regex_seconds * 1000:.2f}ms, "
+        f"index {index_seconds * 1000:.2f}ms"
+    )
+    assert codes == expected
+    # the long text is scanned once per output, instead of once per block asked
+    assert sum(call.args[1] == text for call in indexed.call_args_list) == rounds
@@ -268,6 +268,30 @@ def test_retry_parse_json_text():
     assert output == target_json
 
 
+def test_repair_json_scan():
+    import json
+
+    from metagpt.utils.repair_llm_raw_output import repair_json_scan
+
+    cases = [
+        ('{"a": 1, "b": [1, 2,],,}', {"a": 1, "b": [1, 2]}),
+        ("{'a': 'it\\'s', 'b': True, c: None}", {"a": "it's", "b": True, "c": None}),
+        ('{"a": "line1\nline2\tend", "b": "say "hi" now"}', {"a": "line1\nline2\tend", "b": 'say "hi" now'}),
+        ('{"a": "x"\n"b": ["y"\n"z"]}', {"a": "x", "b": ["y", "z"]}),
+        ('{"a": """\n  triple "quoted"\n  """\n"b": "no"}', {"a": '\n  triple "quoted"\n  ', "b": "no"}),
+        ('{"a": 1, // the a\n"b": 2 # the b\n}', {"a": 1, "b": 2}),
+        ('{"a": ["x"],\n"b": "y"\n],\n"c": "z"\n}', {"a": ["x"], "b": "y", "c": "z"}),
+        ('{"a": "x"\n},\n"c": "z"\n}', {"a": "x", "c": "z"}),
+        ('{"a": [1, 2], "b": {"c": "trunc', {"a": [1, 2], "b": {"c": "trunc"}}),
+    ]
+    for text, target in cases:
+        assert json.loads(repair_json_scan(text), strict=False) == target
+
+    # valid json is kept as it is
+    text = '{"a": [1, 2.5e3, -1], "b": {"c": null, "d": "\\u4e2d \\" \\n"}}'
+    assert repair_json_scan(text) == text
+
+
 def test_extract_content_from_output():
     """
     cases
@@ -386,3 +410,13 @@ def test_extract_content_from_output():
     assert output.startswith('{\n"Implementation approach"') and output.endswith(
         '"Anything UNCLEAR": "The requirement is clear to me."\n}'
     )
+
+
+def test_fast_parse_content():
+    from metagpt.utils.repair_llm_raw_output import fast_parse_content
+
+    output = 'Sure:\n[CONTENT]\n```json\n{"a": "x", "b": [1, 2,],}\n```\n[/CONTENT]\nthat is all'
+    assert fast_parse_content(output) == {"a": "x", "b": [1, 2]}
+    assert fast_parse_content('[CONTENT]\n{"a": "x"}') == {"a": "x"}
+    assert fast_parse_content("[CONTENT]\nnothing here\n[/CONTENT]") is None
+    assert fast_parse_content('{"a": "x"}') is None
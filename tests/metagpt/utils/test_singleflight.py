@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : unittest of singleflight
+
+import asyncio
+
+import pytest
+
+from metagpt.utils.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_singleflight_shares_result_and_chunks():
+    flight = SingleFlight()
+    started = []
+
+    async def call(publish):
+        started.append(1)
+        for chunk in ["a", "b", "c"]:
+            publish(chunk)
+            await asyncio.sleep(0.01)
+        return "abc"
+
+    replayed = [[], []]
+    results = await asyncio.gather(
+        flight.do("k", call),
+        flight.do("k", call, on_chunk=replayed[0].append),
+        flight.do("k", call, on_chunk=replayed[1].append),
+    )
+    assert results == ["abc"] * 3
+    assert len(started) == 1
+    assert replayed == [["a", "b", "c"], ["a", "b", "c"]]
+    assert flight.stats() == {"calls": 1, "coalesced": 2, "in_flight": 0}
+
+    # a finished call isn't shared with the next callers
+    assert await flight.do("k", call) == "abc"
+    assert len(started) == 2
+
+
+@pytest.mark.asyncio
+async def test_singleflight_exception_and_cancel():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def failing(publish):
+        await release.wait()
+        raise ValueError("boom")
+
+    leader = asyncio.create_task(flight.do("k", failing))
+    follower = asyncio.create_task(flight.do("k", failing))
+    await asyncio.sleep(0)
+    # the call goes on for the follower when its starter is cancelled
+    leader.cancel()
+    release.set()
+    with pytest.raises(ValueError):
+        await follower
+    with pytest.raises(asyncio.CancelledError):
+        await leader
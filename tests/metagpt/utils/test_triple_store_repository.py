@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : test_triple_store_repository.py
+@Desc    : Unit tests for triple_store_repository.py
+"""
+
+from pathlib import Path
+
+import pytest
+
+from metagpt.repo_parser import RepoParser
+from metagpt.utils.di_graph_repository import DiGraphRepository
+from metagpt.utils.graph_repository import SPO, GraphRepository
+from metagpt.utils.triple_store_repository import TripleStoreRepository
+
+
+@pytest.mark.asyncio
+async def test_triple_store_select_delete():
+    graph = TripleStoreRepository(name="test")
+    await graph.insert_batch(
+        [
+            SPO(subject="a.py", predicate="is", object_="source_code"),
+            SPO(subject="a.py", predicate="is", object_="python"),
+            SPO(subject="a.py", predicate="has_class", object_="a.py:A"),
+            SPO(subject="a.py:A", predicate="is", object_="class"),
+            SPO(subject="b.py", predicate="is", object_="source_code"),
+        ]
+    )
+    # several predicates between the same pair of nodes are kept
+    await graph.insert(subject="a.py", predicate="depends_on", object_="python")
+    await graph.insert(subject="a.py", predicate="depends_on", object_="python")
+    assert len(graph) == 6
+
+    assert len(await graph.select()) == 6
+    assert len(await graph.select(subject="a.py")) == 4
+    assert {r.predicate for r in await graph.select(subject="a.py", object_="python")} == {"is", "depends_on"}
+    assert {r.subject for r in await graph.select(predicate="is", object_="source_code")} == {"a.py", "b.py"}
+    assert len(await graph.select(predicate="is")) == 4
+    assert len(await graph.select(object_="python")) == 2
+    assert await graph.select(subject="a.py", predicate="is", object_="class") == []
+
+    assert await graph.delete(subject="a.py", predicate="is") == 2
+    assert await graph.delete(object_="python") == 1
+    assert await graph.delete(subject="not_existed") == 0
+    assert len(graph) == 3
+    assert await graph.select(object_="python") == []
+    assert len(await graph.select(predicate="is")) == 2
+
+
+@pytest.mark.parametrize("suffix", [".db", ".json"])
+@pytest.mark.asyncio
+async def test_triple_store_save_load(tmp_path, suffix):
+    path = Path(__file__).parent / "../../data/code"
+    graph = await TripleStoreRepository.load_from(tmp_path / f"test{suffix}")
+    for file_info in RepoParser(base_directory=path).generate_symbols():
+        await GraphRepository.update_graph_db_with_file_info(graph_db=graph, file_info=file_info)
+    await graph.save()
+    assert graph.pathname.exists()
+
+    loaded = await TripleStoreRepository.load_from(graph.pathname)
+    assert await loaded.select() == await graph.select()
+
+
+@pytest.mark.asyncio
+async def test_triple_store_load_di_graph_json(tmp_path):
+    di_graph = DiGraphRepository(name="test", root=tmp_path)
+    await di_graph.insert(subject="a", predicate="connects_to", object_="b")
+    await di_graph.insert(subject="b", predicate="connects_to", object_="c")
+    await di_graph.save()
+
+    graph = await TripleStoreRepository.load_from(di_graph.pathname)
+    assert await graph.select() == await di_graph.select()
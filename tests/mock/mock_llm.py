@@ -85,6 +85,7 @@ class MockLLM(OriginalLLM):
         images: Optional[Union[str, list[str]]] = None,
         timeout=3,
         stream=True,
+        coalesce=None,
     ) -> str:
         # used to identify it a message has been called before
         if isinstance(msg, list):